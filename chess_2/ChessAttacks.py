@@ -0,0 +1,198 @@
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from ChessBoard import ChessBoard
+from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
+from common import PlayerSide, ChessBoardSquare
+from exceptions import InvalidEnumOrClassException
+
+KNIGHT_OFFSETS: List[Tuple[int, int]] = [
+    (+2, +1), (+2, -1), (-2, +1), (-2, -1),
+    (+1, +2), (+1, -2), (-1, +2), (-1, -2),
+]
+
+KING_OFFSETS: List[Tuple[int, int]] = [
+    (+1, +0), (+0, -1), (-0, +1), (-1, -0),
+    (+1, +1), (+1, -1), (-1, +1), (-1, -1),
+]
+
+ROOK_DIRECTIONS: List[Tuple[int, int]] = [(+1, +0), (+0, -1), (-0, +1), (-1, -0)]
+BISHOP_DIRECTIONS: List[Tuple[int, int]] = [(+1, +1), (+1, -1), (-1, +1), (-1, -1)]
+
+# signature of ChessGame._move_directional_piece
+DirectionalMoveGenerator = Callable[[ChessBoardSquare, List[Tuple[int, int]], ChessBoard], list]
+
+class AttackTables:
+    """
+    Precomputed attack squares for every square on the board.
+
+    Knight and king tables hold the squares attacked from each square.
+    Ray tables hold, per square, one list of squares per direction ordered outward,
+    so a sliding piece's attacks stop at the first occupied square of each ray.
+    """
+
+    def __init__(self, move_directional_piece: DirectionalMoveGenerator):
+        self.knight_attacks: Dict[ChessBoardSquare, List[ChessBoardSquare]] = dict()
+        self.king_attacks: Dict[ChessBoardSquare, List[ChessBoardSquare]] = dict()
+        self.rook_rays: Dict[ChessBoardSquare, List[List[ChessBoardSquare]]] = dict()
+        self.bishop_rays: Dict[ChessBoardSquare, List[List[ChessBoardSquare]]] = dict()
+
+        # the rays are what a lone queen can reach on an otherwise empty board
+        empty_board = ChessBoard(empty_board=True)
+
+        for row in range(ChessBoard.BOARD_SIZE):
+            for col in range(ChessBoard.BOARD_SIZE):
+                square = ChessBoardSquare(row, col)
+                self.knight_attacks[square] = self._offset_squares(square, KNIGHT_OFFSETS, empty_board)
+                self.king_attacks[square] = self._offset_squares(square, KING_OFFSETS, empty_board)
+
+                empty_board.set_square(square, Queen(PlayerSide.White))
+                self.rook_rays[square] = [
+                    [move.to_square for move in move_directional_piece(square, [direction], empty_board)]
+                    for direction in ROOK_DIRECTIONS
+                ]
+                self.bishop_rays[square] = [
+                    [move.to_square for move in move_directional_piece(square, [direction], empty_board)]
+                    for direction in BISHOP_DIRECTIONS
+                ]
+                empty_board.clear_square(square)
+
+    def _offset_squares(self, square: ChessBoardSquare, offsets: List[Tuple[int, int]], board: ChessBoard) -> List[ChessBoardSquare]:
+        return [
+            target for target in (ChessBoardSquare(square.row + d_row, square.col + d_col) for d_row, d_col in offsets)
+            if board.square_is_on_board(target)
+        ]
+
+    def _ray_attacks(self, rays: List[List[ChessBoardSquare]], board: ChessBoard) -> Set[ChessBoardSquare]:
+        attacked: Set[ChessBoardSquare] = set()
+        for ray in rays:
+            for square in ray:
+                attacked.add(square)
+                if board.get_piece_at_square(square) is not None:
+                    break
+        return attacked
+
+    def get_attacked_squares_from(self, origin: ChessBoardSquare, board: ChessBoard) -> Set[ChessBoardSquare]:
+        """
+        squares attacked by the piece at origin, including squares held by its own side
+        unlike move generation, pawns only attack diagonally and castling never attacks
+        """
+        piece = board.get_piece_at_square(origin)
+
+        if isinstance(piece, Knight):
+            return set(self.knight_attacks[origin])
+        elif isinstance(piece, King):
+            return set(self.king_attacks[origin])
+        elif isinstance(piece, Pawn):
+            direction = board.get_player_direction(piece.side)
+            return {
+                square for square in [
+                    ChessBoardSquare(origin.row + direction, origin.col + 1),
+                    ChessBoardSquare(origin.row + direction, origin.col - 1)
+                ]
+                if board.square_is_on_board(square)
+            }
+        elif isinstance(piece, Rook):
+            return self._ray_attacks(self.rook_rays[origin], board)
+        elif isinstance(piece, Bishop):
+            return self._ray_attacks(self.bishop_rays[origin], board)
+        elif isinstance(piece, Queen):
+            return self._ray_attacks(self.rook_rays[origin], board) | self._ray_attacks(self.bishop_rays[origin], board)
+        else:
+            raise InvalidEnumOrClassException(ChessPiece, type(piece))
+
+    def _ray_hits(self, rays: List[List[ChessBoardSquare]], by_side: PlayerSide, piece_types: Tuple[type, type], board: ChessBoard) -> bool:
+        for ray in rays:
+            for square in ray:
+                piece = board.get_piece_at_square(square)
+                if piece is not None:
+                    if piece.side == by_side and isinstance(piece, piece_types):
+                        return True
+                    break
+        return False
+
+    def is_square_attacked(self, square: ChessBoardSquare, by_side: PlayerSide, board: ChessBoard) -> bool:
+        # look outward from the target square for an attacker of the matching type
+        for origin in self.knight_attacks[square]:
+            piece = board.get_piece_at_square(origin)
+            if isinstance(piece, Knight) and piece.side == by_side:
+                return True
+
+        for origin in self.king_attacks[square]:
+            piece = board.get_piece_at_square(origin)
+            if isinstance(piece, King) and piece.side == by_side:
+                return True
+
+        # an attacking pawn sits one step behind the target square from its own point of view
+        pawn_row = square.row - board.get_player_direction(by_side)
+        for pawn_col in [square.col - 1, square.col + 1]:
+            origin = ChessBoardSquare(pawn_row, pawn_col)
+            if board.square_is_on_board(origin):
+                piece = board.get_piece_at_square(origin)
+                if isinstance(piece, Pawn) and piece.side == by_side:
+                    return True
+
+        return self._ray_hits(self.rook_rays[square], by_side, (Rook, Queen), board) or \
+            self._ray_hits(self.bishop_rays[square], by_side, (Bishop, Queen), board)
+
+class AttackMap:
+    """
+    Per-side attack counts for a single board, kept in sync incrementally.
+
+    Call update() with the squares whose contents changed after every board mutation.
+    Only pieces standing on those squares, and sliding pieces whose rays touch them,
+    have their attacks recomputed.
+    """
+
+    def __init__(self, tables: AttackTables, board: ChessBoard):
+        self.tables = tables
+        self.board = board
+        self.attacks_from: Dict[ChessBoardSquare, Tuple[ChessPiece, Set[ChessBoardSquare]]] = dict()
+        self.attack_counts: Dict[PlayerSide, Dict[ChessBoardSquare, int]] = {
+            PlayerSide.White: dict(),
+            PlayerSide.Black: dict()
+        }
+
+        for side in [PlayerSide.White, PlayerSide.Black]:
+            for origin in board.get_player_piece_positions(side):
+                self._add_origin(origin)
+
+    def _add_origin(self, origin: ChessBoardSquare) -> None:
+        piece = self.board.get_piece_at_square(origin)
+        attacked = self.tables.get_attacked_squares_from(origin, self.board)
+        self.attacks_from[origin] = (piece, attacked)
+
+        side_counts = self.attack_counts[piece.side]
+        for square in attacked:
+            side_counts[square] = side_counts.get(square, 0) + 1
+
+    def _remove_origin(self, origin: ChessBoardSquare) -> None:
+        if origin not in self.attacks_from:
+            return
+
+        piece, attacked = self.attacks_from.pop(origin)
+        side_counts = self.attack_counts[piece.side]
+        for square in attacked:
+            side_counts[square] -= 1
+            if side_counts[square] == 0:
+                del side_counts[square]
+
+    def update(self, changed_squares: Iterable[ChessBoardSquare]) -> None:
+        changed = set(changed_squares)
+
+        # a sliding piece's rays end on the first occupied square,
+        # so its attacks only change when a square it currently attacks changes
+        dirty = set(changed)
+        for origin, (piece, attacked) in self.attacks_from.items():
+            if isinstance(piece, (Rook, Bishop, Queen)) and not attacked.isdisjoint(changed):
+                dirty.add(origin)
+
+        for origin in dirty:
+            self._remove_origin(origin)
+        for origin in dirty:
+            if self.board.get_piece_at_square(origin) is not None:
+                self._add_origin(origin)
+
+    def is_attacked(self, square: ChessBoardSquare, by_side: PlayerSide) -> bool:
+        return square in self.attack_counts[by_side]
+
+    def get_attacked_squares(self, by_side: PlayerSide) -> Set[ChessBoardSquare]:
+        return set(self.attack_counts[by_side].keys())
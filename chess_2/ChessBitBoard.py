@@ -0,0 +1,144 @@
+from typing import Any, Dict, List, Optional, Tuple
+from ChessBoard import ChessBoard
+from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
+from common import PlayerSide, ChessBoardSquare
+from exceptions import NoChessPieceAtSquareWhenThereShouldBeException
+
+# square (row, col) is stored at bit row * 8 + col
+# so walking set bits from least significant to most significant
+# visits squares in the same row-major order as ChessBoard
+_SQUARES: List[ChessBoardSquare] = [
+    ChessBoardSquare(index // ChessBoard.BOARD_SIZE, index % ChessBoard.BOARD_SIZE)
+    for index in range(ChessBoard.BOARD_SIZE * ChessBoard.BOARD_SIZE)
+]
+
+_PIECE_TYPES: List[type] = [Pawn, Knight, Bishop, Rook, Queen, King]
+_SIDES: List[PlayerSide] = [PlayerSide.White, PlayerSide.Black]
+
+# one shared piece instance per bitboard
+# pieces compare by type and side, so handing these out is equivalent to fresh instances
+_BITBOARD_PIECES: List[ChessPiece] = [
+    piece_type(side) for side in _SIDES for piece_type in _PIECE_TYPES
+]
+
+_PIECE_INDEX: Dict[Tuple[type, PlayerSide], int] = {
+    (type(piece), piece.side): i for i, piece in enumerate(_BITBOARD_PIECES)
+}
+
+def _side_index(side: PlayerSide) -> int:
+    return 0 if side == PlayerSide.White else 1
+
+def _square_index(square: ChessBoardSquare) -> int:
+    return square.row * ChessBoard.BOARD_SIZE + square.col
+
+def iterate_bits(bitboard: int) -> List[ChessBoardSquare]:
+    squares: List[ChessBoardSquare] = list()
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        squares.append(_SQUARES[lowest_bit.bit_length() - 1])
+        bitboard ^= lowest_bit
+    return squares
+
+class ChessBitBoard(ChessBoard):
+    """
+    A chess board backed by twelve 64-bit integer bitboards,
+    one per piece type and side, plus an occupancy mask per side.
+
+    Exposes the same API as ChessBoard, so it can be handed to ChessGame directly.
+    The `board` attribute is a read-only grid view built on demand.
+    """
+
+    def __init__(self, empty_board=False):
+        self.piece_bitboards: List[int] = [0] * len(_BITBOARD_PIECES)
+        self.occupancy: List[int] = [0, 0]
+        self.undo_stack: List[Tuple[Any, List[Tuple[ChessBoardSquare, Optional[ChessPiece]]]]] = list()
+
+        if not empty_board:
+            self._load_grid(self.get_initial_board_state())
+
+    @classmethod
+    def from_board(cls, board: ChessBoard) -> Any: # ChessBitBoard
+        bit_board = cls(empty_board=True)
+        bit_board._load_grid(board.board)
+        return bit_board
+
+    def _load_grid(self, grid: List[List[Optional[ChessPiece]]]) -> None:
+        for i in range(self.BOARD_SIZE):
+            for j in range(self.BOARD_SIZE):
+                if grid[i][j] is not None:
+                    self.set_square(ChessBoardSquare(i, j), grid[i][j])
+
+    @property
+    def board(self) -> List[List[Optional[ChessPiece]]]:
+        grid = self.get_empty_board()
+        for piece_index, bitboard in enumerate(self.piece_bitboards):
+            for square in iterate_bits(bitboard):
+                grid[square.row][square.col] = _BITBOARD_PIECES[piece_index]
+        return grid
+
+    def get_player_piece_positions(self, side: PlayerSide) -> List[ChessBoardSquare]:
+        return iterate_bits(self.occupancy[_side_index(side)])
+
+    def get_king_position(self, side: PlayerSide) -> ChessBoardSquare:
+        king_bitboard = self.piece_bitboards[_PIECE_INDEX[(King, side)]]
+        if not king_bitboard:
+            raise ValueError(f"No King found for player {side.name}")
+
+        return _SQUARES[king_bitboard.bit_length() - 1]
+
+    def _get_piece_index(self, bit: int) -> Optional[int]:
+        if self.occupancy[0] & bit:
+            start = 0
+        elif self.occupancy[1] & bit:
+            start = len(_PIECE_TYPES)
+        else:
+            return None
+
+        for piece_index in range(start, start + len(_PIECE_TYPES)):
+            if self.piece_bitboards[piece_index] & bit:
+                return piece_index
+
+        raise ValueError(f"occupancy mask and piece bitboards are out of sync at bit {bit.bit_length() - 1}")
+
+    def get_piece_at_square(self, square: ChessBoardSquare) -> Optional[ChessPiece]:
+        self.validate_square(square)
+        piece_index = self._get_piece_index(1 << _square_index(square))
+        return None if piece_index is None else _BITBOARD_PIECES[piece_index]
+
+    def clear_square(self, square: ChessBoardSquare) -> None:
+        bit = 1 << _square_index(square)
+        piece_index = self._get_piece_index(bit)
+        if piece_index is not None:
+            self.piece_bitboards[piece_index] ^= bit
+            self.occupancy[piece_index // len(_PIECE_TYPES)] ^= bit
+
+    def set_square(self, square: ChessBoardSquare, piece: ChessPiece) -> None:
+        self.clear_square(square)
+        if piece is not None:
+            bit = 1 << _square_index(square)
+            piece_index = _PIECE_INDEX[(type(piece), piece.side)]
+            self.piece_bitboards[piece_index] |= bit
+            self.occupancy[piece_index // len(_PIECE_TYPES)] |= bit
+
+    def move_piece(self, origin: ChessBoardSquare, destination: ChessBoardSquare) -> None:
+        origin_bit = 1 << _square_index(origin)
+        piece_index = self._get_piece_index(origin_bit)
+        if piece_index is None:
+            raise NoChessPieceAtSquareWhenThereShouldBeException(origin)
+
+        self.clear_square(destination)
+        destination_bit = 1 << _square_index(destination)
+        self.piece_bitboards[piece_index] ^= origin_bit | destination_bit
+        self.occupancy[piece_index // len(_PIECE_TYPES)] ^= origin_bit | destination_bit
+
+    def __eq__(self, other):
+        if isinstance(other, ChessBitBoard):
+            return self.piece_bitboards == other.piece_bitboards
+        else:
+            return super().__eq__(other)
+
+    def clone(self) -> Any: # ChessBitBoard
+        new_board = ChessBitBoard(empty_board=True)
+        new_board.piece_bitboards = self.piece_bitboards.copy()
+        new_board.occupancy = self.occupancy.copy()
+        return new_board
@@ -1,9 +1,9 @@
 from collections import namedtuple
-from typing import List, Union, Optional, Tuple, Any
+from typing import Dict, List, Union, Optional, Tuple, Any
 from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
 from enum import Enum
 from common import PlayerSide
-from exceptions import SquareNotOnBoardException, NoChessPieceAtSquareWhenThereShouldBeException
+from exceptions import BoardIndexInconsistentException, SquareNotOnBoardException, NoChessPieceAtSquareWhenThereShouldBeException
 from common import ChessBoardSquare
 
 class SquareColor(Enum):
@@ -17,25 +17,73 @@ class ChessBoard:
 
     BOARD_SIZE = 8
 
-    def __init__(self, empty_board=False):
+    # defaults for subclasses that keep their own representation instead of the grid and piece index
+    debug_checks = False
+    _debug_checks_deferred = 0
+
+    def __init__(self, empty_board=False, debug_checks=False):
         self.board = self.get_empty_board() if empty_board else self.get_initial_board_state()
+        # (move, previous contents of every square the move touched)
+        self.undo_stack: List[Tuple[Any, List[Tuple[ChessBoardSquare, Optional[ChessPiece]]]]] = list()
+
+        # piece index: the occupied squares of each side and where the kings are
+        # kept in sync with the grid by set_square, clear_square and move_piece
+        self.piece_squares: Dict[PlayerSide, Dict[ChessBoardSquare, ChessPiece]] = dict()
+        self.king_squares: Dict[PlayerSide, ChessBoardSquare] = dict()
+        # verify the index against the grid after every change
+        # slow, meant for tests and for tracking down code that writes to the grid directly
+        self.debug_checks = debug_checks
+        # > 0 while a multi-square change is in progress and the board may be in a transient state
+        self._debug_checks_deferred = 0
+        self.rebuild_piece_index()
+
+    def rebuild_piece_index(self) -> None:
+        """
+        rebuild the piece index from the grid, needed after writing to self.board directly
+        """
+        self.piece_squares = {PlayerSide.White: dict(), PlayerSide.Black: dict()}
+        self.king_squares = dict()
+        for i in range(self.BOARD_SIZE):
+            for j in range(self.BOARD_SIZE):
+                if self.board[i][j] is not None:
+                    self._index_add(ChessBoardSquare(i, j), self.board[i][j])
+
+    def _index_add(self, square: ChessBoardSquare, piece: ChessPiece) -> None:
+        self.piece_squares[piece.side][square] = piece
+        if isinstance(piece, King):
+            self.king_squares[piece.side] = square
+
+    def _index_remove(self, square: ChessBoardSquare, piece: ChessPiece) -> None:
+        del self.piece_squares[piece.side][square]
+        if isinstance(piece, King) and self.king_squares.get(piece.side) == square:
+            del self.king_squares[piece.side]
+
+    def check_piece_index(self) -> None:
+        """
+        raise BoardIndexInconsistentException if the piece index does not match the grid
+        """
+        index_piece_squares = self.piece_squares
+        index_king_squares = self.king_squares
+        self.rebuild_piece_index()
+        grid_piece_squares = self.piece_squares
+        grid_king_squares = self.king_squares
+        self.piece_squares = index_piece_squares
+        self.king_squares = index_king_squares
+
+        if index_piece_squares != grid_piece_squares:
+            raise BoardIndexInconsistentException(f"piece squares {index_piece_squares} do not match the grid {grid_piece_squares}")
+        if index_king_squares != grid_king_squares:
+            raise BoardIndexInconsistentException(f"king squares {index_king_squares} do not match the grid {grid_king_squares}")
 
     def get_player_piece_positions(self, side: PlayerSide) -> List[ChessBoardSquare]:
-        return [
-            ChessBoardSquare(i, j)
-            for i in range(self.BOARD_SIZE) 
-            for j in range(self.BOARD_SIZE) 
-            if self.board[i][j] is not None and self.board[i][j].side == side
-            ]
+        return list(self.piece_squares[side])
 
     def get_king_position(self, side: PlayerSide) -> ChessBoardSquare:
-        for i in range(self.BOARD_SIZE):
-            for j in range(self.BOARD_SIZE):
-                piece = self.board[i][j]
-                if isinstance(piece, King) and piece.side == side:
-                    return ChessBoardSquare(i, j)
-        
-        raise ValueError(f"No King found for player {side.name}")
+        king_square = self.king_squares.get(side)
+        if king_square is None:
+            raise ValueError(f"No King found for player {side.name}")
+
+        return king_square
 
     def get_player_direction(self, side: PlayerSide) -> int:
         if side == PlayerSide.White:
@@ -87,17 +135,78 @@ class ChessBoard:
         return self.board[square.row][square.col]
 
     def clear_square(self, square: ChessBoardSquare) -> None:
-        self.board[square.row][square.col] = None
-
-    def set_square(self, square: ChessBoardSquare, piece: ChessPiece) -> None:
+        old_piece = self.board[square.row][square.col]
+        if old_piece is not None:
+            self._index_remove(square, old_piece)
+            self.board[square.row][square.col] = None
+
+        if self.debug_checks and not self._debug_checks_deferred:
+            self.check_piece_index()
+
+    def set_square(self, square: ChessBoardSquare, piece: Optional[ChessPiece]) -> None:
+        old_piece = self.board[square.row][square.col]
+        if old_piece is not None:
+            self._index_remove(square, old_piece)
+        if piece is not None:
+            self._index_add(square, piece)
         self.board[square.row][square.col] = piece
 
+        if self.debug_checks and not self._debug_checks_deferred:
+            self.check_piece_index()
+
     def move_piece(self, origin: ChessBoardSquare, destination: ChessBoardSquare) -> None:
         if self.board[origin.row][origin.col] is None:
             raise NoChessPieceAtSquareWhenThereShouldBeException(origin)
         
-        self.board[destination.row][destination.col] = self.board[origin.row][origin.col]
-        self.board[origin.row][origin.col] = None
+        self._debug_checks_deferred += 1
+        try:
+            self.set_square(destination, self.board[origin.row][origin.col])
+            self.clear_square(origin)
+        finally:
+            self._end_deferred_checks()
+
+    def _end_deferred_checks(self) -> None:
+        self._debug_checks_deferred -= 1
+        if self.debug_checks and not self._debug_checks_deferred:
+            self.check_piece_index()
+
+    def make_move(self, move) -> None: # move is ChessMoveBase
+        """
+        apply a move in place, recording what it overwrote so unmake_move can restore it
+        """
+        touched_squares = {
+            *move.chess_squares_with_pieces_removed,
+            *(square for square, _ in move.chess_squares_with_pieces_added)
+        }
+        self.undo_stack.append(
+            (move, [(square, self.get_piece_at_square(square)) for square in touched_squares])
+        )
+
+        self._debug_checks_deferred += 1
+        try:
+            for removed in move.chess_squares_with_pieces_removed:
+                self.clear_square(removed)
+            for added, piece in move.chess_squares_with_pieces_added:
+                self.set_square(added, piece)
+        finally:
+            self._end_deferred_checks()
+
+    def unmake_move(self) -> Any: # ChessMoveBase
+        """
+        revert the most recent make_move and return the move that was reverted
+        """
+        if len(self.undo_stack) == 0:
+            raise ValueError("no move to unmake")
+
+        move, previous_contents = self.undo_stack.pop()
+        self._debug_checks_deferred += 1
+        try:
+            for square, piece in previous_contents:
+                self.set_square(square, piece)
+        finally:
+            self._end_deferred_checks()
+
+        return move
 
     def __str__(self):
         # There is a dependency on the printing format in test output highlighting
@@ -124,9 +233,11 @@ class ChessBoard:
                 )
 
     def clone(self) -> Any: #ChessBoard
-        new_board = ChessBoard(empty_board=True)
+        new_board = ChessBoard(empty_board=True, debug_checks=self.debug_checks)
         for i in range(self.BOARD_SIZE):
             for j in range(self.BOARD_SIZE):
                 new_board.board[i][j] = self.board[i][j]
-        
+
+        new_board.piece_squares = {side: dict(squares) for side, squares in self.piece_squares.items()}
+        new_board.king_squares = dict(self.king_squares)
         return new_board
@@ -1,7 +1,11 @@
 from ChessBoard import ChessBoard, ChessBoardSquare
-from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
+from ChessAttacks import AttackMap, AttackTables
+from ChessGameState import GameState, KING_SIDE_RIGHT, QUEEN_SIDE_RIGHT, parse_fen, to_fen
+from ChessZobrist import TranspositionTable, ZobristHash
+from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece, PIECE_CODES, PIECES
 from common import PlayerSide
-from typing import Iterable, List, Set, Tuple, Optional
+from typing import Any, Iterable, Iterator, List, Set, Tuple, Optional
+from array import array
 from enum import Enum
 from abc import ABC
 
@@ -38,8 +42,33 @@ class CastleSide(Enum):
         # it works differently with enum so instanceof or type is type doesn't work
         return self.value == other.value
 
+# move encodings pack into 16 bits:
+# from square (6 bits) | to square (6 bits) | move flag (2 bits) | promotion piece (2 bits)
+MOVE_FLAG_NORMAL = 0
+MOVE_FLAG_EN_PASSANT = 1
+MOVE_FLAG_CASTLE = 2
+MOVE_FLAG_PROMOTION = 3
+
+# squares by index, row * 8 + col, so decoding never allocates squares
+_SQUARES: List[ChessBoardSquare] = [
+    ChessBoardSquare(row, col) for row in range(ChessBoard.BOARD_SIZE) for col in range(ChessBoard.BOARD_SIZE)
+]
+
+def _square_index(square: ChessBoardSquare) -> int:
+    return square.row * ChessBoard.BOARD_SIZE + square.col
+
 class ChessMoveBase(ABC):
     # this class should never be instantiated directly
+    __slots__ = (
+        "from_square",
+        "to_square",
+        "moved_piece",
+        "chess_squares_with_pieces_removed",
+        "chess_squares_with_pieces_added",
+    )
+
+    MOVE_FLAG = MOVE_FLAG_NORMAL
+
     def __init__(self, 
                  from_square: ChessBoardSquare, 
                  to_square: ChessBoardSquare, 
@@ -50,20 +79,42 @@ class ChessMoveBase(ABC):
         self.from_square = from_square
         self.to_square = to_square
         self.moved_piece = moved_piece
-        self.chess_squares_with_pieces_removed: Set[ChessBoardSquare] = set(chess_squares_with_pieces_removed).union({from_square, to_square})
-        self.chess_squares_with_pieces_added: Set[Tuple[ChessBoardSquare, ChessPiece]] = set(chess_squares_with_pieces_added).union({(to_square, moved_piece)})
+        # tuples without duplicates, much smaller than sets for the two or three entries a move has
+        self.chess_squares_with_pieces_removed: Tuple[ChessBoardSquare, ...] = tuple(
+            set(chess_squares_with_pieces_removed).union({from_square, to_square})
+        )
+        self.chess_squares_with_pieces_added: Tuple[Tuple[ChessBoardSquare, ChessPiece], ...] = tuple(
+            set(chess_squares_with_pieces_added).union({(to_square, moved_piece)})
+        )
+
+    def encode(self) -> int:
+        return _square_index(self.from_square) | (_square_index(self.to_square) << 6) | (self.MOVE_FLAG << 12)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ChessMoveBase) and self.encode() == other.encode()
+
+    def __hash__(self) -> int:
+        return self.encode()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.from_square}, {self.to_square}, {self.moved_piece!r})"
 
 class ChessMoveWithCapture(ChessMoveBase):
+    __slots__ = ()
+
     def __init__(self, from_square: ChessBoardSquare, to_square: ChessBoardSquare, moved_piece: ChessPiece):
-        super().__init__(
-            from_square=from_square,
-            to_square=to_square,
-            moved_piece=moved_piece,
-            chess_squares_with_pieces_removed=[from_square, to_square],
-            chess_squares_with_pieces_added=[(to_square, moved_piece)]
-        )
+        # by far the most generated move, so the tuples are built directly
+        self.from_square = from_square
+        self.to_square = to_square
+        self.moved_piece = moved_piece
+        self.chess_squares_with_pieces_removed = (from_square, to_square)
+        self.chess_squares_with_pieces_added = ((to_square, moved_piece),)
 
 class EnPassantMove(ChessMoveBase):
+    __slots__ = ()
+
+    MOVE_FLAG = MOVE_FLAG_EN_PASSANT
+
     def __init__(self, from_square: ChessBoardSquare, to_square: ChessBoardSquare, player_side: PlayerSide):
         en_passant_target = ChessBoardSquare(from_square.row, to_square.col)
         moved_pawn = Pawn(player_side)
@@ -76,9 +127,34 @@ class EnPassantMove(ChessMoveBase):
             chess_squares_with_pieces_added=[(to_square, moved_pawn)]
         )
 
+def _castle_squares(back_row: int, rook_col: int, king_to_col: int, rook_to_col: int, side: PlayerSide):
+    king_from = ChessBoardSquare(back_row, 4)
+    king_to = ChessBoardSquare(back_row, king_to_col)
+    chess_squares_with_pieces_removed = (king_from, ChessBoardSquare(back_row, rook_col), king_to)
+    chess_squares_with_pieces_added = (
+        (ChessBoardSquare(back_row, rook_to_col), Rook(side)),
+        (king_to, King(side))
+    )
+    return chess_squares_with_pieces_removed, chess_squares_with_pieces_added
+
+# (player side, king destination col) -> (squares cleared, pieces placed)
+# there are only four castling maneuvers, so every CastleMove shares these tuples
+_CASTLE_SQUARES = {
+    # white is at bottom of board, black at the top
+    # king side: king to the right, queen side: king to the left
+    (PlayerSide.White, 6): _castle_squares(7, 7, 6, 5, PlayerSide.White),
+    (PlayerSide.Black, 6): _castle_squares(0, 7, 6, 5, PlayerSide.Black),
+    (PlayerSide.White, 2): _castle_squares(7, 0, 2, 3, PlayerSide.White),
+    (PlayerSide.Black, 2): _castle_squares(0, 0, 2, 3, PlayerSide.Black),
+}
+
 # TODO simplify castling constructor to just take castle_side and player_side
 # and infer the correct squares and pieces for super constructor
 class CastleMove(ChessMoveBase):
+    __slots__ = ()
+
+    MOVE_FLAG = MOVE_FLAG_CASTLE
+
     def __init__(self,
                  from_square: ChessBoardSquare,
                  to_square: ChessBoardSquare,
@@ -86,72 +162,25 @@ class CastleMove(ChessMoveBase):
                  ):
         
         # infer castle side
-        if to_square.col == 6:
-            # it's king side
-            castle_side = CastleSide.KingSide
-        elif to_square.col == 2:
-            castle_side = CastleSide.QueenSide
-        else:
+        if to_square.col not in [6, 2]:
+            # 6 is king side, 2 is queen side
             raise InvalidEnumOrClassException(CastleSide, to_square.col)
 
-        match (castle_side, player_side):
-            case (CastleSide.KingSide, PlayerSide.White):
-                # white is at bottom of board
-                # king is to the right
-                chess_squares_with_pieces_removed = [
-                    ChessBoardSquare(7, 4), # white king
-                    ChessBoardSquare(7, 7) # white right rook
-                ]
-                chess_squares_with_pieces_added = [
-                    (ChessBoardSquare(7, 5), Rook(PlayerSide.White)),
-                    (ChessBoardSquare(7, 6), King(PlayerSide.White))
-                ]
-            case (CastleSide.KingSide, PlayerSide.Black):
-                # black is at top of board
-                # king is to the right
-                chess_squares_with_pieces_removed = [
-                    ChessBoardSquare(0, 4), # black king
-                    ChessBoardSquare(0, 7) # black right rook
-                ]
-                chess_squares_with_pieces_added = [
-                    (ChessBoardSquare(0, 5), Rook(PlayerSide.Black)),
-                    (ChessBoardSquare(0, 6), King(PlayerSide.Black))
-                ]
-            case (CastleSide.QueenSide, PlayerSide.White):
-                # white is at bottom of board
-                # queen is to the left
-                chess_squares_with_pieces_removed = [
-                    ChessBoardSquare(7, 4), # white king
-                    ChessBoardSquare(7, 0) # white left rook
-                ]
-                chess_squares_with_pieces_added = [
-                    (ChessBoardSquare(7, 3), Rook(PlayerSide.White)),
-                    (ChessBoardSquare(7, 2), King(PlayerSide.White))
-                ]  
-            case (CastleSide.QueenSide, PlayerSide.Black):
-                # black is at top of board
-                # queen is to the left
-                chess_squares_with_pieces_removed = [
-                    ChessBoardSquare(0, 4), # black king
-                    ChessBoardSquare(0, 0) # black right rook
-                ]
-                chess_squares_with_pieces_added = [
-                    (ChessBoardSquare(0, 3), Rook(PlayerSide.Black)),
-                    (ChessBoardSquare(0, 2), King(PlayerSide.Black))
-                ]                
-            case _:
-                # TODO create a better exception for this
-                raise ChessGameException(f"invalid castling maneuver")
+        castle_squares = _CASTLE_SQUARES.get((player_side, to_square.col))
+        if castle_squares is None:
+            # TODO create a better exception for this
+            raise ChessGameException(f"invalid castling maneuver")
 
-        super().__init__(
-            from_square=from_square,
-            to_square=to_square,
-            moved_piece=King(player_side),
-            chess_squares_with_pieces_removed=chess_squares_with_pieces_removed,
-            chess_squares_with_pieces_added=chess_squares_with_pieces_added
-            )
+        self.from_square = from_square
+        self.to_square = to_square
+        self.moved_piece = King(player_side)
+        self.chess_squares_with_pieces_removed, self.chess_squares_with_pieces_added = castle_squares
 
 class PromotionMove(ChessMoveBase):
+    __slots__ = ()
+
+    MOVE_FLAG = MOVE_FLAG_PROMOTION
+
     def __init__(self, from_square: ChessBoardSquare, to_square: ChessBoardSquare, piece_to_create: ChessPiece):
         chess_squares_with_pieces_removed = [
             from_square, to_square
@@ -161,6 +190,9 @@ class PromotionMove(ChessMoveBase):
         ]
         super().__init__(from_square, to_square, piece_to_create, chess_squares_with_pieces_removed, chess_squares_with_pieces_added)
 
+    def encode(self) -> int:
+        return super().encode() | (pawn_promotion_options.index(type(self.moved_piece)) << 14)
+
 pawn_promotion_options: List[ChessPiece] = [
     Rook,
     Bishop,
@@ -168,7 +200,29 @@ pawn_promotion_options: List[ChessPiece] = [
     Knight
 ]
 
+def decode_move(encoded_move: int, board: ChessBoard) -> ChessMoveBase:
+    """
+    rebuild a move from ChessMoveBase.encode, for the board it was generated on
+    """
+    from_square = _SQUARES[encoded_move & 63]
+    to_square = _SQUARES[(encoded_move >> 6) & 63]
+    move_flag = (encoded_move >> 12) & 3
+    moved_piece = board.get_piece_at_square(from_square)
+    if moved_piece is None:
+        raise NoChessPieceAtSquareWhenThereShouldBeException(from_square)
+
+    if move_flag == MOVE_FLAG_NORMAL:
+        return ChessMoveWithCapture(from_square, to_square, moved_piece)
+    elif move_flag == MOVE_FLAG_EN_PASSANT:
+        return EnPassantMove(from_square, to_square, moved_piece.side)
+    elif move_flag == MOVE_FLAG_CASTLE:
+        return CastleMove(from_square, to_square, moved_piece.side)
+    else:
+        return PromotionMove(from_square, to_square, pawn_promotion_options[encoded_move >> 14](moved_piece.side))
+
 class ChessGameTurn:
+    __slots__ = ("from_square", "from_square_piece", "to_square", "to_square_piece")
+
     def __init__(self,
                  from_square: ChessBoardSquare,
                  from_square_piece: ChessPiece,
@@ -195,14 +249,109 @@ class ChessGameTurn:
                self.to_square == other.to_square and \
                self.to_square_piece == other.to_square_piece
 
+class TurnHistory:
+    """
+    The turns of a game, packed into one int each:
+    from square (6 bits) | to square (6 bits) | moved piece code (4 bits) | captured piece code (4 bits)
+
+    Behaves like a list of ChessGameTurn, which are built on access.
+    """
+
+    __slots__ = ("_packed_turns",)
+
+    def __init__(self, turns: Iterable[ChessGameTurn] = ()):
+        self._packed_turns = array("I")
+        for turn in turns:
+            self.append(turn)
+
+    @staticmethod
+    def _pack(turn: ChessGameTurn) -> int:
+        return _square_index(turn.from_square) | \
+            (_square_index(turn.to_square) << 6) | \
+            (PIECE_CODES[turn.from_square_piece] << 12) | \
+            (PIECE_CODES[turn.to_square_piece] << 16)
+
+    @staticmethod
+    def _unpack(packed_turn: int) -> ChessGameTurn:
+        return ChessGameTurn(
+            _SQUARES[packed_turn & 63],
+            PIECES[(packed_turn >> 12) & 15],
+            _SQUARES[(packed_turn >> 6) & 63],
+            PIECES[(packed_turn >> 16) & 15]
+        )
+
+    def append(self, turn: ChessGameTurn) -> None:
+        self._packed_turns.append(self._pack(turn))
+
+    def pop(self) -> ChessGameTurn:
+        return self._unpack(self._packed_turns.pop())
+
+    def __len__(self) -> int:
+        return len(self._packed_turns)
+
+    def __getitem__(self, index: int) -> ChessGameTurn:
+        if isinstance(index, slice):
+            return [self._unpack(packed_turn) for packed_turn in self._packed_turns[index]]
+        return self._unpack(self._packed_turns[index])
+
+    def __iter__(self) -> Iterator[ChessGameTurn]:
+        return (self._unpack(packed_turn) for packed_turn in self._packed_turns)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TurnHistory):
+            return self._packed_turns == other._packed_turns
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
 class ChessGame:
 
-    def __init__(self):
-        self.board = ChessBoard()
-        self.player_turn = PlayerSide.White
+    # shared by all games, built on first use
+    _attack_tables: Optional[AttackTables] = None
+
+    TRANSPOSITION_TABLE_SIZE = 10000
+
+    def __init__(self,
+                 board: Optional[ChessBoard] = None,
+                 player_turn: PlayerSide = PlayerSide.White,
+                 transposition_table: Optional[TranspositionTable] = None,
+                 state: Optional[GameState] = None):
+        # any ChessBoard implementation can back the game, e.g. ChessBitBoard
+        self.board = board if board is not None else ChessBoard()
+        self.player_turn = player_turn
         self.turn_index = 1
         self.game_status = GameStatus.NOT_CONCLUDED
-        self.turn_history: List[ChessGameTurn] = list()
+        self.turn_history = TurnHistory()
+
+        # castling rights, en passant target and clocks, replaced on every move
+        # without a given state, castling is allowed wherever king and rook are on their home squares
+        self.state = state if state is not None else GameState.from_board(self.board)
+        self.state_history: List[GameState] = list()
+
+        # kept in sync with self.board by update_board_for_move
+        self.attack_map = AttackMap(self.get_attack_tables(), self.board)
+        self.zobrist = ZobristHash(self.board, self.player_turn, state=self.state)
+
+        # hashes are comparable between games, so a table can be shared to reuse results across a game collection
+        self.transposition_table = transposition_table if transposition_table is not None \
+            else TranspositionTable(self.TRANSPOSITION_TABLE_SIZE)
+
+    @classmethod
+    def from_fen(cls, fen: str, board_type: type = ChessBoard, transposition_table: Optional[TranspositionTable] = None) -> Any: # ChessGame
+        board, player_turn, state = parse_fen(fen, board_type)
+        return cls(board, player_turn, transposition_table, state)
+
+    def to_fen(self) -> str:
+        return to_fen(self.board, self.player_turn, self.state)
+
+    def get_attack_tables(self) -> AttackTables:
+        if ChessGame._attack_tables is None:
+            ChessGame._attack_tables = AttackTables(self._move_directional_piece)
+        return ChessGame._attack_tables
     
     def set_next_turn(self) -> None:
         self.turn_index += 1
@@ -214,8 +363,15 @@ class ChessGame:
         else:
             raise InvalidEnumOrClassException(PlayerSide, self.player_turn)
 
+    def is_square_attacked(self, square: ChessBoardSquare, by_side: PlayerSide, board: ChessBoard) -> bool:
+        if board is self.attack_map.board:
+            return self.attack_map.is_attacked(square, by_side)
+        else:
+            # scratch boards have no attack map, look outward from the square instead
+            return self.get_attack_tables().is_square_attacked(square, by_side, board)
+
     def player_is_in_check(self, player: PlayerSide, board:ChessBoard) -> bool:
-        return board.get_king_position(player) in self.get_squares_threatened_by_player(player.get_opponent(), board)
+        return self.is_square_attacked(board.get_king_position(player), player.get_opponent(), board)
 
     def player_has_move_to_not_check(self, player: PlayerSide, board: ChessBoard) -> bool:
         player_piece_positions = board.get_player_piece_positions(player)
@@ -227,9 +383,7 @@ class ChessGame:
                 break
             else:
                 for piece_move in self.get_precheck_moves_for_piece_at_square(square, board):
-                    new_board: ChessBoard = board.clone()
-                    self.update_board_for_move(new_board, piece_move)
-                    if not self.player_is_in_check(player, new_board):
+                    if not self.move_results_in_self_check(piece_move, board, player):
                         player_has_move_resulting_in_not_check = True
                         break
         
@@ -238,6 +392,15 @@ class ChessGame:
     # it is this player's turn
     # need to only check 1 turn from now
     def get_player_check_status(self, player: PlayerSide, board:ChessBoard) -> CheckStatus:
+        if board is self.board and player == self.player_turn:
+            entry = self.transposition_table.get_or_create(self.zobrist.value)
+            if entry.check_status is None:
+                entry.check_status = self._compute_player_check_status(player, board)
+            return entry.check_status
+        else:
+            return self._compute_player_check_status(player, board)
+
+    def _compute_player_check_status(self, player: PlayerSide, board:ChessBoard) -> CheckStatus:
 
         # opponent is currently threaning player's king
         # we don't need to check valid moves for the opponent's pieces
@@ -261,13 +424,15 @@ class ChessGame:
             raise InvalidEnumOrClassException(CheckStatus, f"player_in_check:{player_in_check}, player_has_move_resulting_in_not_check:{player_has_move_resulting_in_not_check}")
 
     def move_results_in_self_check(self, move: ChessMoveBase, board: ChessBoard, player_side:PlayerSide):
-        new_board: ChessBoard = board.clone()
-        for removed in move.chess_squares_with_pieces_removed:
-            new_board.clear_square(removed)
-        for addded, piece in move.chess_squares_with_pieces_added:
-            new_board.set_square(addded, piece)
-
-        return self.player_is_in_check(player_side, new_board)
+        # try the move on the board itself and take it back afterwards
+        # the attack map does not follow probe moves, so scan the board directly
+        board.make_move(move)
+        try:
+            return self.get_attack_tables().is_square_attacked(
+                board.get_king_position(player_side), player_side.get_opponent(), board
+            )
+        finally:
+            board.unmake_move()
 
     def get_knight_moves(self, origin_square: ChessBoardSquare, board: ChessBoard) -> List[ChessMoveWithCapture]:
         this_piece = board.get_piece_at_square(origin_square)
@@ -306,7 +471,7 @@ class ChessGame:
         valid_moves: List[ChessMoveWithCapture | PromotionMove | EnPassantMove] = list()
 
         def get_promotion_moves(target_square: ChessBoardSquare) -> Iterable[PromotionMove]:
-            return (PromotionMove(origin_square, target_square, piece) for piece in pawn_promotion_options)
+            return (PromotionMove(origin_square, target_square, piece_type(this_piece.side)) for piece_type in pawn_promotion_options)
 
         # the pawn is one step away from promotion
         # next step can only be promotion
@@ -344,42 +509,19 @@ class ChessGame:
                     else:
                         valid_moves.append(ChessMoveWithCapture(origin_square, square, this_piece))
         
-        # - an opposing pawn takes 2-step 
-        # - that pawn is adjacent to current player's pawn
-        # - this pawn can move behind opposing's 2-step pawn
-        if len(self.turn_history) > 0:
-            last_turn = self.turn_history[-1]
-            if isinstance(last_turn.from_square_piece, Pawn) \
-                and abs(last_turn.from_square.col - last_turn.to_square.col) == 2:
-                assert last_turn.from_square_piece.side != this_piece.side, \
-                    f"Invalid turn history - last moved piece is the same side as this turn"
-                
-                # opponent pawn did 2-step last turn
-                opponent_2_step_pawn = self.board.get_piece_at_square(last_turn.to_square)
-                assert isinstance(opponent_2_step_pawn, Pawn), \
-                    f"Invalid turn history. Piece at destination square is not a pawn when it must be a pawn"
-
-                if last_turn.to_square.row == origin_square.row \
-                    and abs(last_turn.to_square.col - origin_square.col) == 1:
-                    # they are in the same row and adjacent to each other
-                    # only need to check this one opponent's pawn, because en-passant
-                    # only applies immediately after oponnent did 2-step
-                    # so even if there are 2 adjacent pawns, only this one from last turn
-                    # could still be relevant
-
-                    # technically a regular take and an en-passant take would both add the same target cell
-                    # however for en-passant to be a valid move, then the same target cell for regular take
-                    # is not possible
-                    # so the two cases are disjoint
-
-                    # TODO this doesn't handle removing the captured pawn
-                    valid_moves.append(
-                        EnPassantMove(
-                            origin_square, 
-                            ChessBoardSquare(last_turn.to_square.row  + direction, last_turn.to_square.col), 
-                            this_piece.side
-                        )
-                    )
+        # - an opposing pawn took a 2-step last turn, leaving the en passant target behind it
+        # - this pawn is adjacent to that pawn, one step away from the target
+        en_passant_target = self.state.en_passant_target
+        if en_passant_target is not None \
+            and en_passant_target.row == origin_square.row + direction \
+            and abs(en_passant_target.col - origin_square.col) == 1:
+            # the 2-step pawn sits next to this one, on the square en passant removes
+            # this also rules out pawns of the side that made the 2-step
+            en_passant_pawn = board.get_piece_at_square(ChessBoardSquare(origin_square.row, en_passant_target.col))
+            if isinstance(en_passant_pawn, Pawn) and en_passant_pawn.side != this_piece.side:
+                # a regular take onto the target square is not possible, it is empty
+                # so the two cases are disjoint
+                valid_moves.append(EnPassantMove(origin_square, en_passant_target, this_piece.side))
 
         return valid_moves
 
@@ -452,16 +594,19 @@ class ChessGame:
         
         this_piece = board.get_piece_at_square(origin_square)
 
-        if not any(king_move for king_move in self.turn_history if king_move.from_square_piece == this_piece):
+        back_row = board.get_player_back_row(this_piece.side)
+
+        # a position set up without history can have the king off its home square
+        if origin_square == ChessBoardSquare(back_row, 4) and \
+            self.state.castling_rights & (KING_SIDE_RIGHT[this_piece.side] | QUEEN_SIDE_RIGHT[this_piece.side]):
             # if the king hasn't moved, then it can still castle
 
-            opponent_target_squares: Set[ChessBoardSquare] = self.get_squares_threatened_by_player(this_piece.side.get_opponent(), board)
+            opponent_side = this_piece.side.get_opponent()
 
             # king side 4, 5, 6, 7
-            back_row = board.get_player_back_row(this_piece.side)
-
             king_side_rook_square = ChessBoardSquare(back_row, 7)
-            if not any(rook_move for rook_move in self.turn_history if rook_move.from_square == king_side_rook_square):
+            if board.get_piece_at_square(king_side_rook_square) == Rook(this_piece.side) and \
+                self.state.has_castling_right(KING_SIDE_RIGHT[this_piece.side]):
                 # both king and rook are able to castle
 
                 king_side_castle_squares = {
@@ -470,7 +615,7 @@ class ChessGame:
                 }
 
                 # now evaluate check conditions
-                if opponent_target_squares.isdisjoint(king_side_castle_squares) and \
+                if not any(self.is_square_attacked(square, opponent_side, board) for square in king_side_castle_squares) and \
                     all(board.get_piece_at_square(square) is None for square in [ChessBoardSquare(back_row, 5), ChessBoardSquare(back_row, 6)]):
                     # the opponent isn't threatening any square in the kingside castle maneuver
                     # and there are no pieces in the way
@@ -480,7 +625,8 @@ class ChessGame:
             
             # queen side 0, 1, 2, 3, 4
             queen_side_rook_square = ChessBoardSquare(back_row, 0)
-            if not any(rook_move for rook_move in self.turn_history if rook_move.from_square == queen_side_rook_square):
+            if board.get_piece_at_square(queen_side_rook_square) == Rook(this_piece.side) and \
+                self.state.has_castling_right(QUEEN_SIDE_RIGHT[this_piece.side]):
                 # both king and rook are able to castle
 
                 queen_side_castle_squares = {
@@ -489,8 +635,8 @@ class ChessGame:
                 }
 
                 # now evaluate check conditions
-                if opponent_target_squares.isdisjoint(queen_side_castle_squares)  and \
-                    all(board.get_piece_at_square(square) is None for square in [ChessBoardSquare(back_row, 2), ChessBoardSquare(back_row, 3)]):
+                if not any(self.is_square_attacked(square, opponent_side, board) for square in queen_side_castle_squares) and \
+                    all(board.get_piece_at_square(square) is None for square in [ChessBoardSquare(back_row, col) for col in [1, 2, 3]]):
                     # the opponent isn't threatening any square in the Queenside castle maneuver
                     # and there are no pieces in the way
                     valid_moves.append(
@@ -578,6 +724,20 @@ class ChessGame:
         return moves
 
     def get_valid_moves_for_piece_at_square(self, origin_square: ChessBoardSquare, board: ChessBoard) -> List[ChessMoveBase]:
+        if board is self.board:
+            # the hash covers everything move generation depends on, including castling and en passant rights
+            # entries keep moves packed, the moved pieces are still on the board to decode them
+            valid_moves = self.transposition_table.get_or_create(self.zobrist.value).valid_moves
+            encoded_moves = valid_moves.get(origin_square)
+            if encoded_moves is None:
+                computed_moves = self._compute_valid_moves_for_piece_at_square(origin_square, board)
+                valid_moves[origin_square] = array("H", (move.encode() for move in computed_moves))
+                return computed_moves
+            return [decode_move(encoded_move, board) for encoded_move in encoded_moves]
+        else:
+            return self._compute_valid_moves_for_piece_at_square(origin_square, board)
+
+    def _compute_valid_moves_for_piece_at_square(self, origin_square: ChessBoardSquare, board: ChessBoard) -> List[ChessMoveBase]:
         player_side = board.get_piece_at_square(origin_square).side
         return [
                 move for move in self.get_precheck_moves_for_piece_at_square(origin_square, board) 
@@ -585,11 +745,59 @@ class ChessGame:
                 ]
 
     def update_board_for_move(self, board: ChessBoard, move: ChessMoveBase):
+        if board is self.board:
+            self._advance_state(move)
+
         for cleared_square in move.chess_squares_with_pieces_removed:
             board.clear_square(cleared_square)
         for square, piece in move.chess_squares_with_pieces_added:
             board.set_square(square, piece)
 
+        self._update_attack_map_for_move(board, move)
+
+    def _advance_state(self, move: ChessMoveBase) -> None:
+        # must run before the board changes, the hash follows the new state
+        self.state_history.append(self.state)
+        self.state = self.state.after_move(move, self.board)
+        self.zobrist.apply_move(move, self.board, self.state_history[-1], self.state)
+
+    def _update_attack_map_for_move(self, board: ChessBoard, move: ChessMoveBase) -> None:
+        if board is self.attack_map.board:
+            self.attack_map.update(
+                [*move.chess_squares_with_pieces_removed, *(square for square, _ in move.chess_squares_with_pieces_added)]
+            )
+
+    def make_move(self, move: ChessMoveBase) -> ChessGameTurn:
+        """
+        play a move on the game board without validating it or updating the game status
+        every make_move must be reverted by unmake_move, in reverse order
+        """
+        staged_turn = ChessGameTurn(
+            move.from_square,
+            self.board.get_piece_at_square(move.from_square),
+            move.to_square,
+            self.board.get_piece_at_square(move.to_square)
+        )
+
+        self._advance_state(move)
+        self.board.make_move(move)
+        self._update_attack_map_for_move(self.board, move)
+        self.turn_history.append(staged_turn)
+        self.set_next_turn()
+
+        return staged_turn
+
+    def unmake_move(self) -> ChessMoveBase:
+        move = self.board.unmake_move()
+        self._update_attack_map_for_move(self.board, move)
+        self.zobrist.undo_move()
+        self.state = self.state_history.pop()
+        self.turn_history.pop()
+        self.turn_index -= 1
+        self.player_turn = self.player_turn.get_opponent()
+
+        return move
+
     def execute_move(self, from_square: ChessBoardSquare, to_square: ChessBoardSquare, promotion_piece: Optional[ChessPiece]) -> None:
         piece_to_move = self.board.get_piece_at_square(from_square)
         if piece_to_move is None:
@@ -606,6 +814,9 @@ class ChessGame:
         if len(matched_moves) == 0:
             raise InvalidMoveException(piece_to_move, from_square, to_square)
         elif all(isinstance(move, PromotionMove) for move in matched_moves):
+            if isinstance(promotion_piece, type):
+                # parsed moves name the promotion piece by type only
+                promotion_piece = promotion_piece(piece_to_move.side)
             matched_promotion_moves = [move for move in matched_moves if move.moved_piece == promotion_piece]
             if len(matched_promotion_moves) == 1:
                 chosen_move = matched_promotion_moves[0]
@@ -618,6 +829,9 @@ class ChessGame:
 
         self.update_board_for_move(self.board, chosen_move)
 
+    def is_threefold_repetition(self) -> bool:
+        return self.zobrist.get_repetition_count() >= 3
+
     def update_game_status(self) -> None:
         game_status = self.get_player_check_status(self.player_turn, self.board)
         if game_status == CheckStatus.IN_STALEMATE:
@@ -695,10 +909,10 @@ class ChessGame:
             
             # at this stage it's guaranteed that the move is valid
             self.turn_history.append(staged_turn)
-            self.update_game_status()
 
-            if self.game_status == GameStatus.NOT_CONCLUDED:
-                self.set_next_turn()
+            # the status is that of the player who now has to move
+            self.set_next_turn()
+            self.update_game_status()
 
             return staged_turn
         else:
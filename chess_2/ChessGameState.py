@@ -0,0 +1,221 @@
+"""
+The parts of a chess position that are not on the board: castling rights,
+the en passant target square and the move clocks, plus FEN load and save.
+
+https://www.chessprogramming.org/Forsyth-Edwards_Notation
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from ChessBoard import ChessBoard
+from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
+from common import PlayerSide, ChessBoardSquare, FILE_NAMES_ORDERED, chess_algebra_to_chess_square
+
+# castling rights bits
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+ALL_CASTLING_RIGHTS = WHITE_KING_SIDE | WHITE_QUEEN_SIDE | BLACK_KING_SIDE | BLACK_QUEEN_SIDE
+
+KING_SIDE_RIGHT: Dict[PlayerSide, int] = {PlayerSide.White: WHITE_KING_SIDE, PlayerSide.Black: BLACK_KING_SIDE}
+QUEEN_SIDE_RIGHT: Dict[PlayerSide, int] = {PlayerSide.White: WHITE_QUEEN_SIDE, PlayerSide.Black: BLACK_QUEEN_SIDE}
+
+# (king square, rook square, right) for every castling right
+CASTLING_HOME_SQUARES: List[Tuple[ChessBoardSquare, ChessBoardSquare, int]] = [
+    (ChessBoardSquare(7, 4), ChessBoardSquare(7, 7), WHITE_KING_SIDE),
+    (ChessBoardSquare(7, 4), ChessBoardSquare(7, 0), WHITE_QUEEN_SIDE),
+    (ChessBoardSquare(0, 4), ChessBoardSquare(0, 7), BLACK_KING_SIDE),
+    (ChessBoardSquare(0, 4), ChessBoardSquare(0, 0), BLACK_QUEEN_SIDE),
+]
+
+# a right is lost as soon as anything happens on its king or rook home square
+RIGHTS_LOST_BY_SQUARE: Dict[ChessBoardSquare, int] = dict()
+for _king_square, _rook_square, _right in CASTLING_HOME_SQUARES:
+    RIGHTS_LOST_BY_SQUARE[_king_square] = RIGHTS_LOST_BY_SQUARE.get(_king_square, 0) | _right
+    RIGHTS_LOST_BY_SQUARE[_rook_square] = RIGHTS_LOST_BY_SQUARE.get(_rook_square, 0) | _right
+
+_FEN_CASTLING_RIGHTS: List[Tuple[str, int]] = [
+    ("K", WHITE_KING_SIDE),
+    ("Q", WHITE_QUEEN_SIDE),
+    ("k", BLACK_KING_SIDE),
+    ("q", BLACK_QUEEN_SIDE),
+]
+
+FEN_PIECE_MAP: Dict[str, type] = {
+    "p" : Pawn,
+    "n" : Knight,
+    "b" : Bishop,
+    "r" : Rook,
+    "q" : Queen,
+    "k" : King
+}
+
+_FEN_PIECE_CHARS: Dict[type, str] = {piece_type: char for char, piece_type in FEN_PIECE_MAP.items()}
+
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+def get_castling_rights_from_board(board: ChessBoard) -> int:
+    # without history, grant every right whose king and rook are still on their home squares
+    castling_rights = 0
+    for king_square, rook_square, right in CASTLING_HOME_SQUARES:
+        side = PlayerSide.White if king_square.row == 7 else PlayerSide.Black
+        if board.get_piece_at_square(king_square) == King(side) and board.get_piece_at_square(rook_square) == Rook(side):
+            castling_rights |= right
+    return castling_rights
+
+def get_rights_lost_by_move(move) -> int: # move is ChessMoveBase
+    lost_rights = 0
+    for square in move.chess_squares_with_pieces_removed:
+        lost_rights |= RIGHTS_LOST_BY_SQUARE.get(square, 0)
+    return lost_rights
+
+class GameState:
+    """
+    Immutable record of the non-board state of a position.
+    after_move builds the record for the next position, so undoing a move only needs the previous record.
+    """
+
+    __slots__ = ("castling_rights", "en_passant_target", "halfmove_clock", "fullmove_number")
+
+    def __init__(self,
+                 castling_rights: int = ALL_CASTLING_RIGHTS,
+                 en_passant_target: Optional[ChessBoardSquare] = None,
+                 halfmove_clock: int = 0,
+                 fullmove_number: int = 1):
+        self.castling_rights = castling_rights
+        # the square a pawn skipped over with its two-step, which an opposing pawn can capture onto
+        self.en_passant_target = en_passant_target
+        # plies since the last capture or pawn move, for the fifty-move rule
+        self.halfmove_clock = halfmove_clock
+        # starts at 1 and goes up after every black move
+        self.fullmove_number = fullmove_number
+
+    @classmethod
+    def from_board(cls, board: ChessBoard) -> Any: # GameState
+        return cls(castling_rights=get_castling_rights_from_board(board))
+
+    def has_castling_right(self, right: int) -> bool:
+        return bool(self.castling_rights & right)
+
+    def after_move(self, move, board: ChessBoard) -> Any: # move is ChessMoveBase, returns GameState
+        """
+        the state once move is played, must be called before the board is changed
+        """
+        piece_to_move = board.get_piece_at_square(move.from_square)
+        is_pawn_move = isinstance(piece_to_move, Pawn)
+
+        if is_pawn_move and abs(move.from_square.row - move.to_square.row) == 2:
+            en_passant_target = ChessBoardSquare((move.from_square.row + move.to_square.row) // 2, move.from_square.col)
+        else:
+            en_passant_target = None
+
+        # en passant captures are pawn moves, castling never lands on an occupied square
+        if is_pawn_move or board.get_piece_at_square(move.to_square) is not None:
+            halfmove_clock = 0
+        else:
+            halfmove_clock = self.halfmove_clock + 1
+
+        return GameState(
+            castling_rights=self.castling_rights & ~get_rights_lost_by_move(move),
+            en_passant_target=en_passant_target,
+            halfmove_clock=halfmove_clock,
+            fullmove_number=self.fullmove_number + 1 if piece_to_move.side == PlayerSide.Black else self.fullmove_number
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, GameState) and \
+            self.castling_rights == other.castling_rights and \
+            self.en_passant_target == other.en_passant_target and \
+            self.halfmove_clock == other.halfmove_clock and \
+            self.fullmove_number == other.fullmove_number
+
+    def __repr__(self) -> str:
+        return f"GameState({self.castling_rights}, {self.en_passant_target}, {self.halfmove_clock}, {self.fullmove_number})"
+
+def _square_to_chess_algebra(square: ChessBoardSquare) -> str:
+    return f"{list(FILE_NAMES_ORDERED)[square.col]}{ChessBoard.BOARD_SIZE - square.row}"
+
+def parse_fen(fen: str, board_type: type = ChessBoard) -> Tuple[ChessBoard, PlayerSide, GameState]:
+    """
+    parse a FEN string into a board, the side to move and the game state
+    the castling, en passant and clock fields are optional and default to what the board allows
+    """
+    fields = fen.split()
+    if len(fields) == 0:
+        raise ValueError(f"empty FEN string")
+
+    ranks = fields[0].split("/")
+    if len(ranks) != ChessBoard.BOARD_SIZE:
+        raise ValueError(f"invalid FEN piece placement: {fields[0]}")
+
+    board: ChessBoard = board_type(empty_board=True)
+    # FEN lists rank 8 first, which is row 0
+    for row, rank in enumerate(ranks):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+            elif char.lower() in FEN_PIECE_MAP:
+                side = PlayerSide.White if char.isupper() else PlayerSide.Black
+                board.set_square(ChessBoardSquare(row, col), FEN_PIECE_MAP[char.lower()](side))
+                col += 1
+            else:
+                raise ValueError(f"invalid FEN piece character {char} in {fields[0]}")
+        if col != ChessBoard.BOARD_SIZE:
+            raise ValueError(f"invalid FEN rank {rank} in {fields[0]}")
+
+    if len(fields) > 1 and fields[1] not in ["w", "b"]:
+        raise ValueError(f"invalid FEN side to move: {fields[1]}")
+    player_turn = PlayerSide.Black if len(fields) > 1 and fields[1] == "b" else PlayerSide.White
+
+    if len(fields) > 2:
+        castling_rights = 0
+        for char in fields[2]:
+            if char == "-":
+                continue
+            rights = [right for fen_char, right in _FEN_CASTLING_RIGHTS if fen_char == char]
+            if not rights:
+                raise ValueError(f"invalid FEN castling rights: {fields[2]}")
+            castling_rights |= rights[0]
+    else:
+        castling_rights = get_castling_rights_from_board(board)
+
+    en_passant_target = None
+    if len(fields) > 3 and fields[3] != "-":
+        en_passant_target = chess_algebra_to_chess_square(fields[3])
+
+    halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+
+    return board, player_turn, GameState(castling_rights, en_passant_target, halfmove_clock, fullmove_number)
+
+def to_fen(board: ChessBoard, player_turn: PlayerSide, state: GameState) -> str:
+    ranks: List[str] = list()
+    for row in range(ChessBoard.BOARD_SIZE):
+        rank = ""
+        empty_squares = 0
+        for col in range(ChessBoard.BOARD_SIZE):
+            piece: Optional[ChessPiece] = board.get_piece_at_square(ChessBoardSquare(row, col))
+            if piece is None:
+                empty_squares += 1
+                continue
+            if empty_squares:
+                rank += str(empty_squares)
+                empty_squares = 0
+            char = _FEN_PIECE_CHARS[type(piece)]
+            rank += char.upper() if piece.side == PlayerSide.White else char
+        if empty_squares:
+            rank += str(empty_squares)
+        ranks.append(rank)
+
+    castling = "".join(fen_char for fen_char, right in _FEN_CASTLING_RIGHTS if state.has_castling_right(right)) or "-"
+    en_passant = _square_to_chess_algebra(state.en_passant_target) if state.en_passant_target is not None else "-"
+
+    return " ".join([
+        "/".join(ranks),
+        "w" if player_turn == PlayerSide.White else "b",
+        castling,
+        en_passant,
+        str(state.halfmove_clock),
+        str(state.fullmove_number),
+    ])
@@ -0,0 +1,215 @@
+"""
+Streaming reader for multi-game PGN files.
+
+https://www.saremba.de/chessgml/standards/pgn/pgn-complete.htm
+
+Games are yielded one at a time, so memory use is bounded by the largest single game
+rather than the size of the file. Each game records the byte offsets it spans,
+and reading can resume from any game's end_offset.
+
+Gzip compressed files are detected automatically. Offsets into those are positions
+in the decompressed stream, and resuming has to decompress up to the offset again.
+"""
+
+import gzip
+import re
+import sys
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from ChessCsvPraser import ChessAlgebraParsingException, ParsedMove, parse_single_move
+from common import PlayerSide
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+PGN_RESULTS = ["1-0", "0-1", "1/2-1/2", "*"]
+
+_HEADER_PATTERN = re.compile(r'^\[\s*(\w+)\s+"(.*)"\s*\]$')
+_MOVE_NUMBER_PATTERN = re.compile(r"^\d+\.+")
+_ANNOTATION_PATTERN = re.compile(r"[!?]+$")
+
+class PgnGame:
+    def __init__(self,
+                 headers: Dict[str, str],
+                 moves: List[ParsedMove],
+                 result: Optional[str],
+                 start_offset: int,
+                 end_offset: int):
+        self.headers = headers
+        self.moves = moves
+        self.result = result
+        # byte offsets of the first line and just past the last line of this game
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+    def __str__(self) -> str:
+        return f"{self.headers.get('White', '?')} vs {self.headers.get('Black', '?')} ({self.result}, {len(self.moves)} moves)"
+
+def parse_pgn_header_line(line: str) -> Tuple[str, str]:
+    match = _HEADER_PATTERN.match(line)
+    if not match:
+        raise ChessAlgebraParsingException(f"invalid PGN header line: {line}")
+    return match.group(1), match.group(2).replace('\\"', '"')
+
+def _strip_comments_and_variations(movetext: str) -> str:
+    kept: List[str] = list()
+    variation_depth = 0
+    in_brace_comment = False
+    in_line_comment = False
+
+    for char in movetext:
+        if in_line_comment:
+            in_line_comment = char != "\n"
+        elif in_brace_comment:
+            in_brace_comment = char != "}"
+        elif char == "{":
+            in_brace_comment = True
+        elif char == ";":
+            in_line_comment = True
+        elif char == "(":
+            variation_depth += 1
+        elif char == ")":
+            variation_depth -= 1
+        elif variation_depth == 0:
+            kept.append(char)
+
+    return "".join(kept)
+
+def _normalize_san(token: str) -> str:
+    """
+    reduce PGN SAN to the notation parse_single_move understands
+    """
+    token = _ANNOTATION_PATTERN.sub("", token)
+    if token.endswith("e.p."):
+        token = token[:-len("e.p.")]
+
+    check_suffix = token[-1] if token and token[-1] in "+#" else ""
+    body = token[:len(token) - len(check_suffix)]
+
+    if body in ["0-0", "0-0-0"]:
+        body = body.replace("0", "O")
+    # PGN writes promotions as e8=Q
+    body = body.replace("=", "")
+
+    return body + check_suffix
+
+def parse_pgn_movetext(movetext: str, first_side: PlayerSide = PlayerSide.White) -> Tuple[List[ParsedMove], Optional[str]]:
+    moves: List[ParsedMove] = list()
+    result: Optional[str] = None
+    side = first_side
+
+    for token in _strip_comments_and_variations(movetext).split():
+        token = _MOVE_NUMBER_PATTERN.sub("", token)
+        if not token or token.startswith("$"):
+            # move number on its own or a numeric annotation glyph
+            continue
+        elif token in PGN_RESULTS:
+            result = token
+            break
+
+        san = _normalize_san(token)
+        if not san:
+            # a detached annotation such as "e.p." or "!!"
+            continue
+
+        moves.append(parse_single_move(san, side))
+        side = side.get_opponent()
+
+    return moves, result
+
+def _get_first_side(headers: Dict[str, str]) -> PlayerSide:
+    # games set up from a position name the side to move in the FEN header
+    fen_fields = headers.get("FEN", "").split()
+    return PlayerSide.Black if len(fen_fields) > 1 and fen_fields[1] == "b" else PlayerSide.White
+
+def _build_game(header_lines: List[str], movetext_lines: List[str], start_offset: int, end_offset: int) -> PgnGame:
+    headers = dict(parse_pgn_header_line(line) for line in header_lines)
+    moves, result = parse_pgn_movetext("\n".join(movetext_lines), _get_first_side(headers))
+    return PgnGame(headers, moves, result or headers.get("Result"), start_offset, end_offset)
+
+def open_pgn_file(path: str) -> BinaryIO:
+    with open(path, "rb") as raw_file:
+        is_gzip = raw_file.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+    return gzip.open(path, "rb") if is_gzip else open(path, "rb")
+
+def read_pgn_games(path: str,
+                   start_offset: int = 0,
+                   skip_invalid_games: bool = False,
+                   on_invalid_game: Optional[Callable[[int, ChessAlgebraParsingException], None]] = None) -> Iterator[PgnGame]:
+    """
+    lazily yield every game in a PGN file, starting from start_offset
+    with skip_invalid_games, games whose moves cannot be parsed are dropped instead of raising,
+    and on_invalid_game is called with the start offset and error of each dropped game
+    """
+    with open_pgn_file(path) as pgn_file:
+        pgn_file.seek(start_offset)
+        offset = start_offset
+
+        header_lines: List[str] = list()
+        movetext_lines: List[str] = list()
+        game_start: Optional[int] = None
+        game_end = start_offset
+
+        def finish_game() -> Optional[PgnGame]:
+            try:
+                return _build_game(header_lines, movetext_lines, game_start, game_end)
+            except ChessAlgebraParsingException as e:
+                if skip_invalid_games:
+                    if on_invalid_game is not None:
+                        on_invalid_game(game_start, e)
+                    return None
+                raise ChessAlgebraParsingException(f"{e} in game starting at byte offset {game_start}") from e
+
+        for raw_line in pgn_file:
+            line_offset = offset
+            offset += len(raw_line)
+            line = raw_line.decode("utf-8", errors="replace").strip()
+
+            if not line or line.startswith("%"):
+                # a blank line after the movetext ends the game
+                # lines starting with % are escaped and ignored
+                if movetext_lines:
+                    game = finish_game()
+                    if game is not None:
+                        yield game
+                    header_lines, movetext_lines, game_start = list(), list(), None
+                continue
+
+            if line.startswith("[") and movetext_lines:
+                # next game started without a blank line in between
+                game = finish_game()
+                if game is not None:
+                    yield game
+                header_lines, movetext_lines, game_start = list(), list(), None
+
+            if game_start is None:
+                game_start = line_offset
+            game_end = offset
+
+            if line.startswith("[") and not movetext_lines:
+                header_lines.append(line)
+            else:
+                movetext_lines.append(line)
+
+        if header_lines or movetext_lines:
+            game = finish_game()
+            if game is not None:
+                yield game
+
+def main(argv: List[str]) -> int:
+    if len(argv) not in [1, 2]:
+        print("usage: python ChessPgnReader.py <file.pgn[.gz]> [start_offset]")
+        return 2
+
+    start_offset = int(argv[1]) if len(argv) == 2 else 0
+    games = 0
+    moves = 0
+    end_offset = start_offset
+    for game in read_pgn_games(argv[0], start_offset):
+        games += 1
+        moves += len(game.moves)
+        end_offset = game.end_offset
+
+    print(f"games: {games}, moves: {moves}, resume offset: {end_offset}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,9 +1,31 @@
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
 from common import PlayerSide, AbstractClassError
 
 class ChessPiece(ABC):
+    """
+    Pieces are immutable and interned: there is exactly one instance per piece type and side,
+    so Pawn(PlayerSide.White) is Pawn(PlayerSide.White).
+    """
+
+    __slots__ = ("side",)
+
+    _interned: Dict[Tuple[type, PlayerSide], "ChessPiece"] = dict()
+
+    def __new__(cls, side: PlayerSide):
+        piece = ChessPiece._interned.get((cls, side))
+        if piece is None:
+            piece = super().__new__(cls)
+            piece.side = side
+            ChessPiece._interned[(cls, side)] = piece
+        return piece
+
     def __init__(self, side: PlayerSide):
         self.side = side
+
+    def __reduce__(self):
+        # unpickling goes through __new__ again and gets the interned instance
+        return (type(self), (self.side,))
     
     @abstractmethod
     def get_ascii_icon(self) -> str:
@@ -16,12 +38,14 @@ class ChessPiece(ABC):
         return f"{self.side.name[0]}:{self.get_ascii_icon()}"
 
     def __eq__(self, other):
-        return type(self) is type(other) and self.side is other.side
+        return self is other or (type(self) is type(other) and self.side is other.side)
         
     def __hash__(self):
         return hash(type(self)) + hash(self.side)
 
 class Pawn(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
     
@@ -29,6 +53,8 @@ class Pawn(ChessPiece):
         return "p"
 
 class Knight(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
 
@@ -36,6 +62,8 @@ class Knight(ChessPiece):
         return "k"
 
 class Rook(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
 
@@ -43,6 +71,8 @@ class Rook(ChessPiece):
         return "r"
 
 class Bishop(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
 
@@ -50,6 +80,8 @@ class Bishop(ChessPiece):
         return "b"
 
 class King(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
 
@@ -57,8 +89,19 @@ class King(ChessPiece):
         return "K"
     
 class Queen(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, side: PlayerSide):
         super().__init__(side)
     
     def get_ascii_icon(self) -> str:
-        return "Q"
\ No newline at end of file
+        return "Q"
+
+PIECE_TYPES: List[type] = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+# every piece there is, indexed by a small integer code for packed encodings
+# code 0 stands for an empty square
+PIECES: List[Optional[ChessPiece]] = [None] + [
+    piece_type(side) for side in [PlayerSide.White, PlayerSide.Black] for piece_type in PIECE_TYPES
+]
+PIECE_CODES: Dict[Optional[ChessPiece], int] = {piece: code for code, piece in enumerate(PIECES)}
@@ -0,0 +1,246 @@
+"""
+Replays parsed games through ChessGame and checks them against their notation.
+
+Every move's check/checkmate marker and capture marker is compared with what ChessGame
+reports after playing it. Games are sharded across a process pool in chunks, with a bounded
+number of chunks in flight, so a PGN archive of any size can be streamed through.
+
+    python ChessReplayValidator.py games.pgn.gz --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ChessBoardSquare import ChessBoardSquare
+from ChessCsvPraser import ParsedMove
+from ChessGame import ChessGame, ChessGameTurn
+from ChessPgnReader import read_pgn_games
+from ChessPiece import Pawn
+from ChessZobrist import TranspositionTable
+
+def resolve_origin_position_for_move(move: ParsedMove, game: ChessGame) -> ChessBoardSquare:
+    origin_positions = game.board.get_player_piece_positions(move.player_side)
+    matching_positions_by_type = [
+        position
+        for position in origin_positions
+        if isinstance(game.board.get_piece_at_square(position), move.piece_type_to_move)
+    ]
+
+    if len(matching_positions_by_type) == 1:
+        position = matching_positions_by_type[0]
+    elif len(matching_positions_by_type) == 0:
+        raise ValueError(f"ParsedMove is invalid: {move}")
+    else:
+        matching_positions_by_target = [
+            position
+            for position in matching_positions_by_type
+            if move.to_square in (
+                valid_move.to_square for valid_move in game.get_valid_moves_for_piece_at_square(position, game.board)
+                )
+        ]
+
+        if len(matching_positions_by_target) == 1:
+            position = matching_positions_by_target[0]
+        elif len(matching_positions_by_target) == 0:
+            raise ValueError(f"ParsedMove is invalid: {move}")
+        else:
+            position = None
+            for matched_position in matching_positions_by_target:
+                # row and col 0 are valid matches, so compare against None
+                row_match_success = matched_position.row == move.row_match if move.row_match is not None else True
+                col_match_success = matched_position.col == move.col_match if move.col_match is not None else True
+
+                if row_match_success and col_match_success:
+                    position = matched_position
+                    break
+
+            if not position:
+                raise ValueError(f"ParsedMove is invalid: {move}")
+
+    return position
+
+def turn_was_capture(turn: ChessGameTurn) -> bool:
+    # en passant lands on an empty square, but is the only diagonal pawn move onto one
+    return turn.to_square_piece is not None or \
+        (isinstance(turn.from_square_piece, Pawn) and turn.from_square.col != turn.to_square.col)
+
+class ReplayMismatch:
+    def __init__(self, game_id: Any, ply: int, kind: str, expected: Any, actual: Any):
+        self.game_id = game_id
+        self.ply = ply
+        self.kind = kind
+        self.expected = expected
+        self.actual = actual
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "game_id": self.game_id,
+            "ply": self.ply,
+            "kind": self.kind,
+            "expected": str(self.expected),
+            "actual": str(self.actual),
+        }
+
+class GameReplayResult:
+    def __init__(self, game_id: Any):
+        self.game_id = game_id
+        self.plies = 0
+        self.mismatches: List[ReplayMismatch] = list()
+        # set when the game could not be replayed to the end
+        self.error: Optional[str] = None
+
+def replay_game(game_id: Any, moves: List[ParsedMove], transposition_table: Optional[TranspositionTable] = None) -> GameReplayResult:
+    result = GameReplayResult(game_id)
+    game = ChessGame(transposition_table=transposition_table)
+
+    for ply, move in enumerate(moves, start=1):
+        try:
+            from_sq = resolve_origin_position_for_move(move, game)
+            turn = game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+            actual_status = game.get_player_check_status(game.player_turn, game.board)
+        except Exception as e:
+            result.error = f"ply {ply}: {type(e).__name__}: {e}"
+            break
+
+        result.plies = ply
+        if actual_status != move.expected_check_status:
+            result.mismatches.append(ReplayMismatch(game_id, ply, "check_status", move.expected_check_status, actual_status))
+
+        # castling notation carries no capture marker
+        if move.expected_capture is not None and turn_was_capture(turn) != move.expected_capture:
+            result.mismatches.append(ReplayMismatch(game_id, ply, "capture", move.expected_capture, turn_was_capture(turn)))
+
+    return result
+
+# one table per worker process, so openings are shared between the games of a worker
+_worker_transposition_table: Optional[TranspositionTable] = None
+
+def replay_chunk(chunk: List[Tuple[Any, List[ParsedMove]]]) -> List[GameReplayResult]:
+    global _worker_transposition_table
+    if _worker_transposition_table is None:
+        _worker_transposition_table = TranspositionTable(ChessGame.TRANSPOSITION_TABLE_SIZE)
+
+    return [replay_game(game_id, moves, _worker_transposition_table) for game_id, moves in chunk]
+
+class ReplaySummary:
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.failed_games = 0
+        # games the reader could not parse, they are never replayed
+        self.invalid_games = 0
+        self.mismatches: List[ReplayMismatch] = list()
+        self.errors: Dict[Any, str] = dict()
+        self.seconds = 0.0
+
+    def add(self, result: GameReplayResult) -> None:
+        self.games += 1
+        self.plies += result.plies
+        self.mismatches.extend(result.mismatches)
+        if result.error is not None:
+            self.failed_games += 1
+            self.errors[result.game_id] = result.error
+
+    def add_invalid_game(self, game_id: Any, error: Exception) -> None:
+        self.invalid_games += 1
+        self.errors[game_id] = f"invalid game: {type(error).__name__}: {error}"
+
+    def is_clean(self) -> bool:
+        return self.failed_games == 0 and self.invalid_games == 0 and len(self.mismatches) == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "games": self.games,
+            "plies": self.plies,
+            "failed_games": self.failed_games,
+            "invalid_games": self.invalid_games,
+            "mismatches": len(self.mismatches),
+            "seconds": round(self.seconds, 3),
+            "games_per_second": round(self.games / self.seconds, 1) if self.seconds > 0 else None,
+            "plies_per_second": round(self.plies / self.seconds, 1) if self.seconds > 0 else None,
+        }
+
+def _chunked(games: Iterable[Tuple[Any, List[ParsedMove]]], chunk_size: int) -> Iterator[List[Tuple[Any, List[ParsedMove]]]]:
+    games_iterator = iter(games)
+    while True:
+        chunk = list(islice(games_iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def validate_games(games: Iterable[Tuple[Any, List[ParsedMove]]],
+                   workers: int = 1,
+                   chunk_size: int = 64,
+                   summary: Optional[ReplaySummary] = None) -> ReplaySummary:
+    """
+    replay (game_id, moves) pairs and aggregate the results into summary, or a new one
+    workers=1 replays in this process, which is easier to debug
+    """
+    if summary is None:
+        summary = ReplaySummary()
+    start = time.perf_counter()
+
+    if workers <= 1:
+        for chunk in _chunked(games, chunk_size):
+            for result in replay_chunk(chunk):
+                summary.add(result)
+    else:
+        # keep a few chunks queued per worker so no worker waits on the reader,
+        # without reading the whole input ahead of the pool
+        max_in_flight = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight: Set[Future] = set()
+            for chunk in _chunked(games, chunk_size):
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for result in future.result():
+                            summary.add(result)
+                in_flight.add(executor.submit(replay_chunk, chunk))
+
+            for future in in_flight:
+                for result in future.result():
+                    summary.add(result)
+
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+def pgn_file_games(path: str,
+                   start_offset: int = 0,
+                   on_invalid_game: Optional[Callable[[Any, Exception], None]] = None) -> Iterator[Tuple[Any, List[ParsedMove]]]:
+    # games are identified by their byte offset, so a failure can be found and resumed from
+    # games that cannot be parsed are passed to on_invalid_game instead, e.g. ReplaySummary.add_invalid_game
+    for pgn_game in read_pgn_games(path, start_offset, skip_invalid_games=True, on_invalid_game=on_invalid_game):
+        yield pgn_game.start_offset, pgn_game.moves
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="replay PGN games through ChessGame and report notation mismatches")
+    parser.add_argument("pgn_path", help="PGN file, optionally gzip compressed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=64, help="games sent to a worker at a time")
+    parser.add_argument("--start-offset", type=int, default=0, help="byte offset to resume reading from")
+    parser.add_argument("--show-mismatches", type=int, default=20, help="maximum mismatches and errors to print")
+    return parser.parse_args(argv)
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    summary = ReplaySummary()
+    games = pgn_file_games(args.pgn_path, args.start_offset, summary.add_invalid_game)
+    validate_games(games, args.workers, args.chunk_size, summary)
+
+    print(json.dumps(summary.to_dict()))
+    for mismatch in summary.mismatches[:args.show_mismatches]:
+        print(json.dumps(mismatch.to_dict()))
+    for game_id, error in list(summary.errors.items())[:args.show_mismatches]:
+        print(json.dumps({"game_id": game_id, "error": error}))
+
+    return 0 if summary.is_clean() else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
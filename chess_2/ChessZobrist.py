@@ -0,0 +1,142 @@
+from array import array
+from collections import OrderedDict
+from random import Random
+from typing import Any, Dict, List, Optional, Tuple
+from ChessBoard import ChessBoard
+from ChessPiece import Pawn, Queen, King, Rook, Bishop, Knight, ChessPiece
+from ChessGameState import GameState
+from common import PlayerSide, ChessBoardSquare
+
+_PIECE_TYPES: List[type] = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+class ZobristKeys:
+    """
+    Random 64-bit keys for every (piece, square), the side to move,
+    each castling rights combination and each en passant file.
+    A fixed seed keeps hashes comparable between games and processes.
+    """
+
+    SEED = 20250101
+
+    def __init__(self, seed: int = SEED):
+        rng = Random(seed)
+        board_squares = ChessBoard.BOARD_SIZE * ChessBoard.BOARD_SIZE
+
+        self.piece_square: Dict[Tuple[type, PlayerSide], List[int]] = {
+            (piece_type, side): [rng.getrandbits(64) for _ in range(board_squares)]
+            for side in [PlayerSide.White, PlayerSide.Black]
+            for piece_type in _PIECE_TYPES
+        }
+        self.black_to_move = rng.getrandbits(64)
+        self.castling_rights = [rng.getrandbits(64) for _ in range(16)]
+        self.en_passant_col = [rng.getrandbits(64) for _ in range(ChessBoard.BOARD_SIZE)]
+
+    def get_piece_key(self, piece: ChessPiece, square: ChessBoardSquare) -> int:
+        return self.piece_square[(type(piece), piece.side)][square.row * ChessBoard.BOARD_SIZE + square.col]
+
+ZOBRIST_KEYS = ZobristKeys()
+
+class ZobristHash:
+    """
+    Incremental Zobrist hash of one game: board contents, side to move,
+    castling rights and en passant file.
+
+    Castling rights and en passant come from the game's GameState records, the hash keeps no copy of them.
+    apply_move must be called before the board is changed, undo_move reverts the last one.
+    Every hash the game has passed through is kept, which makes repetition counting cheap.
+    """
+
+    def __init__(self,
+                 board: ChessBoard,
+                 player_turn: PlayerSide,
+                 keys: ZobristKeys = ZOBRIST_KEYS,
+                 state: Optional[GameState] = None):
+        self.keys = keys
+        # hash before each applied move
+        self.history: List[int] = list()
+
+        value = 0
+        for side in [PlayerSide.White, PlayerSide.Black]:
+            for square in board.get_player_piece_positions(side):
+                value ^= keys.get_piece_key(board.get_piece_at_square(square), square)
+
+        # positions without a known state get the rights their kings and rooks allow
+        value ^= self.get_state_key(state if state is not None else GameState.from_board(board))
+
+        if player_turn == PlayerSide.Black:
+            value ^= keys.black_to_move
+
+        self.value = value
+
+    def get_state_key(self, state: GameState) -> int:
+        key = self.keys.castling_rights[state.castling_rights]
+        if state.en_passant_target is not None:
+            key ^= self.keys.en_passant_col[state.en_passant_target.col]
+        return key
+
+    def apply_move(self, move, board: ChessBoard, state: GameState, next_state: GameState) -> None: # move is ChessMoveBase
+        """
+        state is the game state before move, next_state the one after it
+        """
+        self.history.append(self.value)
+        keys = self.keys
+        value = self.value
+
+        # contents of the touched squares once the move is on the board
+        after: Dict[ChessBoardSquare, Optional[ChessPiece]] = {
+            square: None for square in move.chess_squares_with_pieces_removed
+        }
+        for square, piece in move.chess_squares_with_pieces_added:
+            after[square] = piece
+
+        for square, new_piece in after.items():
+            old_piece = board.get_piece_at_square(square)
+            if old_piece is not None:
+                value ^= keys.get_piece_key(old_piece, square)
+            if new_piece is not None:
+                value ^= keys.get_piece_key(new_piece, square)
+
+        value ^= self.get_state_key(state) ^ self.get_state_key(next_state)
+
+        # every move passes the turn
+        self.value = value ^ keys.black_to_move
+
+    def undo_move(self) -> None:
+        self.value = self.history.pop()
+
+    def get_repetition_count(self) -> int:
+        # only positions with the same side to move can match,
+        # and the side key is part of the hash
+        return 1 + sum(1 for value in self.history if value == self.value)
+
+class TranspositionEntry:
+    def __init__(self):
+        self.check_status: Optional[Any] = None # CheckStatus
+        # moves packed with ChessMoveBase.encode
+        self.valid_moves: Dict[ChessBoardSquare, array] = dict()
+
+class TranspositionTable:
+    """
+    Bounded LRU cache of per-position results keyed by Zobrist hash.
+    """
+
+    def __init__(self, max_entries: int):
+        if max_entries <= 0:
+            raise ValueError(f"transposition table needs a positive size, got {max_entries}")
+
+        self.max_entries = max_entries
+        self.entries: OrderedDict[int, TranspositionEntry] = OrderedDict()
+
+    def get_or_create(self, position_hash: int) -> TranspositionEntry:
+        entry = self.entries.get(position_hash)
+        if entry is None:
+            entry = TranspositionEntry()
+            self.entries[position_hash] = entry
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(position_hash)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
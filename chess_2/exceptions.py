@@ -39,3 +39,9 @@ class NoChessPieceAtSquareWhenThereShouldBeException(Exception):
         super().__init__(message)
         self.details = details
 
+
+class BoardIndexInconsistentException(Exception):
+    """Specific exception type."""
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details
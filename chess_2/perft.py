@@ -0,0 +1,188 @@
+"""
+Perft (performance test) runner for ChessGame move generation.
+
+Counts the leaf nodes of the legal move tree to a given depth and compares them
+against published values, so both move generation bugs and throughput regressions show up.
+https://www.chessprogramming.org/Perft_Results
+
+Results are printed as one JSON object per line, e.g.
+
+    python perft.py --depth 3
+    python perft.py --position kiwipete --depth 2 --board bitboard --output perft.jsonl
+"""
+
+import argparse
+import json
+import sys
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from ChessBitBoard import ChessBitBoard
+from ChessBoard import ChessBoard
+from ChessGame import ChessGame
+
+class PerftPosition:
+    def __init__(self, name: str, fen: str, expected_nodes: List[int]):
+        self.name = name
+        self.fen = fen
+        # expected_nodes[i] is the leaf count at depth i + 1
+        self.expected_nodes = expected_nodes
+
+    def get_expected_nodes(self, depth: int) -> Optional[int]:
+        return self.expected_nodes[depth - 1] if 0 < depth <= len(self.expected_nodes) else None
+
+PERFT_POSITIONS: List[PerftPosition] = [
+    PerftPosition(
+        "initial",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        [20, 400, 8902, 197281]
+    ),
+    PerftPosition(
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862]
+    ),
+    PerftPosition(
+        "position_3",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238]
+    ),
+    PerftPosition(
+        "position_4",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467]
+    ),
+    PerftPosition(
+        "position_5",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379]
+    ),
+    PerftPosition(
+        "position_6",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890]
+    ),
+]
+
+def game_from_fen(fen: str, board_type: type = ChessBoard) -> ChessGame:
+    return ChessGame.from_fen(fen, board_type)
+
+def perft(game: ChessGame, depth: int) -> int:
+    if depth == 0:
+        return 1
+
+    nodes = 0
+    for square in game.board.get_player_piece_positions(game.player_turn):
+        for move in game.get_valid_moves_for_piece_at_square(square, game.board):
+            if depth == 1:
+                # bulk counting, the legal moves are the leaves
+                nodes += 1
+            else:
+                game.make_move(move)
+                nodes += perft(game, depth - 1)
+                game.unmake_move()
+
+    return nodes
+
+class MoveGenerationProfiler:
+    """
+    Wraps the per-piece move generators of one ChessGame instance
+    and accumulates call counts and inclusive wall time for each.
+    """
+
+    PROFILED_METHODS = [
+        "get_pawn_moves",
+        "get_knight_moves",
+        "_move_directional_piece",
+        "get_king_moves",
+        "get_castling_moves",
+        "move_results_in_self_check",
+    ]
+
+    def __init__(self, game: ChessGame):
+        self.calls: Dict[str, int] = {name: 0 for name in self.PROFILED_METHODS}
+        self.seconds: Dict[str, float] = {name: 0.0 for name in self.PROFILED_METHODS}
+
+        for name in self.PROFILED_METHODS:
+            # instance attributes shadow the class methods for this game only
+            setattr(game, name, self._timed(name, getattr(game, name)))
+
+    def _timed(self, name: str, method: Callable) -> Callable:
+        @wraps(method)
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return timed_method
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)}
+            for name in self.PROFILED_METHODS
+        }
+
+def run_perft(position: PerftPosition, depth: int, board_type: type = ChessBoard, profile: bool = False) -> Dict:
+    game = game_from_fen(position.fen, board_type)
+    profiler = MoveGenerationProfiler(game) if profile else None
+
+    start = time.perf_counter()
+    nodes = perft(game, depth)
+    seconds = time.perf_counter() - start
+
+    expected_nodes = position.get_expected_nodes(depth)
+    result = {
+        "position": position.name,
+        "fen": position.fen,
+        "board": board_type.__name__,
+        "depth": depth,
+        "nodes": nodes,
+        "expected_nodes": expected_nodes,
+        "passed": None if expected_nodes is None else nodes == expected_nodes,
+        "seconds": round(seconds, 6),
+        "nodes_per_second": round(nodes / seconds, 1) if seconds > 0 else None,
+    }
+    if profiler is not None:
+        result["profile"] = profiler.to_dict()
+
+    return result
+
+_BOARD_TYPES: Dict[str, type] = {
+    "grid" : ChessBoard,
+    "bitboard" : ChessBitBoard
+}
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="count move generation leaf nodes and report throughput")
+    parser.add_argument("--depth", type=int, default=2, help="maximum depth, every depth from 1 up to it is run")
+    parser.add_argument("--position", choices=[position.name for position in PERFT_POSITIONS], action="append",
+                        help="position to run, may be repeated, defaults to all")
+    parser.add_argument("--board", choices=_BOARD_TYPES.keys(), default="grid")
+    parser.add_argument("--no-profile", action="store_true", help="skip the per piece timing breakdown")
+    parser.add_argument("--output", help="append results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    positions = [position for position in PERFT_POSITIONS if args.position is None or position.name in args.position]
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    all_passed = True
+    try:
+        for position in positions:
+            for depth in range(1, args.depth + 1):
+                result = run_perft(position, depth, _BOARD_TYPES[args.board], profile=not args.no_profile)
+                all_passed = all_passed and result["passed"] is not False
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 0 if all_passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,17 @@
+from os import listdir
+from typing import List
+import pytest
+from utils import FAMOUS_GAMES_FOLDER
+
+
+@pytest.fixture
+def famous_games_pgn(tmp_path) -> str:
+    # every famous game in one file, as a PGN archive would have them
+    pgn_texts: List[str] = list()
+    for file_name in sorted(listdir(FAMOUS_GAMES_FOLDER)):
+        with open(FAMOUS_GAMES_FOLDER + file_name, "r") as pgn_file:
+            pgn_texts.append(pgn_file.read().strip())
+
+    path = tmp_path / "famous_games.pgn"
+    path.write_text("\n\n".join(pgn_texts) + "\n")
+    return str(path)
@@ -0,0 +1,70 @@
+###
+# ATTACK TABLE TESTS
+###
+
+from ChessAttacks import AttackMap
+from ChessBoard import ChessBoard
+from ChessBoardSquare import ChessBoardSquare
+from ChessGame import ChessGame
+from ChessPiece import Bishop, King, Knight, Pawn, Rook
+from common import PlayerSide, chess_algebra_to_chess_square
+from ChessReplayValidator import resolve_origin_position_for_move
+from test_chess_dot_com import parse_moves
+
+
+def _all_squares():
+    return [ChessBoardSquare(i, j) for i in range(ChessBoard.BOARD_SIZE) for j in range(ChessBoard.BOARD_SIZE)]
+
+def test_attack_table_sizes():
+    tables = ChessGame().get_attack_tables()
+    corner = chess_algebra_to_chess_square("a1")
+    center = chess_algebra_to_chess_square("d4")
+
+    assert len(tables.knight_attacks[corner]) == 2
+    assert len(tables.knight_attacks[center]) == 8
+    assert len(tables.king_attacks[corner]) == 3
+    assert sum(len(ray) for ray in tables.rook_rays[corner]) == 14
+    assert sum(len(ray) for ray in tables.bishop_rays[center]) == 13
+
+def test_is_square_attacked_on_scratch_board():
+    game = ChessGame()
+    board = ChessBoard(empty_board=True)
+    board.set_square(chess_algebra_to_chess_square("e1"), King(PlayerSide.White))
+    board.set_square(chess_algebra_to_chess_square("a1"), Rook(PlayerSide.Black))
+    board.set_square(chess_algebra_to_chess_square("c3"), Pawn(PlayerSide.Black))
+    board.set_square(chess_algebra_to_chess_square("f3"), Knight(PlayerSide.Black))
+    board.set_square(chess_algebra_to_chess_square("h4"), Bishop(PlayerSide.Black))
+
+    attacked = {
+        square for square in _all_squares()
+        if game.is_square_attacked(square, PlayerSide.Black, board)
+    }
+
+    for algebra_str in ["b1", "c1", "d1", "e1", "b2", "d2", "g1", "h2", "g3", "f2"]:
+        assert chess_algebra_to_chess_square(algebra_str) in attacked
+    # the king blocks the rook's ray and pawns do not attack straight ahead
+    for algebra_str in ["f1", "c2", "e2"]:
+        assert chess_algebra_to_chess_square(algebra_str) not in attacked
+
+    assert game.player_is_in_check(PlayerSide.White, board)
+
+def test_attack_map_stays_in_sync_during_game():
+    # https://www.chess.com/games/view/75289
+    parsed_moves = parse_moves("""1. Nf3 Nf6 2. c4 g6 3. Nc3 Bg7 4. d4 O-O 5. Bf4 d5 6. Qb3 dxc4 7. Qxc4 c6 8. e4
+Nbd7 9. Rd1 Nb6 10. Qc5 Bg4 11. Bg5 Na4 12. Qa3 Nxc3 13. bxc3 Nxe4 14. Bxe7 Qb6
+15. Bc4 Nxc3 16. Bc5 Rfe8+ 17. Kf1 Be6 18. Bxb6 Bxc4+ 19. Kg1 Ne2+ 20. Kf1 Nxd4+""")
+
+    game = ChessGame()
+    tables = game.get_attack_tables()
+    for move in parsed_moves:
+        from_sq = resolve_origin_position_for_move(move, game)
+        game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+
+        rebuilt_map = AttackMap(tables, game.board)
+        assert game.attack_map.attack_counts == rebuilt_map.attack_counts
+
+        for side in [PlayerSide.White, PlayerSide.Black]:
+            assert game.attack_map.get_attacked_squares(side) == {
+                square for square in _all_squares()
+                if tables.is_square_attacked(square, side, game.board)
+            }
@@ -0,0 +1,76 @@
+###
+# BITBOARD TESTS
+###
+
+from ChessBitBoard import ChessBitBoard
+from ChessBoard import ChessBoard
+from ChessBoardSquare import ChessBoardSquare
+from ChessGame import ChessGame
+from ChessPiece import King, Pawn, Queen
+from common import PlayerSide
+from ChessReplayValidator import resolve_origin_position_for_move
+from test_chess_dot_com import parse_moves
+
+
+def test_initial_bitboard_matches_grid_board():
+    bit_board = ChessBitBoard()
+    grid_board = ChessBoard()
+
+    assert bit_board == grid_board
+    assert grid_board == bit_board
+    assert str(bit_board) == str(grid_board)
+
+    for side in [PlayerSide.White, PlayerSide.Black]:
+        assert bit_board.get_player_piece_positions(side) == grid_board.get_player_piece_positions(side)
+        assert bit_board.get_king_position(side) == grid_board.get_king_position(side)
+
+def test_bitboard_set_clear_move():
+    bit_board = ChessBitBoard(empty_board=True)
+    assert bit_board.get_player_piece_positions(PlayerSide.White) == []
+
+    bit_board.set_square(ChessBoardSquare(4, 4), Queen(PlayerSide.White))
+    bit_board.set_square(ChessBoardSquare(0, 4), King(PlayerSide.Black))
+    assert bit_board.get_piece_at_square(ChessBoardSquare(4, 4)) == Queen(PlayerSide.White)
+
+    # overwriting a square replaces the piece on it
+    bit_board.set_square(ChessBoardSquare(4, 4), Pawn(PlayerSide.Black))
+    assert bit_board.get_piece_at_square(ChessBoardSquare(4, 4)) == Pawn(PlayerSide.Black)
+    assert bit_board.get_player_piece_positions(PlayerSide.White) == []
+
+    bit_board.move_piece(ChessBoardSquare(0, 4), ChessBoardSquare(4, 4))
+    assert bit_board.get_piece_at_square(ChessBoardSquare(0, 4)) is None
+    assert bit_board.get_king_position(PlayerSide.Black) == ChessBoardSquare(4, 4)
+    assert bit_board.get_player_piece_positions(PlayerSide.Black) == [ChessBoardSquare(4, 4)]
+
+    bit_board.clear_square(ChessBoardSquare(4, 4))
+    assert bit_board == ChessBitBoard(empty_board=True)
+
+def test_bitboard_clone_is_independent():
+    bit_board = ChessBitBoard()
+    cloned = bit_board.clone()
+    assert cloned == bit_board
+
+    cloned.move_piece(ChessBoardSquare(6, 4), ChessBoardSquare(4, 4))
+    assert cloned != bit_board
+    assert bit_board.get_piece_at_square(ChessBoardSquare(6, 4)) == Pawn(PlayerSide.White)
+
+def test_bitboard_game_replay_matches_grid_game():
+    # https://www.chess.com/games/view/765
+    parsed_moves = parse_moves(
+        """1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 8.
+Nc3 c6 9. Bg5 b5 10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 14.
+Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 17. Rd8# 1-0"""
+    )
+
+    grid_game = ChessGame()
+    bit_game = ChessGame(ChessBitBoard())
+
+    for move in parsed_moves:
+        from_sq = resolve_origin_position_for_move(move, bit_game)
+        assert from_sq == resolve_origin_position_for_move(move, grid_game)
+
+        grid_game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+        bit_game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+        assert bit_game.board == grid_game.board
+
+    assert bit_game.game_status == grid_game.game_status
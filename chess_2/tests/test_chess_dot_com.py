@@ -1,8 +1,8 @@
 from typing import List
 import pytest
-from ChessBoard import ChessBoardSquare
 from ChessCsvPraser import ParsedMove, parse_move_string
 from ChessGame import ChessGame
+from ChessReplayValidator import resolve_origin_position_for_move
 from utils import color_print_pieces, ConsoleColor
 
 
@@ -10,46 +10,6 @@ from utils import color_print_pieces, ConsoleColor
 # CHESS.COM GAMES
 ###
 
-def resolve_origin_position_for_move(move: ParsedMove, game: ChessGame) -> ChessBoardSquare:
-    origin_positions = game.board.get_player_piece_positions(move.player_side)
-    matching_positions_by_type = [
-        position 
-        for position in origin_positions 
-        if isinstance(game.board.get_piece_at_square(position), move.piece_type_to_move)
-    ]
-
-    if len(matching_positions_by_type) == 1:
-        position = matching_positions_by_type[0]
-    elif len(matching_positions_by_type) == 0:
-        raise ValueError(f"ParsedMove is invalid: {move}")
-    else:
-        matching_positions_by_target = [
-            position
-            for position in matching_positions_by_type
-            if move.to_square in (
-                valid_move.to_square for valid_move in game.get_valid_moves_for_piece_at_square(position, game.board)
-                )
-        ]
-
-        if len(matching_positions_by_target) == 1:
-            position = matching_positions_by_target[0]
-        elif len(matching_positions_by_target) == 0:
-            raise ValueError(f"ParsedMove is invalid: {move}")
-        else:
-            position = None
-            for matched_position in matching_positions_by_target:
-                row_match_success = matched_position.row == move.row_match if move.row_match else True
-                col_match_success = matched_position.col == move.col_match if move.col_match else True
-
-                if row_match_success and col_match_success:
-                    position = matched_position
-                    break
-            
-            if not position:
-                raise ValueError(f"ParsedMove is invalid: {move}")
-
-    return position
-
 def play_parsed_move_game(parsedmoves_list: List[ParsedMove]) -> None:
     game = ChessGame()
     for i, move in enumerate(parsedmoves_list):
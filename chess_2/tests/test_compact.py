@@ -0,0 +1,65 @@
+###
+# COMPACT REPRESENTATION TESTS
+###
+
+import pickle
+from ChessBoardSquare import ChessBoardSquare
+from ChessGame import CastleMove, ChessGame, ChessGameTurn, PromotionMove, TurnHistory, decode_move
+from ChessPiece import PIECE_CODES, PIECES, King, Knight, Pawn, Queen
+from common import PlayerSide, chess_algebra_to_chess_square
+from perft import PERFT_POSITIONS, game_from_fen
+
+
+def test_pieces_are_interned():
+    assert Pawn(PlayerSide.White) is Pawn(PlayerSide.White)
+    assert Pawn(PlayerSide.White) is not Pawn(PlayerSide.Black)
+    assert pickle.loads(pickle.dumps(Queen(PlayerSide.Black))) is Queen(PlayerSide.Black)
+    assert not hasattr(Knight(PlayerSide.White), "__dict__")
+
+    assert len(PIECES) == 13
+    assert all(PIECES[PIECE_CODES[piece]] is piece for piece in PIECES)
+
+def test_moves_round_trip_through_encoding():
+    # kiwipete has castling, captures and checks on both wings
+    game = game_from_fen(PERFT_POSITIONS[1].fen)
+    for square in game.board.get_player_piece_positions(game.player_turn):
+        for move in game.get_valid_moves_for_piece_at_square(square, game.board):
+            assert move.encode() < 1 << 16
+            decoded = decode_move(move.encode(), game.board)
+            assert type(decoded) is type(move)
+            assert decoded == move
+            assert set(decoded.chess_squares_with_pieces_removed) == set(move.chess_squares_with_pieces_removed)
+            assert set(decoded.chess_squares_with_pieces_added) == set(move.chess_squares_with_pieces_added)
+
+def test_promotion_piece_is_encoded():
+    game = game_from_fen("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+    moves = game.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("a7"), game.board)
+
+    assert all(isinstance(move, PromotionMove) for move in moves)
+    assert len({move.encode() for move in moves}) == 4
+    assert {type(decode_move(move.encode(), game.board).moved_piece) for move in moves} == {type(move.moved_piece) for move in moves}
+
+def test_castle_moves_share_their_squares():
+    white_king_side_1 = CastleMove(ChessBoardSquare(7, 4), ChessBoardSquare(7, 6), PlayerSide.White)
+    white_king_side_2 = CastleMove(ChessBoardSquare(7, 4), ChessBoardSquare(7, 6), PlayerSide.White)
+
+    assert white_king_side_1.chess_squares_with_pieces_added is white_king_side_2.chess_squares_with_pieces_added
+    assert (ChessBoardSquare(7, 6), King(PlayerSide.White)) in white_king_side_1.chess_squares_with_pieces_added
+
+def test_turn_history_is_packed():
+    game = ChessGame()
+    game.perform_turn(chess_algebra_to_chess_square("e2"), chess_algebra_to_chess_square("e4"))
+    game.perform_turn(chess_algebra_to_chess_square("d7"), chess_algebra_to_chess_square("d5"))
+    game.perform_turn(chess_algebra_to_chess_square("e4"), chess_algebra_to_chess_square("d5"))
+
+    assert isinstance(game.turn_history, TurnHistory)
+    assert len(game.turn_history) == 3
+    assert game.turn_history[-1] == ChessGameTurn(
+        chess_algebra_to_chess_square("e4"),
+        Pawn(PlayerSide.White),
+        chess_algebra_to_chess_square("d5"),
+        Pawn(PlayerSide.Black)
+    )
+    assert game.turn_history[0].to_square_piece is None
+    assert TurnHistory(game.turn_history) == game.turn_history
+    assert list(game.turn_history)[1:] == game.turn_history[1:]
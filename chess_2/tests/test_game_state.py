@@ -0,0 +1,104 @@
+###
+# GAME STATE / FEN TESTS
+###
+
+from typing import List, Tuple
+import pytest
+from ChessGame import ChessGame, EnPassantMove
+from ChessGameState import (
+    BLACK_KING_SIDE,
+    BLACK_QUEEN_SIDE,
+    INITIAL_FEN,
+    WHITE_KING_SIDE,
+    WHITE_QUEEN_SIDE,
+    GameState,
+    parse_fen
+)
+from common import PlayerSide, chess_algebra_to_chess_square
+from perft import PERFT_POSITIONS
+
+
+def _play(game: ChessGame, moves: List[Tuple[str, str]]) -> None:
+    for from_str, to_str in moves:
+        game.perform_turn(chess_algebra_to_chess_square(from_str), chess_algebra_to_chess_square(to_str))
+
+@pytest.mark.parametrize("position", PERFT_POSITIONS, ids=lambda position: position.name)
+def test_fen_round_trip(position):
+    assert ChessGame.from_fen(position.fen).to_fen() == position.fen
+
+def test_initial_game_matches_initial_fen():
+    game = ChessGame()
+    assert game.to_fen() == INITIAL_FEN
+    assert game.state == ChessGame.from_fen(INITIAL_FEN).state
+
+def test_state_follows_turns():
+    game = ChessGame()
+    _play(game, [("e2", "e4")])
+    assert game.to_fen() == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+
+    _play(game, [("g8", "f6"), ("g1", "f3")])
+    assert game.state.en_passant_target is None
+    assert game.state.halfmove_clock == 2
+    assert game.state.fullmove_number == 2
+
+    # king moves lose both rights, rook moves lose one
+    _play(game, [("h8", "g8"), ("e1", "e2")])
+    assert game.state.castling_rights == BLACK_QUEEN_SIDE
+    assert game.to_fen().split()[2] == "q"
+
+def test_capturing_a_rook_removes_castling_right():
+    # the knight keeps the captured corner from giving check
+    game = ChessGame.from_fen("rn2k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    _play(game, [("a1", "a8")])
+
+    assert game.state.castling_rights == WHITE_KING_SIDE | BLACK_KING_SIDE
+    assert game.state.halfmove_clock == 0
+    black_king_moves = game.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("e8"), game.board)
+    assert [move.to_square for move in black_king_moves if move.to_square.col in [2, 6] and move.to_square.row == 0] == \
+        [chess_algebra_to_chess_square("g8")]
+
+def test_fen_castling_rights_limit_castling():
+    # same board, but no rights
+    game = ChessGame.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1")
+    king_moves = game.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("e1"), game.board)
+    assert chess_algebra_to_chess_square("g1") not in [move.to_square for move in king_moves]
+
+def test_en_passant_from_fen():
+    game = ChessGame.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2")
+    moves = game.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("e5"), game.board)
+    en_passant_moves = [move for move in moves if isinstance(move, EnPassantMove)]
+
+    assert [move.to_square for move in en_passant_moves] == [chess_algebra_to_chess_square("d6")]
+    game.perform_turn(chess_algebra_to_chess_square("e5"), chess_algebra_to_chess_square("d6"))
+    assert game.board.get_piece_at_square(chess_algebra_to_chess_square("d5")) is None
+
+    # without the target the same board has no en passant
+    game = ChessGame.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - - 0 2")
+    moves = game.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("e5"), game.board)
+    assert not any(isinstance(move, EnPassantMove) for move in moves)
+
+def test_make_unmake_restores_state():
+    game = ChessGame.from_fen(PERFT_POSITIONS[1].fen)
+    original_fen = game.to_fen()
+
+    for square in game.board.get_player_piece_positions(game.player_turn):
+        for move in game.get_valid_moves_for_piece_at_square(square, game.board):
+            game.make_move(move)
+            game.unmake_move()
+            assert game.to_fen() == original_fen
+
+def test_invalid_fen():
+    with pytest.raises(ValueError):
+        parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1")
+    with pytest.raises(ValueError):
+        parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1")
+    with pytest.raises(ValueError):
+        parse_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQxq - 0 1")
+
+def test_state_defaults_from_board():
+    board, player_turn, state = parse_fen("4k3/8/8/8/8/8/8/4K2R")
+    assert player_turn == PlayerSide.White
+    assert state == GameState(castling_rights=WHITE_KING_SIDE)
+    assert not state.has_castling_right(WHITE_QUEEN_SIDE)
+    assert state.en_passant_target is None
+    assert board.get_king_position(PlayerSide.Black) == chess_algebra_to_chess_square("e8")
@@ -0,0 +1,77 @@
+###
+# MAKE / UNMAKE TESTS
+###
+
+import pytest
+from ChessAttacks import AttackMap
+from ChessBitBoard import ChessBitBoard
+from ChessBoard import ChessBoard
+from ChessGame import ChessGame
+from common import PlayerSide
+from ChessReplayValidator import resolve_origin_position_for_move
+from test_chess_dot_com import parse_moves
+
+
+@pytest.fixture
+def middlegame() -> ChessGame:
+    # https://www.chess.com/games/view/765, up to and including 12. O-O-O
+    parsed_moves = parse_moves(
+        """1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 8.
+Nc3 c6 9. Bg5 b5 10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8"""
+    )
+
+    game = ChessGame()
+    for move in parsed_moves[:-1]:
+        from_sq = resolve_origin_position_for_move(move, game)
+        game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+    return game
+
+@pytest.mark.parametrize("board_type", [ChessBoard, ChessBitBoard])
+def test_board_make_unmake_restores_board(board_type):
+    game = ChessGame(board_type())
+    board = game.board
+    original = board.clone()
+
+    for square in board.get_player_piece_positions(PlayerSide.White):
+        for move in game.get_precheck_moves_for_piece_at_square(square, board):
+            board.make_move(move)
+            assert board != original
+            assert board.unmake_move() is move
+            assert board == original
+
+    assert board.undo_stack == []
+
+def test_unmake_without_make_raises():
+    with pytest.raises(ValueError):
+        ChessBoard().unmake_move()
+
+def test_game_make_unmake_restores_state(middlegame: ChessGame):
+    original_board = middlegame.board.clone()
+    original_history = list(middlegame.turn_history)
+    original_turn = (middlegame.player_turn, middlegame.turn_index)
+
+    for square in middlegame.board.get_player_piece_positions(middlegame.player_turn):
+        for move in middlegame.get_valid_moves_for_piece_at_square(square, middlegame.board):
+            middlegame.make_move(move)
+            assert middlegame.player_turn == original_turn[0].get_opponent()
+            # nested probing from the opponent's point of view
+            middlegame.get_player_check_status(middlegame.player_turn, middlegame.board)
+            middlegame.unmake_move()
+
+            assert middlegame.board == original_board
+            assert middlegame.turn_history == original_history
+            assert (middlegame.player_turn, middlegame.turn_index) == original_turn
+
+    rebuilt_map = AttackMap(middlegame.get_attack_tables(), middlegame.board)
+    assert middlegame.attack_map.attack_counts == rebuilt_map.attack_counts
+
+def test_legality_checks_do_not_clone(middlegame: ChessGame, monkeypatch):
+    def fail_clone(self):
+        raise AssertionError("legality checking should not clone the board")
+
+    monkeypatch.setattr(ChessBoard, "clone", fail_clone)
+
+    player = middlegame.player_turn
+    for square in middlegame.board.get_player_piece_positions(player):
+        middlegame.get_valid_moves_for_piece_at_square(square, middlegame.board)
+    middlegame.get_player_check_status(player, middlegame.board)
@@ -0,0 +1,59 @@
+###
+# PERFT TESTS
+###
+
+import json
+import pytest
+from ChessBitBoard import ChessBitBoard
+from ChessBoard import ChessBoard
+from ChessGame import GameStatus
+from ChessPiece import Knight
+from common import PlayerSide, chess_algebra_to_chess_square
+from perft import PERFT_POSITIONS, game_from_fen, main, perft, run_perft
+
+
+def _get_position(name: str):
+    return next(position for position in PERFT_POSITIONS if position.name == name)
+
+@pytest.mark.parametrize("position", PERFT_POSITIONS, ids=lambda position: position.name)
+def test_perft_depth_2(position):
+    result = run_perft(position, 2)
+    assert result["nodes"] == result["expected_nodes"]
+
+@pytest.mark.parametrize("board_type", [ChessBoard, ChessBitBoard])
+def test_perft_initial_depth_3(board_type):
+    game = game_from_fen(_get_position("initial").fen, board_type)
+    assert perft(game, 3) == 8902
+    # perft leaves the game as it found it
+    assert game.board == board_type()
+    assert game.turn_history == []
+
+def test_perft_position_3_depth_3_en_passant():
+    # the first en passant captures appear at depth 3 in this position
+    assert run_perft(_get_position("position_3"), 3)["nodes"] == 2812
+
+def test_run_perft_profile():
+    result = run_perft(_get_position("kiwipete"), 1, profile=True)
+    assert result["passed"]
+    assert result["profile"]["move_results_in_self_check"]["calls"] == 48
+    assert result["profile"]["get_castling_moves"]["calls"] == 1
+
+def test_main_writes_json_lines(tmp_path):
+    output_path = tmp_path / "perft.jsonl"
+    assert main(["--depth", "2", "--position", "position_4", "--output", str(output_path)]) == 0
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [(result["depth"], result["nodes"], result["passed"]) for result in results] == [(1, 6, True), (2, 264, True)]
+
+def test_game_from_fen_side_to_move():
+    game = game_from_fen("4k3/8/8/8/8/8/8/4K2R b - - 0 1")
+    assert game.player_turn == PlayerSide.Black
+    assert game.board.get_king_position(PlayerSide.White) == chess_algebra_to_chess_square("e1")
+
+def test_promotion_places_piece_instance():
+    game = game_from_fen("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1")
+    game.perform_turn(chess_algebra_to_chess_square("b7"), chess_algebra_to_chess_square("b8"), Knight)
+
+    assert game.board.get_piece_at_square(chess_algebra_to_chess_square("b8")) == Knight(PlayerSide.White)
+    assert game.board.get_piece_at_square(chess_algebra_to_chess_square("b7")) is None
+    assert game.game_status == GameStatus.NOT_CONCLUDED
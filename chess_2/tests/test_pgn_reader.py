@@ -0,0 +1,78 @@
+###
+# PGN READER TESTS
+###
+
+import gzip
+from os import listdir
+import pytest
+from ChessCsvPraser import ChessAlgebraParsingException
+from ChessGame import ChessGame, CheckStatus
+from ChessPgnReader import parse_pgn_movetext, read_pgn_games
+from ChessPiece import Queen
+from common import PlayerSide, chess_algebra_to_chess_square
+from utils import FAMOUS_GAMES_FOLDER
+from ChessReplayValidator import resolve_origin_position_for_move
+
+def test_read_all_games(famous_games_pgn):
+    games = list(read_pgn_games(famous_games_pgn))
+
+    assert len(games) == len(listdir(FAMOUS_GAMES_FOLDER))
+    assert games[0].headers["White"] == "Anatoly Karpov"
+    assert all(game.result == game.headers["Result"] for game in games)
+    assert all(len(game.moves) > 0 for game in games)
+    # moves alternate sides starting with white
+    assert [move.player_side for move in games[0].moves[:3]] == [PlayerSide.White, PlayerSide.Black, PlayerSide.White]
+
+def test_resume_from_offset(famous_games_pgn):
+    games = list(read_pgn_games(famous_games_pgn))
+    resumed = list(read_pgn_games(famous_games_pgn, games[3].end_offset))
+
+    assert [game.headers for game in resumed] == [game.headers for game in games[4:]]
+    assert resumed[0].start_offset == games[4].start_offset
+
+def test_gzip_matches_plain(famous_games_pgn, tmp_path):
+    gzip_path = tmp_path / "famous_games.pgn.gz"
+    with open(famous_games_pgn, "rb") as plain_file, gzip.open(gzip_path, "wb") as gzip_file:
+        gzip_file.write(plain_file.read())
+
+    plain_games = list(read_pgn_games(famous_games_pgn))
+    gzip_games = list(read_pgn_games(str(gzip_path)))
+    assert [game.moves for game in gzip_games] == [game.moves for game in plain_games]
+
+    resumed = list(read_pgn_games(str(gzip_path), plain_games[-2].end_offset))
+    assert [game.headers for game in resumed] == [plain_games[-1].headers]
+
+def test_games_replay_through_chess_game(famous_games_pgn):
+    for pgn_game in read_pgn_games(famous_games_pgn):
+        game = ChessGame()
+        for move in pgn_game.moves:
+            from_sq = resolve_origin_position_for_move(move, game)
+            game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+
+def test_movetext_comments_variations_and_promotion():
+    moves, result = parse_pgn_movetext(
+        "1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3!? $1 Nc6 ; line comment\n"
+        "3. exd5 e.p. c1=Q+ 4. 0-0 1/2-1/2"
+    )
+
+    assert result == "1/2-1/2"
+    assert len(moves) == 7
+    assert moves[4].expected_capture
+    assert moves[5].promotion_piece == Queen
+    assert moves[5].expected_check_status == CheckStatus.IN_CHECK
+    assert moves[6].to_square == chess_algebra_to_chess_square("g1")
+
+def test_invalid_games_raise_or_skip(tmp_path):
+    path = tmp_path / "broken.pgn"
+    path.write_text(
+        '[White "a"]\n\n1. e4 Zz9 1-0\n\n'
+        '[White "b"]\n\n1. d4 d5 0-1\n'
+    )
+
+    with pytest.raises(ChessAlgebraParsingException):
+        list(read_pgn_games(str(path)))
+
+    skipped = list()
+    games = list(read_pgn_games(str(path), skip_invalid_games=True, on_invalid_game=lambda offset, e: skipped.append(offset)))
+    assert [game.headers["White"] for game in games] == ["b"]
+    assert skipped == [0]
@@ -0,0 +1,83 @@
+###
+# PIECE INDEX TESTS
+###
+
+import pytest
+from ChessBoard import ChessBoard
+from ChessBoardSquare import ChessBoardSquare
+from ChessGame import ChessGame
+from ChessPiece import King, Pawn, Queen
+from ChessReplayValidator import resolve_origin_position_for_move
+from common import PlayerSide
+from exceptions import BoardIndexInconsistentException
+from perft import PERFT_POSITIONS, game_from_fen, perft
+from test_chess_dot_com import parse_moves
+
+
+def _grid_positions(board: ChessBoard, side: PlayerSide):
+    return {
+        ChessBoardSquare(i, j)
+        for i in range(board.BOARD_SIZE)
+        for j in range(board.BOARD_SIZE)
+        if board.board[i][j] is not None and board.board[i][j].side == side
+    }
+
+def test_initial_index():
+    board = ChessBoard()
+
+    for side in [PlayerSide.White, PlayerSide.Black]:
+        assert set(board.get_player_piece_positions(side)) == _grid_positions(board, side)
+    assert board.get_king_position(PlayerSide.White) == ChessBoardSquare(7, 4)
+    assert board.get_king_position(PlayerSide.Black) == ChessBoardSquare(0, 4)
+    board.check_piece_index()
+
+def test_index_follows_set_clear_move():
+    board = ChessBoard(empty_board=True, debug_checks=True)
+    board.set_square(ChessBoardSquare(3, 3), King(PlayerSide.White))
+    board.set_square(ChessBoardSquare(4, 4), Pawn(PlayerSide.Black))
+    # replacing a piece removes the old one from the index
+    board.set_square(ChessBoardSquare(4, 4), Queen(PlayerSide.White))
+    board.move_piece(ChessBoardSquare(3, 3), ChessBoardSquare(2, 2))
+
+    assert board.get_player_piece_positions(PlayerSide.Black) == []
+    assert set(board.get_player_piece_positions(PlayerSide.White)) == {ChessBoardSquare(2, 2), ChessBoardSquare(4, 4)}
+    assert board.get_king_position(PlayerSide.White) == ChessBoardSquare(2, 2)
+
+    board.clear_square(ChessBoardSquare(2, 2))
+    with pytest.raises(ValueError):
+        board.get_king_position(PlayerSide.White)
+
+def test_debug_checks_catch_direct_grid_writes():
+    board = ChessBoard(debug_checks=True)
+    board.board[4][4] = Pawn(PlayerSide.White)
+
+    with pytest.raises(BoardIndexInconsistentException):
+        board.clear_square(ChessBoardSquare(6, 4))
+
+    board.rebuild_piece_index()
+    board.check_piece_index()
+
+def test_index_stays_consistent_through_a_game():
+    parsed_moves = parse_moves(
+        """1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 8.
+Nc3 c6 9. Bg5 b5 10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 14.
+Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 17. Rd8# 1-0"""
+    )
+
+    game = ChessGame(ChessBoard(debug_checks=True))
+    for move in parsed_moves:
+        from_sq = resolve_origin_position_for_move(move, game)
+        game.perform_turn(from_sq, move.to_square, move.promotion_piece)
+
+    clone = game.board.clone()
+    assert clone.debug_checks
+    clone.check_piece_index()
+
+def test_index_survives_make_unmake():
+    # kiwipete exercises castling, en passant and promotions through make/unmake
+    position = PERFT_POSITIONS[1]
+    game = game_from_fen(position.fen)
+    game.board.debug_checks = True
+
+    assert perft(game, 2) == position.expected_nodes[1]
+    game.board.check_piece_index()
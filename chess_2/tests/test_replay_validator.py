@@ -0,0 +1,74 @@
+###
+# REPLAY VALIDATOR TESTS
+###
+
+from os import listdir
+import pytest
+from ChessCsvPraser import parse_single_move
+from ChessGame import CheckStatus
+from ChessReplayValidator import ReplaySummary, main, pgn_file_games, replay_game, validate_games
+from common import PlayerSide
+from utils import FAMOUS_GAMES_FOLDER
+
+def test_famous_games_match_their_notation(famous_games_pgn):
+    summary = validate_games(pgn_file_games(famous_games_pgn), workers=1, chunk_size=3)
+
+    assert summary.games == len(listdir(FAMOUS_GAMES_FOLDER))
+    assert summary.plies > 0
+    assert summary.failed_games == 0
+    assert summary.mismatches == []
+
+def test_process_pool_matches_in_process(famous_games_pgn):
+    serial = validate_games(pgn_file_games(famous_games_pgn), workers=1)
+    parallel = validate_games(pgn_file_games(famous_games_pgn), workers=2, chunk_size=2)
+
+    assert parallel.to_dict()["games"] == serial.to_dict()["games"]
+    assert parallel.plies == serial.plies
+    assert len(parallel.mismatches) == len(serial.mismatches)
+
+def test_wrong_markers_are_reported():
+    # e4 does not give check, and exd5 is written without its capture marker
+    moves = [
+        parse_single_move("e4+", PlayerSide.White),
+        parse_single_move("d5", PlayerSide.Black),
+        parse_single_move("ed5", PlayerSide.White),
+    ]
+    moves[2].expected_capture = False
+
+    result = replay_game("bad", moves)
+    assert result.error is None
+    assert result.plies == 3
+    assert [(mismatch.ply, mismatch.kind) for mismatch in result.mismatches] == [(1, "check_status"), (3, "capture")]
+    assert result.mismatches[0].expected == CheckStatus.IN_CHECK
+    assert result.mismatches[0].actual == CheckStatus.NOT_IN_CHECK
+
+def test_illegal_move_stops_the_game():
+    moves = [parse_single_move("e4", PlayerSide.White), parse_single_move("Ke6", PlayerSide.Black)]
+
+    result = replay_game("illegal", moves)
+    assert result.plies == 1
+    assert result.error is not None and result.error.startswith("ply 2")
+
+def test_main_exit_code(famous_games_pgn, capsys):
+    assert main([famous_games_pgn, "--workers", "1"]) == 0
+    assert '"games": ' in capsys.readouterr().out
+
+def test_invalid_games_are_counted(tmp_path, capsys):
+    path = tmp_path / "broken.pgn"
+    path.write_text(
+        '[White "a"]\n\n1. e4 Zz9 1-0\n\n'
+        '[White "b"]\n\n1. d4 d5 0-1\n\n'
+        '[White "c"]\n\n1. Qq1 1-0\n'
+    )
+
+    summary = ReplaySummary()
+    validate_games(pgn_file_games(str(path), on_invalid_game=summary.add_invalid_game), summary=summary)
+    assert summary.games == 1
+    assert summary.invalid_games == 2
+    assert summary.to_dict()["invalid_games"] == 2
+    assert sorted(summary.errors.keys()) == [0, path.read_text().index('[White "c"]')]
+
+    assert main([str(path), "--workers", "1"]) == 1
+    out = capsys.readouterr().out
+    assert '"invalid_games": 2' in out
+    assert out.count("invalid game: ") == 2
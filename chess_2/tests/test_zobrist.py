@@ -0,0 +1,137 @@
+###
+# ZOBRIST / TRANSPOSITION TABLE TESTS
+###
+
+from typing import List, Tuple
+import pytest
+from ChessGame import ChessGame, CheckStatus, GameStatus
+from ChessZobrist import TranspositionTable, ZobristHash
+from common import PlayerSide, chess_algebra_to_chess_square
+
+
+def _play(game: ChessGame, moves: List[Tuple[str, str]]) -> None:
+    for from_str, to_str in moves:
+        game.perform_turn(chess_algebra_to_chess_square(from_str), chess_algebra_to_chess_square(to_str))
+
+def test_incremental_hash_matches_fresh_hash():
+    game = ChessGame()
+    _play(game, [("e2", "e4"), ("e7", "e5"), ("g1", "f3")])
+
+    assert game.zobrist.value == ZobristHash(game.board, PlayerSide.Black).value
+
+def test_transpositions_share_a_hash():
+    game_1 = ChessGame()
+    _play(game_1, [("g1", "f3"), ("g8", "f6"), ("b1", "c3"), ("b8", "c6")])
+
+    game_2 = ChessGame()
+    _play(game_2, [("b1", "c3"), ("b8", "c6"), ("g1", "f3"), ("g8", "f6")])
+
+    assert game_1.board == game_2.board
+    assert game_1.zobrist.value == game_2.zobrist.value
+
+def test_hash_covers_side_to_move_and_en_passant():
+    two_step_game = ChessGame()
+    _play(two_step_game, [("e2", "e4"), ("d7", "d5")])
+
+    # same board and side to move, but no en passant available
+    one_step_game = ChessGame()
+    _play(one_step_game, [("e2", "e3"), ("d7", "d6"), ("e3", "e4"), ("d6", "d5")])
+
+    assert two_step_game.board == one_step_game.board
+    assert two_step_game.zobrist.value != one_step_game.zobrist.value
+
+    # same board, other side to move
+    assert ZobristHash(ChessGame().board, PlayerSide.Black).value != ChessGame().zobrist.value
+
+def test_make_unmake_restores_hash():
+    game = ChessGame()
+    original = game.zobrist.value
+
+    for square in game.board.get_player_piece_positions(game.player_turn):
+        for move in game.get_valid_moves_for_piece_at_square(square, game.board):
+            game.make_move(move)
+            assert game.zobrist.value != original
+            game.unmake_move()
+            assert game.zobrist.value == original
+
+def test_losing_castling_rights_changes_hash():
+    game_1 = ChessGame()
+    _play(game_1, [("e2", "e4"), ("e7", "e5"), ("e1", "e2"), ("e8", "e7"), ("e2", "e1"), ("e7", "e8")])
+
+    game_2 = ChessGame()
+    _play(game_2, [("e2", "e4"), ("e7", "e5"), ("g1", "f3"), ("g8", "f6"), ("f3", "g1"), ("f6", "g8")])
+
+    assert game_1.board == game_2.board
+    assert game_1.state.castling_rights == 0
+    assert game_2.state.castling_rights == 15
+    assert game_1.zobrist.value != game_2.zobrist.value
+    assert game_1.zobrist.value == ZobristHash(game_1.board, PlayerSide.White, state=game_1.state).value
+
+def test_hash_follows_game_state():
+    # the hash of a FEN position matches the same position reached by playing moves
+    played = ChessGame()
+    _play(played, [("e2", "e4"), ("c7", "c5"), ("e4", "e5"), ("d7", "d5")])
+
+    loaded = ChessGame.from_fen(played.to_fen())
+    assert loaded.state == played.state
+    assert loaded.zobrist.value == played.zobrist.value
+
+    # the en passant capture is available, and undoing it restores the hash and the state
+    before = played.zobrist.value
+    played.make_move([
+        move for move in played.get_valid_moves_for_piece_at_square(chess_algebra_to_chess_square("e5"), played.board)
+        if move.to_square == chess_algebra_to_chess_square("d6")
+    ][0])
+    assert played.zobrist.value == ZobristHash(played.board, PlayerSide.Black, state=played.state).value
+    played.unmake_move()
+    assert played.zobrist.value == before
+    assert played.state == loaded.state
+
+def test_threefold_repetition():
+    game = ChessGame()
+    knight_dance = [("g1", "f3"), ("g8", "f6"), ("f3", "g1"), ("f6", "g8")]
+
+    _play(game, knight_dance)
+    assert game.zobrist.get_repetition_count() == 2
+    assert not game.is_threefold_repetition()
+
+    _play(game, knight_dance)
+    assert game.zobrist.get_repetition_count() == 3
+    assert game.is_threefold_repetition()
+
+def test_transposition_table_caches_status_and_moves():
+    game = ChessGame()
+    _play(game, [("e2", "e4"), ("f7", "f6"), ("d2", "d4"), ("g7", "g5"), ("d1", "h5")])
+
+    assert game.game_status == GameStatus.WHITE_WINS
+    entry = game.transposition_table.get_or_create(game.zobrist.value)
+    assert entry.check_status == CheckStatus.IN_CHECK_MATE
+
+    white_queen = chess_algebra_to_chess_square("h5")
+    cached_moves = game.get_valid_moves_for_piece_at_square(white_queen, game.board)
+    assert [move.encode() for move in cached_moves] == list(entry.valid_moves[white_queen])
+    # callers get their own list
+    cached_moves.clear()
+    assert len(game.get_valid_moves_for_piece_at_square(white_queen, game.board)) > 0
+
+def test_shared_transposition_table():
+    shared_table = TranspositionTable(100)
+    game_1 = ChessGame(transposition_table=shared_table)
+    _play(game_1, [("e2", "e4"), ("e7", "e5")])
+
+    game_2 = ChessGame(transposition_table=shared_table)
+    entry = shared_table.get_or_create(game_2.zobrist.value)
+    assert len(entry.valid_moves) > 0
+
+def test_transposition_table_is_bounded_lru():
+    table = TranspositionTable(2)
+    table.get_or_create(1)
+    table.get_or_create(2)
+    table.get_or_create(1)
+    table.get_or_create(3)
+
+    assert len(table) == 2
+    assert list(table.entries.keys()) == [1, 3]
+
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
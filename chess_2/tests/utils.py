@@ -1,4 +1,5 @@
 
+from os import getcwd
 from typing import Iterable, Tuple
 
 from ChessBoardSquare import ChessBoardSquare
@@ -19,6 +20,9 @@ class ConsoleColor:
 # UTILITIES
 ###
 
+# one PGN file per game
+FAMOUS_GAMES_FOLDER = getcwd() + "/tests/famous_games/"
+
 def color_print_pieces(game_board_str: str, color_squares: Iterable[Tuple[ChessBoardSquare, ConsoleColor]]) -> str:
     row_length = 7 + 3 * 8 # 7 spaces and 8 pieces of length 3
 
@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from bisect import bisect_left
+import random
 import sys
-from typing import Any, Dict, List
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
 """
 Overview
@@ -70,75 +72,120 @@ T9_DICT: Dict[str, List[str]] = {
     '0': []
 }
 
+# every letter to the digit it is typed with
+LETTER_TO_DIGIT: Dict[str, str] = {
+    letter: digit
+    for digit, letters in T9_DICT.items()
+    for letter in letters
+}
 
-@dataclass
-class TrieNode:
-    character: str
-    children: Dict[str, Any] # TrieNode
-    is_word: bool
-
-
-@dataclass
-class SearchPath:
-    current_node: TrieNode
-    current_string: str
-    remaining_digits: str
-
-
-# this is just a search of the space
-def get_possible_words(digit_string: str, root: TrieNode) -> List[str]:
-    if len(digit_string) == 0:
-        return list()
-    
-    possible_words: List[str] = list()
-
-    horizon: List[str] = [
-        SearchPath(
-            current_node=root,
-            current_string=str(),
-            remaining_digits=digit_string
-        )
-    ]
-    
-    while(len(horizon) > 0):
-        current: SearchPath = horizon.pop(0)
-
-        # terminal condition
-        if len(current.remaining_digits) == 0:
-            # then we've processed everything and we're done
-            # we must have a viable word
-            if current.current_node.is_word:
-                possible_words.append(current.current_string)
-        else:
-            # there's still work to do
-            next_digit = current.remaining_digits[0]
-
-            possible_characters = T9_DICT[next_digit]
-
-            for char in possible_characters:
-                if char in current.current_node.children.keys():
-                    # there is still a viable path
-                    horizon.append(SearchPath(
-                        current_node=current.current_node.children[char],
-                        current_string=current.current_string + char,
-                        remaining_digits=current.remaining_digits[1:]
-                    ))
-
-    return possible_words
-
-
-def add_to_trie(word: str, root: TrieNode) -> None:
-    current: TrieNode = root
-    for char in word:
-        if char not in (child_char for child_char in current.children.keys()):
-            current.children[char] = TrieNode(
-                character=char,
-                children=dict(),
-                is_word=False
-            )
-        current = current.children[char]
-    
-    current.is_word = True
+_ENCODE_TABLE = str.maketrans(LETTER_TO_DIGIT)
+
+
+def encode_word(word: str) -> Optional[str]:
+    # None for words that cannot be typed, i.e. anything but lowercase letters
+    if not word.isalpha():
+        return None
+    digits = word.translate(_ENCODE_TABLE)
+    return digits if digits.isdigit() else None
+
+
+class T9Index:
+    """
+    every word filed under its digit encoding, so an exact lookup is one dict hit
+    the distinct encodings are also kept sorted, which works as a flattened digit trie:
+    the encodings starting with some digits are one contiguous range, found with two bisects
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words_by_digits: Dict[str, List[str]] = dict()
+        self.sorted_digits: List[str] = list()
+        self.word_count = 0
+        self.add_words(words)
+
+    def add_words(self, words: Iterable[str]) -> None:
+        for word in words:
+            digits = encode_word(word)
+            if digits is None:
+                continue
+
+            digit_words = self.words_by_digits.get(digits)
+            if digit_words is None:
+                self.words_by_digits[digits] = [word]
+            else:
+                digit_words.append(word)
+            self.word_count += 1
+
+        # words come in alphabetical order in dictionary files, but nothing relies on it
+        for digit_words in self.words_by_digits.values():
+            digit_words.sort()
+        self.sorted_digits = sorted(self.words_by_digits)
+
+    def lookup(self, digit_string: str) -> List[str]:
+        return list(self.words_by_digits.get(digit_string, ()))
+
+    def lookup_prefix(self, digit_string: str, limit: Optional[int] = None) -> List[str]:
+        """
+        words whose key presses start with digit_string, grouped by encoding in sorted order
+        """
+        if len(digit_string) == 0:
+            return list()
+
+        # bumping the last digit gives the first encoding past the ones starting with digit_string
+        lo = bisect_left(self.sorted_digits, digit_string)
+        hi = bisect_left(self.sorted_digits, digit_string[:-1] + chr(ord(digit_string[-1]) + 1), lo)
+
+        words: List[str] = list()
+        for position in range(lo, hi):
+            words.extend(self.words_by_digits[self.sorted_digits[position]])
+            if limit is not None and len(words) >= limit:
+                return words[:limit]
+        return words
+
+
+def read_input(filename: str) -> Tuple[List[str], List[str]]:
+    """
+    the dictionary words, lowercased, and the digit strings after them
+    """
+    with open(filename, 'r') as f:
+        lines = f.read().split()
+
+    for split_index, line in enumerate(lines):
+        if line.isdigit():
+            break
+    else:
+        split_index = len(lines)
+
+    return [line.lower() for line in lines[:split_index]], lines[split_index:]
+
+
+def benchmark(word_count: int = 500_000, query_count: int = 100_000) -> None:
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choices(letters, k=rng.randint(2, 12))) for _ in range(word_count)]
+
+    start = time.perf_counter()
+    index = T9Index(words)
+    load_seconds = time.perf_counter() - start
+
+    queries = [encode_word(rng.choice(words)) for _ in range(query_count)]
+    start = time.perf_counter()
+    for digit_string in queries:
+        index.lookup(digit_string)
+    exact_seconds = time.perf_counter() - start
+
+    prefixes = [digit_string[:3] for digit_string in queries]
+    start = time.perf_counter()
+    for digit_string in prefixes:
+        index.lookup_prefix(digit_string, limit=10)
+    prefix_seconds = time.perf_counter() - start
+
+    print(
+        f"{index.word_count:,} words, {len(index.words_by_digits):,} encodings: "
+        f"load {load_seconds:.2f} s, "
+        f"exact lookup {exact_seconds / query_count * 1e6:.2f} us, "
+        f"3 key prefix lookup (first 10) {prefix_seconds / query_count * 1e6:.2f} us"
+    )
 
 
 def get_formatted_result(digit_string: str, word_matches: List[str]) -> str:
@@ -147,37 +194,21 @@ def get_formatted_result(digit_string: str, word_matches: List[str]) -> str:
 
 
 def main(filename: str):
-
-    root: TrieNode = TrieNode(
-        character=".",
-        children=dict(),
-        is_word=False
-    )
-
-    inputs: List[str] = list()
-
-    with open(filename, 'r') as f:
-        line = f.readline().strip()
-
-        while line and not line.isdigit():
-            print(f"adding {line} to trie")
-            add_to_trie(line, root)
-            line = f.readline().strip().lower()
-        
-        # now we're numbers
-        while line:
-            inputs.append(line)
-            line = f.readline().strip().lower()
+    words, inputs = read_input(filename)
+    index = T9Index(words)
 
     for input in inputs:
-        possible_words: List[str] = get_possible_words(input, root)
-        formatted_result = get_formatted_result(input, possible_words)
+        formatted_result = get_formatted_result(input, index.lookup(input))
         print(formatted_result)
 
 
 if __name__=="__main__":
-    filename = \
-        "lyft_laptop/t9_sample_input.txt" \
-        if len(sys.argv) < 2 \
-        else sys.argv[1]
-    main(filename)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        filename = \
+            "lyft_laptop/t9_sample_input.txt" \
+            if len(args) < 1 \
+            else args[0]
+        main(filename)
@@ -1,6 +1,12 @@
 import sys
-from typing import List, Dict, Any, Optional, Tuple
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from dataclasses import dataclass
+import random
+import time
+import tracemalloc
 # lyft question
 """
 Overview
@@ -153,6 +159,336 @@ def autocomplete(word: str, trie_root: TrieNode) -> List[WordRank]:
     return current.descendant_words
 
 
+# compact index
+# the dictionary is kept sorted, so the words with a given prefix are one contiguous range
+# found with two binary searches, and no per-node objects exist at all
+# ranges of at most K words are ranked at query time
+# larger ranges get their top K words precomputed, which is only needed once per
+# distinct range, i.e. per branching trie node, not per prefix
+# those ranges are the lcp intervals of the sorted words, found bottom up with one
+# stack pass over the longest common prefixes of neighbouring words
+
+def common_prefix_length(a: str, b: str) -> int:
+    length = 0
+    for char_a, char_b in zip(a, b):
+        if char_a != char_b:
+            break
+        length += 1
+    return length
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    # the smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# lo, hi, results
+PrefixResult = Tuple[int, int, List[WordRank]]
+
+
+class PrefixCache:
+    """
+    bounded LRU cache of prefix results
+    keystroke logs repeat the same short prefixes constantly, so even a small cache catches most of them
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.entries: OrderedDict[str, PrefixResult] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prefix: str) -> Optional[PrefixResult]:
+        entry = self.entries.get(prefix)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(prefix)
+        return entry
+
+    def put(self, prefix: str, entry: PrefixResult) -> None:
+        self.entries[prefix] = entry
+        self.entries.move_to_end(prefix)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class CompactAutocompleteIndex:
+    def __init__(self, word_ranks: List[WordRank], k: int = 5, cache_size: int = 10_000):
+        self.k = k
+        self.cache: Optional[PrefixCache] = PrefixCache(cache_size) if cache_size > 0 else None
+
+        order = sorted(range(len(word_ranks)), key=lambda i: word_ranks[i].word)
+        self.sorted_words: List[str] = [word_ranks[i].word for i in order]
+        self.sorted_ranks = array('i', (word_ranks[i].rank for i in order))
+
+        # (lo, hi) range keys in sorted order, and the sorted positions of each range's
+        # top K words, best first, at key_index * k
+        self.range_keys = array('q')
+        self.range_top_positions = array('i')
+        self._build_range_top_positions()
+
+    def _range_key(self, lo: int, hi: int) -> int:
+        return lo * (len(self.sorted_words) + 1) + hi
+
+    def _build_range_top_positions(self) -> None:
+        k = self.k
+        words = self.sorted_words
+        by_rank = self.sorted_ranks.__getitem__
+        word_count = len(words)
+
+        # found ranges come out children first, so they are sorted by key at the end
+        found: List[Tuple[int, List[int]]] = list()
+
+        # open intervals as [common prefix length, lo, top positions]
+        stack: List[List[Any]] = [[0, 0, []]]
+        for i in range(word_count):
+            next_lcp = common_prefix_length(words[i], words[i + 1]) if i + 1 < word_count else 0
+
+            if next_lcp > stack[-1][0]:
+                # word i is the first word of a deeper interval
+                stack.append([next_lcp, i, [i]])
+                continue
+
+            top = stack[-1]
+            top[2] = sorted(top[2] + [i], key=by_rank)[:k]
+
+            # close the intervals that do not extend to word i + 1
+            while next_lcp < stack[-1][0]:
+                _, lo, top_positions = stack.pop()
+                if i + 1 - lo > k:
+                    found.append((self._range_key(lo, i + 1), top_positions))
+
+                if next_lcp > stack[-1][0]:
+                    # the closed interval is the first child of one not opened yet
+                    stack.append([next_lcp, lo, top_positions])
+                else:
+                    parent = stack[-1]
+                    parent[2] = sorted(parent[2] + top_positions, key=by_rank)[:k]
+
+        # the root covers every word
+        if word_count > k:
+            found.append((self._range_key(0, word_count), stack[0][2]))
+
+        found.sort()
+        for key, top_positions in found:
+            self.range_keys.append(key)
+            self.range_top_positions.extend(top_positions)
+
+    def prefix_range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        """
+        the range of words starting with prefix
+        lo and hi can narrow the search to the range of a shorter prefix of it
+        """
+        if hi is None:
+            hi = len(self.sorted_words)
+        lo = bisect_left(self.sorted_words, prefix, lo, hi)
+        hi = bisect_left(self.sorted_words, prefix_upper_bound(prefix), lo, hi)
+        return lo, hi
+
+    def top_positions(self, lo: int, hi: int) -> List[int]:
+        if hi - lo <= self.k:
+            return sorted(range(lo, hi), key=self.sorted_ranks.__getitem__)
+
+        key = self._range_key(lo, hi)
+        key_index = bisect_left(self.range_keys, key)
+        # every range of more than k words is an lcp interval, so the key is always there
+        return list(self.range_top_positions[key_index * self.k:(key_index + 1) * self.k])
+
+    def lookup(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> PrefixResult:
+        # callers get the cached results list, so they must copy it before handing it out
+        if self.cache is not None:
+            entry = self.cache.get(prefix)
+            if entry is not None:
+                return entry
+
+        lo, hi = self.prefix_range(prefix, lo, hi)
+        entry = lo, hi, [
+            WordRank(word=self.sorted_words[position], rank=self.sorted_ranks[position])
+            for position in self.top_positions(lo, hi)
+        ]
+        if self.cache is not None:
+            self.cache.put(prefix, entry)
+        return entry
+
+    def autocomplete(self, prefix: str) -> List[WordRank]:
+        if len(prefix) == 0:
+            raise ValueError(f"word cannot have length zero")
+
+        return list(self.lookup(prefix)[2])
+
+    def autocomplete_many(self, prefixes: Iterable[str]) -> Dict[str, List[WordRank]]:
+        """
+        answer a batch of prefixes in one pass over the sorted words
+        prefixes are deduplicated and sorted, so each one is searched for
+        only inside the range of the closest shorter prefix in the batch,
+        and never to the left of the previous one
+        """
+        results: Dict[str, List[WordRank]] = dict()
+
+        # (prefix, lo, hi) of the batch prefixes that the current one may extend
+        enclosing: List[Tuple[str, int, int]] = [("", 0, len(self.sorted_words))]
+        previous_lo = 0
+        for prefix in sorted(set(prefixes)):
+            if len(prefix) == 0:
+                raise ValueError(f"word cannot have length zero")
+
+            while not prefix.startswith(enclosing[-1][0]):
+                enclosing.pop()
+            _, lo, hi = enclosing[-1]
+
+            lo, hi, prefix_results = self.lookup(prefix, max(lo, previous_lo), hi)
+            results[prefix] = list(prefix_results)
+            enclosing.append((prefix, lo, hi))
+            previous_lo = lo
+
+        return results
+
+
+class AutocompleteSession:
+    """
+    incremental lookups for one text field, one keystroke at a time
+    each typed character only searches inside the range of the text before it,
+    and backspace goes back to an earlier range without searching at all
+    """
+
+    def __init__(self, index: CompactAutocompleteIndex):
+        self.index = index
+        self.prefix = ""
+        # (lo, hi, results) for every prefix of the typed text, starting with the empty one
+        self.entries: List[PrefixResult] = [(0, len(index.sorted_words), [])]
+
+    def type(self, chars: str) -> List[WordRank]:
+        for char in chars:
+            lo, hi, _ = self.entries[-1]
+            self.prefix += char
+            self.entries.append(self.index.lookup(self.prefix, lo, hi))
+        return self.results()
+
+    def backspace(self, count: int = 1) -> List[WordRank]:
+        count = min(count, len(self.prefix))
+        if count > 0:
+            self.prefix = self.prefix[:-count]
+            del self.entries[-count:]
+        return self.results()
+
+    def reset(self) -> None:
+        self.prefix = ""
+        del self.entries[1:]
+
+    def results(self) -> List[WordRank]:
+        return list(self.entries[-1][2])
+
+
+def generate_words(word_count: int, seed: int = 0) -> List[WordRank]:
+    # words share prefixes the way real ones do: a few thousand stems with varied endings
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    stems = ["".join(rng.choices(letters, k=rng.randint(2, 5))) for _ in range(word_count // 200 + 1)]
+
+    seen = set()
+    word_ranks: List[WordRank] = list()
+    while len(word_ranks) < word_count:
+        word = rng.choice(stems) + "".join(rng.choices(letters, k=rng.randint(0, 6)))
+        if word not in seen:
+            seen.add(word)
+            word_ranks.append(WordRank(word=word, rank=len(word_ranks) + 1))
+    return word_ranks
+
+
+def benchmark(word_counts: Tuple[int, ...] = (100_000, 1_000_000), query_count: int = 100_000, compare_trie_up_to: int = 100_000) -> None:
+    for word_count in word_counts:
+        word_ranks = generate_words(word_count)
+        rng = random.Random(1)
+        queries = [word[:rng.randint(1, len(word))] for word in (rng.choice(word_ranks).word for _ in range(query_count))]
+
+        builders = [("compact", lambda: CompactAutocompleteIndex(word_ranks))]
+        if word_count <= compare_trie_up_to:
+            builders.append(("trie", lambda: create_trie(word_ranks)))
+
+        for name, build in builders:
+            # tracing slows the build down a lot, so memory is measured on a second build
+            tracemalloc.start()
+            index = build()
+            memory_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del index
+
+            start = time.perf_counter()
+            index = build()
+            build_seconds = time.perf_counter() - start
+
+            lookup = index.autocomplete if name == "compact" else lambda prefix: autocomplete(prefix, index)[:5]
+            start = time.perf_counter()
+            for prefix in queries:
+                lookup(prefix)
+            query_seconds = time.perf_counter() - start
+
+            print(
+                f"{name:>8} {word_count:>9,} words: build {build_seconds:.2f} s, "
+                f"memory {memory_bytes / 2**20:,.1f} MiB, "
+                f"query {query_seconds / query_count * 1e6:.1f} us"
+            )
+            del index
+
+
+def generate_keystroke_log(word_ranks: List[WordRank], session_count: int, seed: int = 2) -> List[str]:
+    # people mostly type the popular words, and every keystroke is a lookup of the text so far
+    rng = random.Random(seed)
+    sessions: List[str] = list()
+    for _ in range(session_count):
+        rank = min(int(rng.paretovariate(0.8)), len(word_ranks))
+        sessions.append(word_ranks[rank - 1].word)
+    return sessions
+
+
+def benchmark_keystrokes(word_count: int = 1_000_000, session_count: int = 50_000) -> None:
+    word_ranks = generate_words(word_count)
+    sessions = generate_keystroke_log(word_ranks, session_count)
+    keystrokes = [word[:length] for word in sessions for length in range(1, len(word) + 1)]
+
+    def per_keystroke(index: CompactAutocompleteIndex) -> None:
+        for prefix in keystrokes:
+            index.autocomplete(prefix)
+
+    def incremental(index: CompactAutocompleteIndex) -> None:
+        session = AutocompleteSession(index)
+        for word in sessions:
+            session.reset()
+            for char in word:
+                session.type(char)
+
+    def batch(index: CompactAutocompleteIndex) -> None:
+        index.autocomplete_many(keystrokes)
+
+    baseline_seconds: Optional[float] = None
+    for name, cache_size, replay in [
+        ("per keystroke", 0, per_keystroke),
+        ("per keystroke, cached", 10_000, per_keystroke),
+        ("session", 0, incremental),
+        ("session, cached", 10_000, incremental),
+        ("batch", 0, batch),
+    ]:
+        index = CompactAutocompleteIndex(word_ranks, cache_size=cache_size)
+        start = time.perf_counter()
+        replay(index)
+        seconds = time.perf_counter() - start
+        baseline_seconds = baseline_seconds or seconds
+
+        hit_rate = f", cache hits {index.cache.hits / (index.cache.hits + index.cache.misses):.0%}" if index.cache is not None else ""
+        print(
+            f"{name:>22}: {len(keystrokes) / seconds:>12,.0f} lookups/s, "
+            f"{baseline_seconds / seconds:.1f}x{hit_rate}"
+        )
+
+
 #catc:
 #catch (10)
 def print_formatted_result(word: str, results: List[WordRank]) -> None:
@@ -165,18 +501,24 @@ def main(filename: str):
     return_limit = 5
     
     word_ranks, word_searches = ingest_file(filename)
-    root: TrieNode = create_trie(word_ranks)
+    index = CompactAutocompleteIndex(word_ranks, k=return_limit)
+    results = index.autocomplete_many(word_searches)
 
     for word in word_searches:
-        results = autocomplete(word, root)
-        print_formatted_result(word, results[:return_limit])
+        print_formatted_result(word, results[word])
         print()
 
 
 if __name__=="__main__":
-    filename = \
-        "lyft_laptop/autocomplete_sample_input.txt" \
-        if len(sys.argv) < 2 \
-        else sys.argv[1]
-    main(filename)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--benchmark" in sys.argv:
+        benchmark()
+    elif "--benchmark-keystrokes" in sys.argv:
+        benchmark_keystrokes()
+    else:
+        filename = \
+            "lyft_laptop/autocomplete_sample_input.txt" \
+            if len(args) < 1 \
+            else args[0]
+        main(filename)
 
@@ -1,7 +1,10 @@
 import sys
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 import heapq
+import random
+import time
 
 """
 Overview
@@ -148,6 +151,171 @@ def assign_jobs(jobs: List[Job]) -> List[Tuple[int, int]]:
     return job_assignments
 
 
+# streaming scheduler
+# jobs arrive in start time order from any iterable, so the input never has to fit in memory
+# times are minutes since the start of the first day, so jobs can run across any number of days
+# with max_workers set, a job that finds every worker busy waits in a FIFO queue
+# and starts on the lowest index worker the minute one frees up
+
+MINUTES_PER_DAY = 1440
+
+
+def parse_start_time(day: int, hhmm: str) -> int:
+    return day * MINUTES_PER_DAY + int(hhmm[:2]) * 60 + int(hhmm[2:])
+
+
+def stream_jobs(filename: str) -> Iterator[Job]:
+    """
+    lazily read jobs in start time order
+    lines are "HHMM duration" or "day HHMM duration", the job count line is skipped
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            line_split = line.split()
+            if len(line_split) == 3:
+                start_time_minutes = parse_start_time(int(line_split[0]), line_split[1])
+            elif len(line_split) == 2:
+                start_time_minutes = parse_start_time(0, line_split[0])
+            else:
+                continue
+
+            yield Job(
+                start_time=start_time_minutes,
+                duration=int(line_split[-1])
+            )
+
+
+@dataclass
+class SchedulerStats:
+    jobs: int = 0
+    peak_workers: int = 0
+    queued_jobs: int = 0
+    peak_queue_length: int = 0
+    # minutes waited -> job count, every job is counted including the ones that never waited
+    # a histogram keeps memory flat no matter how many jobs go through
+    queue_latencies: Dict[int, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def record_latency(self, minutes: int) -> None:
+        self.queue_latencies[minutes] = self.queue_latencies.get(minutes, 0) + 1
+
+    def latency_percentile(self, percentile: float) -> int:
+        if self.jobs == 0:
+            return 0
+
+        rank = max(1, -(-self.jobs * percentile // 100))
+        seen = 0
+        for minutes in sorted(self.queue_latencies):
+            seen += self.queue_latencies[minutes]
+            if seen >= rank:
+                return minutes
+        return max(self.queue_latencies)
+
+    def throughput(self) -> float:
+        return self.jobs / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return \
+            f"jobs: {self.jobs}, peak workers: {self.peak_workers}, " \
+            f"queued jobs: {self.queued_jobs}, peak queue: {self.peak_queue_length}, " \
+            f"queue latency p50/p90/p99/max: " \
+            f"{self.latency_percentile(50)}/{self.latency_percentile(90)}/" \
+            f"{self.latency_percentile(99)}/{self.latency_percentile(100)} min, " \
+            f"throughput: {self.throughput():,.0f} jobs/s"
+
+
+# the streaming scheduler never looks back, so a job earlier than the one before it can't be placed
+class UnorderedJobsError(ValueError):
+    pass
+
+
+# job_id, worker_id, start_time yield
+def schedule_jobs(
+        jobs: Iterable[Job],
+        max_workers: Optional[int] = None,
+        stats: Optional[SchedulerStats] = None) -> Iterator[Tuple[int, int, int]]:
+    """
+    assign jobs to workers as they arrive, job ids are positions in the input
+    queued jobs are yielded once they start, so ids can come out of order
+    """
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+    if stats is None:
+        stats = SchedulerStats()
+
+    started = time.perf_counter()
+
+    worker_count: int = 0
+    available_worker_heap: List[int] = list()
+    # end_time, worker_index
+    active_workers: List[Tuple[int, int]] = list()
+    # job_id, job
+    waiting_jobs: Deque[Tuple[int, Job]] = deque()
+
+    def start_job(job_id: int, job: Job, start_time: int, worker_index: int) -> Tuple[int, int, int]:
+        heapq.heappush(active_workers, (start_time + job.duration, worker_index))
+        stats.record_latency(start_time - job.start_time)
+        return job_id, worker_index, start_time
+
+    def release_workers(current_time: int) -> Iterator[Tuple[int, int, int]]:
+        # a worker that ends a job at minute t is free from minute t + 1
+        while len(active_workers) > 0 and active_workers[0][0] < current_time:
+            end_time = active_workers[0][0]
+            while len(active_workers) > 0 and active_workers[0][0] == end_time:
+                heapq.heappush(available_worker_heap, heapq.heappop(active_workers)[1])
+
+            # jobs only wait while no worker is free,
+            # so the workers freed at end_time are the only candidates
+            while len(waiting_jobs) > 0 and len(available_worker_heap) > 0:
+                job_id, job = waiting_jobs.popleft()
+                yield start_job(job_id, job, end_time + 1, heapq.heappop(available_worker_heap))
+
+    previous_start_time: Optional[int] = None
+    for job_id, job in enumerate(jobs):
+        if previous_start_time is not None and job.start_time < previous_start_time:
+            raise UnorderedJobsError(f"job J{job_id} starts at {job.start_time}, before the previous job at {previous_start_time}")
+        previous_start_time = job.start_time
+        stats.jobs += 1
+
+        yield from release_workers(job.start_time)
+
+        if len(available_worker_heap) == 0 and (max_workers is None or worker_count < max_workers):
+            heapq.heappush(available_worker_heap, worker_count)
+            worker_count += 1
+            stats.peak_workers = worker_count
+
+        if len(available_worker_heap) > 0:
+            yield start_job(job_id, job, job.start_time, heapq.heappop(available_worker_heap))
+        else:
+            waiting_jobs.append((job_id, job))
+            stats.queued_jobs += 1
+            stats.peak_queue_length = max(stats.peak_queue_length, len(waiting_jobs))
+
+    # the input is done, run the queue down
+    while len(waiting_jobs) > 0:
+        yield from release_workers(active_workers[0][0] + 1)
+
+    stats.seconds = time.perf_counter() - started
+
+
+def generate_jobs(job_count: int, mean_gap: float = 0.5, max_duration: int = 120, seed: int = 0) -> Iterator[Job]:
+    # arrivals with exponential gaps, so load comes in bursts over as many days as it takes
+    rng = random.Random(seed)
+    current_time = 0.0
+    for _ in range(job_count):
+        current_time += rng.expovariate(1 / mean_gap)
+        yield Job(start_time=int(current_time), duration=rng.randint(1, max_duration))
+
+
+def benchmark(job_counts: Tuple[int, ...] = (100_000, 1_000_000), max_worker_limits: Tuple[Optional[int], ...] = (None, 150, 125)) -> None:
+    for job_count in job_counts:
+        for max_workers in max_worker_limits:
+            stats = SchedulerStats()
+            for _ in schedule_jobs(generate_jobs(job_count), max_workers, stats):
+                pass
+            print(f"{job_count:>9,} jobs, max workers {max_workers}: {stats.summary()}")
+
+
 def main(filename: str):
     jobs_to_schedule: List[Job] = ingest_file(filename)
     assigned_jobs = assign_jobs(jobs_to_schedule)
@@ -157,9 +325,49 @@ def main(filename: str):
     for job in assigned_jobs:
         print_format_job_worker_pair(job[0], job[1])
 
+def main_limited(filename: str, max_workers: int):
+    # the whole file is read, so its jobs can come in any order
+    jobs: List[Job] = ingest_file(filename)
+    order = sorted(range(len(jobs)), key=lambda job_id: jobs[job_id].start_time)
+
+    stats = SchedulerStats()
+    assigned_jobs = sorted(
+        (order[position], worker_id)
+        for position, worker_id, _ in schedule_jobs((jobs[job_id] for job_id in order), max_workers, stats)
+    )
+
+    print(stats.peak_workers)
+    for job_id, worker_id in assigned_jobs:
+        print_format_job_worker_pair(job_id, worker_id)
+    print(stats.summary(), file=sys.stderr)
+
+def main_streaming(filename: str, max_workers: Optional[int]) -> int:
+    stats = SchedulerStats()
+    try:
+        for job_id, worker_id, _ in schedule_jobs(stream_jobs(filename), max_workers, stats):
+            print_format_job_worker_pair(job_id, worker_id)
+    except UnorderedJobsError as e:
+        print(f"--stream needs jobs in start time order ({e}), run without --stream to schedule unordered input", file=sys.stderr)
+        return 2
+    print(stats.summary(), file=sys.stderr)
+    return 0
+
 if __name__=="__main__":
-    filename = \
-        "lyft_laptop/jobscheduler_sample_input.txt" \
-        if len(sys.argv) < 2 \
-        else sys.argv[1]
-    main(filename)
+    # python jobscheduler.py [file] [--stream] [--max-workers=N] [--benchmark]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    max_workers_args = [arg for arg in sys.argv[1:] if arg.startswith("--max-workers=")]
+    max_workers = int(max_workers_args[0].split("=")[1]) if max_workers_args else None
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        filename = \
+            "lyft_laptop/jobscheduler_sample_input.txt" \
+            if len(args) < 1 \
+            else args[0]
+        if "--stream" in sys.argv:
+            sys.exit(main_streaming(filename, max_workers))
+        elif max_workers is not None:
+            main_limited(filename, max_workers)
+        else:
+            main(filename)
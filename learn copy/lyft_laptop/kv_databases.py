@@ -1,7 +1,12 @@
-import copy
 from dataclasses import dataclass
+import codecs
+import gc
+import io
+import mmap
+import os
 import sys
-from typing import Dict, List
+import time
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, TextIO, Tuple
 
 
 """
@@ -126,6 +131,21 @@ COMMIT
 # 1 has high initialization time and size, on order of dict, but is just moving around pointers (const time) for apply
 # 1 is also simpler to implement
 # so we're doing 1, given the time constraints of the interview
+### revisited
+# 1 deep copies the whole dataset on every BEGIN, which does not scale to millions of keys
+# so now it's 2 with the layering from 3:
+# - the committed data lives in one ComboDict
+# - every open transaction is a frame holding only its own writes, with None marking an unset (tombstone)
+#   and the value each name had before the frame first wrote it
+# - GET looks through the frames newest first, then the committed data
+# - ROLLBACK drops the newest frame, COMMIT replays the frames oldest first into the committed data
+# BEGIN is constant time, ROLLBACK and COMMIT are on the order of the changes in the frames
+### reverse index
+# a list of names per value makes UNSET O(names with that value) because of list.remove
+# only the count is needed for NUMWITHVALUE, so keep value -> count instead,
+# plus an optional value -> set of names for callers that need the names
+# both describe the latest values including open transactions, so NUMWITHVALUE is a single lookup
+# ROLLBACK moves the frame's names back to their values from before the frame
 
 NULL = "NULL"
 NO_TRANSACTION = "NO TRANSACTION"
@@ -142,118 +162,304 @@ COMMIT = "COMMIT"
 
 @dataclass
 class ComboDict:
+    # committed values
     main_dict:Dict[str, int]
-    reverse_dict: Dict[int, List[str]]
-    transaction_count: int # this is imprecise
+    # the latest values, including open transactions
+    value_counts: Dict[int, int]
+    names_by_value: Optional[Dict[int, Set[str]]]
 
-    def __init__(self):
+    def __init__(self, track_names_by_value: bool = False):
         self.main_dict = dict()
-        self.reverse_dict = dict()
-        self.transaction_count = 0
-
+        self.value_counts = dict()
+        self.names_by_value = dict() if track_names_by_value else None
 
-frame_levels: List[ComboDict] = [ComboDict()]
 
+@dataclass
+class TransactionFrame:
+    # name -> value written in this transaction, None if it was unset
+    writes: Dict[str, Optional[int]]
+    # name -> value before this transaction first wrote it, None if it was not set
+    previous_values: Dict[str, Optional[int]]
 
-def get_current_dict() -> ComboDict:
-    return frame_levels[0]
-
+    def __init__(self):
+        self.writes = dict()
+        self.previous_values = dict()
 
-def set_value(name: str, value: int) -> None:
-    if name not in get_current_dict().main_dict.keys():
-        get_current_dict().main_dict[name] = value
-        
-        if value not in get_current_dict().reverse_dict.keys():
-            get_current_dict().reverse_dict[value] = list()
-        
-        get_current_dict().reverse_dict[value].append(name)
 
+committed = ComboDict()
+# open transactions, oldest first
+transaction_frames: List[TransactionFrame] = list()
 
-def get_value(name: str) -> None:
-    print(get_current_dict().main_dict.get(name, NULL))
 
+def reset(track_names_by_value: bool = False) -> None:
+    global committed, transaction_frames
+    committed = ComboDict(track_names_by_value)
+    transaction_frames = list()
 
-def unset_name(name: str) -> None:
-    if name in get_current_dict().main_dict.keys():
-        value = get_current_dict().main_dict[name]
-        get_current_dict().reverse_dict[value].remove(name)
-        del(get_current_dict().main_dict[name])
 
+def update_value_index(name: str, old_value: Optional[int], new_value: Optional[int]) -> None:
+    if old_value is not None:
+        committed.value_counts[old_value] -= 1
         # keep dict from staying huge unnecessarily
-        if len(get_current_dict().reverse_dict[value]) == 0:
-            del(get_current_dict().reverse_dict[value])
+        if committed.value_counts[old_value] == 0:
+            del(committed.value_counts[old_value])
 
+        if committed.names_by_value is not None:
+            committed.names_by_value[old_value].discard(name)
+            if len(committed.names_by_value[old_value]) == 0:
+                del(committed.names_by_value[old_value])
 
-# Print out the number of variables that are currently set to value. If no variables equal that value, print 0.
-def get_num_with_value(value: int) -> None:
-    print(len(get_current_dict().reverse_dict.get(value, list())))
+    if new_value is not None:
+        committed.value_counts[new_value] = committed.value_counts.get(new_value, 0) + 1
 
+        if committed.names_by_value is not None:
+            if new_value not in committed.names_by_value:
+                committed.names_by_value[new_value] = set()
+            committed.names_by_value[new_value].add(name)
 
-def begin():
-    frame_levels.insert(0, copy.deepcopy(frame_levels[0]))
 
+def resolve_value(name: str) -> Optional[int]:
+    # the newest frame that wrote the name has its current value
+    for frame in reversed(transaction_frames):
+        if name in frame.writes:
+            return frame.writes[name]
 
-def commit():
-    if len(frame_levels) > 1:
+    return committed.main_dict.get(name)
 
-        # TODO if no transactions, print it
-        if get_current_dict().transaction_count == 0:
-            print(NO_TRANSACTION)
 
-        frame_levels[1] = frame_levels[0]
-        frame_levels.pop()
+def write_value(name: str, value: Optional[int]) -> None:
+    old_value = resolve_value(name)
+    if old_value == value:
+        return
 
-        # main_dict and reverse_dict should still be pointing to the same object
-        # so no re-assignment is necessary
+    update_value_index(name, old_value, value)
 
+    if transaction_frames:
+        frame = transaction_frames[-1]
+        if name not in frame.writes:
+            frame.previous_values[name] = old_value
+        frame.writes[name] = value
+    elif value is None:
+        del(committed.main_dict[name])
     else:
-        print(NO_TRANSACTION)
+        committed.main_dict[name] = value
 
 
-def rollback():
-    if len(frame_levels) > 1:
-        frame_levels.pop(0)
-    else:
-        print(NO_TRANSACTION)
-
-
-def process_command(cmd_inputs: List[str]) -> None:
-    cmd = cmd_inputs[0]
-
-    if cmd == SET:
-        set_value(cmd_inputs[1], cmd_inputs[2])
-        get_current_dict().transaction_count += 1
-    elif cmd == GET:
-        get_value(cmd_inputs[1])
-    elif cmd == UNSET:
-        unset_name(cmd_inputs[1])
-        get_current_dict().transaction_count += 1
-    elif cmd == NUMWITHVALUE:
-        get_num_with_value(cmd_inputs[1])
-    elif cmd == END:
-        exit()
-    elif cmd == BEGIN:
-        begin()
-    elif cmd == ROLLBACK:
-        rollback()
-    elif cmd == COMMIT:
-        commit()
+def set_value(name: str, value: int) -> None:
+    write_value(name, value)
+
+
+# commands that produce output return it instead of printing, so the caller decides how to buffer it
+def get_value(name: str) -> str:
+    value = resolve_value(name)
+    return value if value is not None else NULL
+
+
+def unset_name(name: str) -> None:
+    write_value(name, None)
+
+
+# Print out the number of variables that are currently set to value. If no variables equal that value, print 0.
+def get_num_with_value(value: int) -> str:
+    return str(committed.value_counts.get(value, 0))
+
+
+def get_names_with_value(value: int) -> Set[str]:
+    if committed.names_by_value is None:
+        raise ValueError("names by value are not tracked, call reset(track_names_by_value=True)")
+
+    return set(committed.names_by_value.get(value, set()))
+
+
+def begin():
+    transaction_frames.append(TransactionFrame())
+
+
+def commit() -> Optional[str]:
+    if transaction_frames:
+        # COMMIT closes every open block
+        # replaying oldest first leaves each name with its newest write
+        # the value indexes already include the frames
+        for frame in transaction_frames:
+            for name, value in frame.writes.items():
+                if value is None:
+                    committed.main_dict.pop(name, None)
+                else:
+                    committed.main_dict[name] = value
+
+        transaction_frames.clear()
     else:
-        raise ValueError(f"Unrecognized command: {cmd}")
+        return NO_TRANSACTION
 
 
-def main(filename: str):
-    with open(filename, 'r') as f:
-        line = f.readline()
-        
-        while line:
-            process_command(line.strip().split(' '))
-            line = f.readline()
+def rollback() -> Optional[str]:
+    if transaction_frames:
+        frame = transaction_frames.pop()
+        for name, previous_value in frame.previous_values.items():
+            update_value_index(name, frame.writes[name], previous_value)
+    else:
+        return NO_TRANSACTION
+
+
+# command -> (handler, number of arguments)
+# END has no handler, it stops processing
+COMMAND_TABLE: Dict[str, Tuple[Optional[Callable[..., Optional[str]]], int]] = {
+    SET: (set_value, 2),
+    GET: (get_value, 1),
+    UNSET: (unset_name, 1),
+    NUMWITHVALUE: (get_num_with_value, 1),
+    END: (None, 0),
+    BEGIN: (begin, 0),
+    ROLLBACK: (rollback, 0),
+    COMMIT: (commit, 0),
+}
+
+
+def get_command_handler(cmd_inputs: List[str]) -> Optional[Callable[..., Optional[str]]]:
+    """
+    the handler for a command line, None for END
+    raises on unknown commands and wrong argument counts
+    """
+    command = COMMAND_TABLE.get(cmd_inputs[0])
+    if command is None:
+        raise ValueError(f"Unrecognized command: {cmd_inputs[0]}")
+
+    handler, argument_count = command
+    if len(cmd_inputs) != argument_count + 1:
+        raise ValueError(f"{cmd_inputs[0]} takes {argument_count} arguments, got: {' '.join(cmd_inputs)}")
+    return handler
+
+
+def process_command(cmd_inputs: List[str]) -> Optional[str]:
+    """
+    run one command and return its output, if any
+    """
+    handler = get_command_handler(cmd_inputs)
+    if handler is None:
+        return None
+
+    return handler(*cmd_inputs[1:])
+
+
+# read and write in blocks this big
+BLOCK_SIZE = 1 << 20
+
+
+def run_commands(source: BinaryIO, output: TextIO) -> int:
+    """
+    run every command in source up to END, writing the output once per block read
+    if a command raises, the output of the commands before it is still written
+    returns the number of commands run
+    """
+    command_count = 0
+    partial_line = ""
+    # a block can also end in the middle of a multi-byte character
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    while True:
+        block = source.read(BLOCK_SIZE)
+        # a line cut off at the end of the block is finished by the next block
+        lines = (partial_line + decoder.decode(block, final=not block)).split("\n")
+        partial_line = lines.pop() if block else ""
+
+        block_output: List[str] = list()
+        try:
+            for line in lines:
+                cmd_inputs = line.split()
+                if not cmd_inputs:
+                    continue
+
+                command_count += 1
+                handler = get_command_handler(cmd_inputs)
+                if handler is None:
+                    return command_count
+
+                result = handler(*cmd_inputs[1:])
+                if result is not None:
+                    block_output.append(result + "\n")
+        finally:
+            output.write("".join(block_output))
+
+        if not block:
+            return command_count
+
+
+def open_command_source(filename: str) -> BinaryIO:
+    # - reads stdin, anything else is memory mapped so blocks come straight from the page cache
+    if filename == "-":
+        return sys.stdin.buffer
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return io.BytesIO()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def main(filename: str, report_stats: bool = False):
+    source = open_command_source(filename)
+    # run_commands writes once per block, so stdout's own buffering is enough
+    output = sys.stdout
+
+    start = time.perf_counter()
+    try:
+        command_count = run_commands(source, output)
+    finally:
+        output.flush()
+        if source is not sys.stdin.buffer:
+            source.close()
+    seconds = time.perf_counter() - start
+
+    if report_stats:
+        print(
+            f"commands: {command_count}, seconds: {seconds:.3f}, "
+            f"commands/sec: {command_count / seconds if seconds > 0 else 0:.0f}",
+            file=sys.stderr
+        )
+
+
+def benchmark_begin(dataset_sizes: Tuple[int, ...] = (1_000, 100_000, 1_000_000), nested_begins: int = 1_000) -> None:
+    # BEGIN should cost the same no matter how much data is committed
+    for dataset_size in dataset_sizes:
+        reset()
+        for i in range(dataset_size):
+            set_value(f"key{i}", str(i % 100))
+
+        # a collection pass over millions of committed objects would land in whichever timing it hits
+        gc.collect()
+        gc.disable()
+
+        # every frame gets a write, so ROLLBACK has something to undo
+        begin_seconds = 0.0
+        for i in range(nested_begins):
+            start = time.perf_counter()
+            begin()
+            begin_seconds += time.perf_counter() - start
+            set_value(f"key{i}", "changed")
+
+        start = time.perf_counter()
+        while transaction_frames:
+            rollback()
+        rollback_seconds = time.perf_counter() - start
+
+        gc.enable()
+        print(
+            f"keys: {dataset_size}, "
+            f"BEGIN: {begin_seconds / nested_begins * 1e6:.2f} us, "
+            f"ROLLBACK: {rollback_seconds / nested_begins * 1e6:.2f} us"
+        )
+
+    reset()
 
 
 if __name__=="__main__":
-    filename = \
-        "lyft_laptop/kv_databases_sample_input_2.txt" \
-        if len(sys.argv) < 2 \
-        else sys.argv[1]
-    main(filename)
+    # python kv_databases.py [file, or - for stdin] [--stats]
+    # python kv_databases.py --benchmark
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--benchmark" in sys.argv:
+        benchmark_begin()
+    else:
+        filename = \
+            "lyft_laptop/kv_databases_sample_input_2.txt" \
+            if len(args) < 1 \
+            else args[0]
+        main(filename, report_stats="--stats" in sys.argv)
@@ -0,0 +1,108 @@
+import os
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import pytest
+from T9 import T9_DICT, T9Index, encode_word, read_input
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), "t9_sample_input.txt")
+
+
+# the original trie search, kept as the oracle for T9Index
+@dataclass
+class TrieNode:
+    children: Dict[str, Any] # TrieNode
+    is_word: bool
+
+def _build_trie(words: List[str]) -> TrieNode:
+    root = TrieNode(children=dict(), is_word=False)
+    for word in words:
+        current = root
+        for char in word:
+            if char not in current.children:
+                current.children[char] = TrieNode(children=dict(), is_word=False)
+            current = current.children[char]
+        current.is_word = True
+    return root
+
+def _trie_search(digit_string: str, root: TrieNode) -> List[str]:
+    """
+    breadth first over (node, letters so far, digits left)
+    """
+    if len(digit_string) == 0:
+        return list()
+
+    possible_words: List[str] = list()
+    horizon = deque([(root, "", digit_string)])
+    while len(horizon) > 0:
+        node, letters, remaining_digits = horizon.popleft()
+        if len(remaining_digits) == 0:
+            if node.is_word:
+                possible_words.append(letters)
+            continue
+        for char in T9_DICT[remaining_digits[0]]:
+            if char in node.children:
+                horizon.append((node.children[char], letters + char, remaining_digits[1:]))
+    return possible_words
+
+@pytest.fixture(scope="module")
+def sample():
+    words, inputs = read_input(SAMPLE_INPUT)
+    return words, inputs, T9Index(words), _build_trie(words)
+
+def test_read_input(sample):
+    words, inputs, _, _ = sample
+    assert inputs == ["968", "63", "627427482", "737456"]
+    assert words[:2] == ["aa", "aah"]
+    assert all(word.islower() for word in words)
+
+def test_sample_output(sample):
+    _, _, index, _ = sample
+    assert index.lookup("968") == ["wot", "you"]
+    assert index.lookup("63") == ["me", "ne", "od", "oe", "of"]
+    assert index.lookup("627427482") == ["margarita"]
+    assert index.lookup("737456") == []
+
+def test_lookup_matches_trie_search(sample):
+    words, inputs, index, trie = sample
+    rng = random.Random(0)
+    digit_strings = inputs + [encode_word(word) for word in rng.sample(words, 300)]
+    digit_strings += ["".join(rng.choices("23456789", k=rng.randint(1, 6))) for _ in range(300)]
+
+    for digit_string in digit_strings:
+        assert index.lookup(digit_string) == sorted(_trie_search(digit_string, trie)), digit_string
+
+def test_lookup_prefix(sample):
+    words, _, index, _ = sample
+    rng = random.Random(1)
+    encoded_words = [(encode_word(word), word) for word in words]
+
+    for digit_string in ["9", "63", "6274", "737456", "2222222"] + [encode_word(word)[:3] for word in rng.sample(words, 50)]:
+        expected = [word for digits, word in encoded_words if digits.startswith(digit_string)]
+        results = index.lookup_prefix(digit_string)
+        assert sorted(results) == sorted(expected), digit_string
+        # grouped by encoding, in encoding order
+        assert [encode_word(word) for word in results] == sorted(encode_word(word) for word in results)
+
+        assert index.lookup_prefix(digit_string, limit=3) == results[:3]
+        assert index.lookup_prefix(digit_string, limit=0) == []
+
+def test_empty_and_unknown_digits(sample):
+    _, _, index, trie = sample
+    for digit_string in ["", "1", "0", "21", "609", "x"]:
+        assert index.lookup(digit_string) == []
+        assert index.lookup_prefix(digit_string) == []
+    assert _trie_search("21", trie) == []
+
+def test_encode_and_add_words():
+    assert encode_word("the") == "843"
+    assert encode_word("The") is None
+    assert encode_word("it's") is None
+    assert encode_word("") is None
+
+    index = T9Index(["good", "home", "gone", "hood", "Home", "héllo"])
+    assert index.word_count == 4
+    assert index.lookup("4663") == ["gone", "good", "home", "hood"]
+    index.add_words(["inod"])
+    assert index.lookup("4663") == ["gone", "good", "home", "hood", "inod"]
@@ -0,0 +1,130 @@
+import os
+import random
+from typing import List
+import pytest
+from autocomplete import (
+    AutocompleteSession,
+    CompactAutocompleteIndex,
+    PrefixCache,
+    WordRank,
+    autocomplete,
+    create_trie,
+    generate_words,
+    ingest_file,
+)
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), "autocomplete_sample_input.txt")
+
+
+def _brute_force(word_ranks: List[WordRank], prefix: str, k: int) -> List[WordRank]:
+    if len(prefix) == 0:
+        return list()
+    return sorted((w for w in word_ranks if w.word.startswith(prefix)), key=lambda w: w.rank)[:k]
+
+def _random_dictionary(seed: int) -> List[WordRank]:
+    rng = random.Random(seed)
+    words = list({"".join(rng.choices("abc", k=rng.randint(1, 6))) for _ in range(rng.randint(1, 300))})
+    rng.shuffle(words)
+    return [WordRank(word=word, rank=rank) for rank, word in enumerate(words, start=1)]
+
+def _prefixes(word_ranks: List[WordRank], seed: int) -> List[str]:
+    rng = random.Random(seed)
+    prefixes = [w.word[:rng.randint(1, len(w.word))] for w in rng.choices(word_ranks, k=50)]
+    # no matches, before, between and after every word
+    return prefixes + ["d", "abcabcab", "A", "é", "ab" + chr(0x1F600), "0"]
+
+@pytest.mark.parametrize("k", [1, 2, 5])
+@pytest.mark.parametrize("seed", range(20))
+def test_autocomplete_matches_brute_force(k: int, seed: int):
+    word_ranks = _random_dictionary(seed)
+    index = CompactAutocompleteIndex(word_ranks, k=k, cache_size=0)
+
+    for prefix in _prefixes(word_ranks, seed):
+        assert index.autocomplete(prefix) == _brute_force(word_ranks, prefix, k), prefix
+
+def test_words_that_prefix_each_other():
+    words = ["a", "ab", "abc", "abcd", "abd", "b", "ba"]
+    word_ranks = [WordRank(word=word, rank=rank) for rank, word in enumerate(reversed(words), start=1)]
+
+    for k in range(1, len(words) + 2):
+        index = CompactAutocompleteIndex(word_ranks, k=k)
+        for prefix in ["a", "ab", "abc", "abcd", "abd", "b", "ba", "c", "abcde"]:
+            assert index.autocomplete(prefix) == _brute_force(word_ranks, prefix, k)
+
+@pytest.mark.parametrize("cache_size", [0, 3, 10_000])
+@pytest.mark.parametrize("seed", range(10))
+def test_autocomplete_many_matches_brute_force(cache_size: int, seed: int):
+    word_ranks = _random_dictionary(seed)
+    index = CompactAutocompleteIndex(word_ranks, k=3, cache_size=cache_size)
+    prefixes = _prefixes(word_ranks, seed)
+
+    results = index.autocomplete_many(prefixes + prefixes[:10])
+    assert results == {prefix: _brute_force(word_ranks, prefix, 3) for prefix in prefixes}
+
+    with pytest.raises(ValueError):
+        index.autocomplete_many(["a", ""])
+
+@pytest.mark.parametrize("cache_size", [0, 2, 10_000])
+def test_session_matches_brute_force(cache_size: int):
+    word_ranks = generate_words(2_000, seed=3)
+    index = CompactAutocompleteIndex(word_ranks, k=5, cache_size=cache_size)
+    session = AutocompleteSession(index)
+    rng = random.Random(4)
+
+    typed = ""
+    for _ in range(2_000):
+        action = rng.random()
+        if action < 0.6:
+            chars = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(1, 2)))
+            results = session.type(chars)
+            typed += chars
+        elif action < 0.95:
+            # goes past the empty text now and then
+            count = rng.randint(1, 4)
+            results = session.backspace(count)
+            typed = typed[:-count] if count < len(typed) else ""
+        else:
+            session.reset()
+            results = session.results()
+            typed = ""
+
+        assert session.prefix == typed
+        assert results == _brute_force(word_ranks, typed, 5)
+
+    # callers get their own lists
+    session.reset()
+    session.type(word_ranks[0].word[:1]).clear()
+    assert session.results() == _brute_force(word_ranks, word_ranks[0].word[:1], 5)
+
+def test_prefix_cache_evicts_least_recently_used():
+    cache = PrefixCache(2)
+    cache.put("a", (0, 1, []))
+    cache.put("b", (1, 2, []))
+    assert cache.get("a") is not None
+    cache.put("c", (2, 3, []))
+
+    assert list(cache.entries.keys()) == ["a", "c"]
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with pytest.raises(ValueError):
+        PrefixCache(0)
+
+def test_evicted_prefixes_are_looked_up_again():
+    word_ranks = generate_words(500, seed=5)
+    index = CompactAutocompleteIndex(word_ranks, k=5, cache_size=1)
+    first, second = word_ranks[0].word[:2], word_ranks[1].word[:1]
+
+    expected = index.autocomplete(first)
+    index.autocomplete(second)
+    assert first not in index.cache.entries
+    assert index.autocomplete(first) == expected == _brute_force(word_ranks, first, 5)
+
+def test_matches_trie_on_sample():
+    word_ranks, word_searches = ingest_file(SAMPLE_INPUT)
+    index = CompactAutocompleteIndex(word_ranks, k=5)
+    trie = create_trie(word_ranks)
+
+    results = index.autocomplete_many(word_searches)
+    for prefix in word_searches:
+        assert results[prefix] == autocomplete(prefix, trie)[:5]
@@ -0,0 +1,100 @@
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import pytest
+from jobscheduler import (
+    Job,
+    SchedulerStats,
+    UnorderedJobsError,
+    generate_jobs,
+    ingest_file,
+    main_streaming,
+    schedule_jobs,
+)
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), "jobscheduler_sample_input.txt")
+
+
+def _minute_by_minute(jobs: List[Job], max_workers: Optional[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    job_id -> (worker_id, start_time), stepping through every minute
+    """
+    # last busy minute of every worker
+    busy_until: List[int] = list()
+    waiting = deque()
+    assignments: Dict[int, Tuple[int, int]] = dict()
+    next_job = 0
+    minute = 0
+
+    while len(assignments) < len(jobs):
+        while next_job < len(jobs) and jobs[next_job].start_time == minute:
+            waiting.append(next_job)
+            next_job += 1
+
+        while len(waiting) > 0:
+            free_workers = [worker_id for worker_id, end_time in enumerate(busy_until) if end_time < minute]
+            if free_workers:
+                worker_id = free_workers[0]
+            elif max_workers is None or len(busy_until) < max_workers:
+                busy_until.append(-1)
+                worker_id = len(busy_until) - 1
+            else:
+                break
+            job_id = waiting.popleft()
+            busy_until[worker_id] = minute + jobs[job_id].duration
+            assignments[job_id] = (worker_id, minute)
+        minute += 1
+
+    return assignments
+
+@pytest.mark.parametrize("max_workers", [None, 40, 12, 1])
+def test_schedule_jobs_matches_minute_by_minute(max_workers: Optional[int]):
+    jobs = list(generate_jobs(2_000, mean_gap=1.0, max_duration=30, seed=7))
+    stats = SchedulerStats()
+    scheduled = {
+        job_id: (worker_id, start_time)
+        for job_id, worker_id, start_time in schedule_jobs(jobs, max_workers, stats)
+    }
+
+    assert scheduled == _minute_by_minute(jobs, max_workers)
+    assert stats.jobs == len(jobs)
+    assert stats.peak_workers == len({worker_id for worker_id, _ in scheduled.values()})
+    if max_workers is not None:
+        assert stats.peak_workers <= max_workers
+
+def test_schedule_sample_input():
+    jobs = ingest_file(SAMPLE_INPUT)
+    jobs.sort(key=lambda job: job.start_time)
+
+    unlimited = SchedulerStats()
+    assert [worker_id for _, worker_id, _ in schedule_jobs(jobs, stats=unlimited)] == [0, 1, 2, 3, 0, 1, 0, 0, 1, 2]
+    assert unlimited.peak_workers == 4
+    assert unlimited.queued_jobs == 0
+
+    limited = SchedulerStats()
+    scheduled = list(schedule_jobs(jobs, 3, limited))
+    assert limited.peak_workers == 3
+    assert limited.queued_jobs == 2
+    # the job at 0030 waits for the first worker to free up at 0031
+    assert (3, 0, 31) in scheduled
+
+def test_schedule_jobs_rejects_unordered_input():
+    with pytest.raises(UnorderedJobsError):
+        list(schedule_jobs([Job(59, 1), Job(58, 2)]))
+    with pytest.raises(ValueError) as e:
+        list(schedule_jobs([Job(0, 1)], max_workers=0))
+    assert not isinstance(e.value, UnorderedJobsError)
+
+def test_main_streaming_reports_only_unordered_input(tmp_path, capsys):
+    unordered = tmp_path / "unordered.txt"
+    unordered.write_text("2\n0100 5\n0030 5\n")
+    assert main_streaming(str(unordered), None) == 2
+    assert "--stream needs jobs in start time order" in capsys.readouterr().err
+
+    # other bad input is not mistaken for ordering
+    malformed = tmp_path / "malformed.txt"
+    malformed.write_text("1\n0030 five\n")
+    with pytest.raises(ValueError):
+        main_streaming(str(malformed), None)
+    with pytest.raises(ValueError):
+        main_streaming(str(SAMPLE_INPUT), 0)
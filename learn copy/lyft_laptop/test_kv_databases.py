@@ -0,0 +1,97 @@
+import io
+import pytest
+import kv_databases
+from kv_databases import NO_TRANSACTION, NULL, process_command, reset, run_commands
+
+
+@pytest.fixture(autouse=True)
+def empty_db():
+    reset()
+    yield
+    reset()
+
+def _run(text: str) -> str:
+    output = io.StringIO()
+    run_commands(io.BytesIO(text.encode()), output)
+    return output.getvalue()
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 7, 1 << 20])
+def test_run_commands_block_boundaries(monkeypatch, block_size: int):
+    monkeypatch.setattr(kv_databases, "BLOCK_SIZE", block_size)
+    commands = "SET ex 10\nGET ex\n\nSET ключ 🙂\nGET ключ\nNUMWITHVALUE 10\nUNSET ex\nGET ex\nEND\nGET ex\n"
+
+    assert _run(commands) == "10\n🙂\n1\nNULL\n"
+
+def test_run_commands_without_end(monkeypatch):
+    monkeypatch.setattr(kv_databases, "BLOCK_SIZE", 4)
+    assert _run("SET a 1\nGET a") == "1\n"
+
+@pytest.mark.parametrize("bad_command", ["FROB a", "GET", "SET a"])
+def test_run_commands_keeps_output_before_an_error(bad_command: str):
+    output = io.StringIO()
+    with pytest.raises(ValueError):
+        run_commands(io.BytesIO(f"SET a 1\nGET a\nNUMWITHVALUE 1\n{bad_command}\nGET a\nEND\n".encode()), output)
+    assert output.getvalue() == "1\n1\n"
+
+def _commands(*lines: str):
+    return [process_command(line.split()) for line in lines]
+
+def test_set_overwrites():
+    assert _commands("SET a 1", "SET a 2", "GET a", "NUMWITHVALUE 1", "NUMWITHVALUE 2") == [None, None, "2", "0", "1"]
+
+def test_nested_rollback():
+    assert _commands(
+        "SET a 1",
+        "BEGIN", "SET a 2", "SET b 5",
+        "BEGIN", "SET a 3", "UNSET b", "GET a", "GET b",
+        "ROLLBACK", "GET a", "GET b",
+        "ROLLBACK", "GET a", "GET b",
+        "ROLLBACK",
+    ) == [
+        None,
+        None, None, None,
+        None, None, None, "3", NULL,
+        None, "2", "5",
+        None, "1", NULL,
+        NO_TRANSACTION,
+    ]
+
+def test_commit_closes_every_block():
+    assert _commands(
+        "SET a 1",
+        "BEGIN", "SET a 2", "SET c 4",
+        "BEGIN", "UNSET a", "SET b 3",
+        "COMMIT", "ROLLBACK", "COMMIT",
+        "GET a", "GET b", "GET c",
+    ) == [None] * 7 + [None, NO_TRANSACTION, NO_TRANSACTION, NULL, "3", "4"]
+    assert kv_databases.committed.main_dict == {"b": "3", "c": "4"}
+
+def test_rollback_to_outer_block_value():
+    # a name written in an outer block and again in an inner one rolls back to the outer value
+    assert _commands(
+        "BEGIN", "SET a 1",
+        "BEGIN", "SET a 2", "SET a 3", "UNSET a", "SET a 4",
+        "ROLLBACK", "GET a",
+        "COMMIT", "GET a",
+    ) == [None] * 8 + ["1", None, "1"]
+
+def test_num_with_value_after_rollback():
+    assert _commands(
+        "SET a 1", "SET b 1", "SET c 2",
+        "BEGIN", "SET a 2", "UNSET b", "SET d 1", "NUMWITHVALUE 1", "NUMWITHVALUE 2",
+        "BEGIN", "SET c 1", "SET e 1", "NUMWITHVALUE 1",
+        "ROLLBACK", "NUMWITHVALUE 1", "NUMWITHVALUE 2",
+        "ROLLBACK", "NUMWITHVALUE 1", "NUMWITHVALUE 2",
+    ) == [None] * 7 + ["1", "2"] + [None] * 3 + ["3"] + [None, "1", "2"] + [None, "2", "1"]
+    assert kv_databases.committed.value_counts == {"1": 2, "2": 1}
+
+def test_names_with_value():
+    with pytest.raises(ValueError):
+        kv_databases.get_names_with_value("1")
+
+    reset(track_names_by_value=True)
+    _commands("SET a 1", "SET b 1", "BEGIN", "SET a 2", "SET c 1")
+    assert kv_databases.get_names_with_value("1") == {"b", "c"}
+    _commands("ROLLBACK")
+    assert kv_databases.get_names_with_value("1") == {"a", "b"}
+    assert kv_databases.get_names_with_value("2") == set()
@@ -0,0 +1,149 @@
+import os
+import pytest
+from versioned_kv_store import (
+    LOG_FILE,
+    PersistentVersionedKVStore,
+    VersionedKVStore,
+    bulk_load,
+)
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), "versioned_kv_store_sample_input.txt")
+
+
+def _history(store: VersionedKVStore, keys, version: int):
+    return {key: [store.get(key, v) for v in range(store.watermark, version + 1)] for key in keys}
+
+def test_round_trip(tmp_path):
+    store = PersistentVersionedKVStore(str(tmp_path), snapshot_every=3)
+    for i in range(10):
+        store.put(f"key{i % 4}", i * 10)
+    expected = _history(store, ["key0", "key1", "key2", "key3", "missing"], store.version)
+    store.close()
+
+    reopened = PersistentVersionedKVStore(str(tmp_path), snapshot_every=3)
+    assert reopened.version == 10
+    assert _history(reopened, ["key0", "key1", "key2", "key3", "missing"], 10) == expected
+    assert reopened.put("key0", 1) == 11
+    reopened.close()
+
+def test_replay_partly_written_log(tmp_path):
+    store = PersistentVersionedKVStore(str(tmp_path), snapshot_every=100)
+    store.put("a", 1)
+    store.put("b", 2)
+    store.close()
+
+    # a crash in the middle of writing the third record
+    log_path = os.path.join(str(tmp_path), LOG_FILE)
+    complete_size = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b"\x03\x00\x00")
+
+    reopened = PersistentVersionedKVStore(str(tmp_path))
+    assert reopened.version == 2
+    assert (reopened.get("a"), reopened.get("b")) == (1, 2)
+    assert os.path.getsize(log_path) == complete_size
+
+    # the torn tail is gone, so later records replay cleanly
+    reopened.put("c", 3)
+    reopened.close()
+    assert PersistentVersionedKVStore(str(tmp_path)).get("c") == 3
+
+def test_compaction_then_restart(tmp_path):
+    store = PersistentVersionedKVStore(str(tmp_path), snapshot_every=1000)
+    for i in range(1, 11):
+        store.put("key", i)
+    store.put("other", 100)
+    assert store.compact(8) == 7
+    store.put("key", 12)
+    store.close()
+
+    reopened = PersistentVersionedKVStore(str(tmp_path))
+    assert reopened.watermark == 8
+    assert reopened.version_count() == 5
+    assert [reopened.get("key", v) for v in range(8, 13)] == [8, 9, 10, 10, 12]
+    assert reopened.get("other") == 100
+    with pytest.raises(ValueError):
+        reopened.get("key", 3)
+
+def test_bulk_load_survives_restart(tmp_path):
+    store = PersistentVersionedKVStore(str(tmp_path), snapshot_every=3)
+    for i in range(7):
+        store.put("before", i)
+    assert bulk_load(store, SAMPLE_INPUT) == 3
+    assert store.version == 10
+    store.close()
+
+    reopened = PersistentVersionedKVStore(str(tmp_path), snapshot_every=3)
+    assert reopened.version == 10
+    assert reopened.get("key1") == 7
+    assert reopened.get("key1", 8) == 5
+    assert reopened.get("key2") == 6
+    assert reopened.get("before") == 6
+
+def test_bulk_load_matches_put():
+    loaded = VersionedKVStore()
+    bulk_load(loaded, SAMPLE_INPUT)
+
+    put = VersionedKVStore()
+    for key, value in [("key1", 5), ("key2", 6), ("key1", 7)]:
+        put.put(key, value)
+    assert _history(loaded, ["key1", "key2"], 3) == _history(put, ["key1", "key2"], 3)
+
+@pytest.mark.parametrize("key, value", [("k" * 70_000, 1), ("key", 2 ** 63)])
+def test_rejected_put_changes_nothing(tmp_path, key, value):
+    store = PersistentVersionedKVStore(str(tmp_path))
+    store.put("key", 1)
+
+    with pytest.raises((ValueError, OverflowError)):
+        store.put(key, value)
+    assert store.version == 1
+    assert key not in store.histories or store.get(key) == 1
+    store.close()
+
+    reopened = PersistentVersionedKVStore(str(tmp_path))
+    assert reopened.version == 1
+    assert reopened.get("key") == 1
+
+@pytest.mark.parametrize("bad_line", ["PUT b x", f"PUT b {2 ** 64}"])
+def test_bulk_load_rejected_line_changes_nothing(tmp_path, bad_line: str):
+    path = tmp_path / "commands.txt"
+    path.write_text(f"PUT a 1\n{bad_line}\nPUT a 3\n")
+    store = VersionedKVStore()
+
+    with pytest.raises((ValueError, OverflowError)):
+        bulk_load(store, str(path))
+    # the lines before the bad one are loaded, the bad one left no trace
+    assert store.version == 1
+    assert "b" not in store.histories
+    assert store.get("b") is None
+    assert store.put("b", 2) == 2
+    assert store.get("b", 2) == 2
+    assert store.get("a", 2) == 1
+
+def test_bulk_load_overflow_on_existing_key(tmp_path):
+    path = tmp_path / "commands.txt"
+    path.write_text(f"PUT a 1\nPUT a {2 ** 64}\n")
+    store = VersionedKVStore()
+
+    with pytest.raises(OverflowError):
+        bulk_load(store, str(path))
+    assert len(store.histories["a"].versions) == len(store.histories["a"].values) == 1
+    assert store.version == 1
+
+def test_put_is_logged_before_it_returns(tmp_path, monkeypatch):
+    fsyncs = list()
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+
+    store = PersistentVersionedKVStore(str(tmp_path), sync_every=3)
+    for i in range(7):
+        store.put("key", i)
+    assert len(fsyncs) == 2
+
+    # the process dies without close, everything put returned for is in the log
+    crashed = PersistentVersionedKVStore(str(tmp_path))
+    assert crashed.version == 7
+    assert crashed.get("key") == 6
+
+    with pytest.raises(ValueError):
+        PersistentVersionedKVStore(str(tmp_path), sync_every=0)
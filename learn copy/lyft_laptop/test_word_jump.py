@@ -0,0 +1,93 @@
+import os
+from itertools import product
+from typing import Dict, List, Set
+import pytest
+from word_jump import WordIndex, find_shortest_paths, format_paths, generate_dictionary, ingest_file
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), "word_jump_sample_input.txt")
+
+
+def _brute_force(start_word: str, end_word: str, dictionary: Set[str]) -> List[List[str]]:
+    """
+    BFS distances by comparing every pair of words, then every path that steps one distance at a time
+    """
+    def one_letter_apart(a: str, b: str) -> bool:
+        return len(a) == len(b) and sum(char_a != char_b for char_a, char_b in zip(a, b)) == 1
+
+    if end_word not in dictionary or len(start_word) != len(end_word):
+        return list()
+    if start_word == end_word:
+        return [[start_word]]
+
+    distances: Dict[str, int] = {start_word: 0}
+    level = [start_word]
+    while level and end_word not in distances:
+        next_level = list()
+        for word in level:
+            for candidate in dictionary:
+                if candidate not in distances and one_letter_apart(word, candidate):
+                    distances[candidate] = distances[word] + 1
+                    next_level.append(candidate)
+        level = next_level
+    if end_word not in distances:
+        return list()
+
+    paths: List[List[str]] = list()
+    def extend(path: List[str]) -> None:
+        if path[-1] == end_word:
+            paths.append(list(path))
+            return
+        for candidate in dictionary:
+            if distances.get(candidate) == len(path) and one_letter_apart(path[-1], candidate):
+                extend(path + [candidate])
+    extend([start_word])
+    return sorted(paths)
+
+def test_sample():
+    word_pairs, dictionary = ingest_file(SAMPLE_INPUT)
+    index = WordIndex(dictionary)
+
+    (hit, cog), (vault, crypt) = word_pairs
+    assert format_paths(find_shortest_paths(hit, cog, index)) == ["2", "hit,hot,cot,cog", "hit,hot,hog,cog"]
+    assert format_paths(find_shortest_paths(vault, crypt, index)) == ["0"]
+
+def test_start_word_not_in_dictionary():
+    _, dictionary = ingest_file(SAMPLE_INPUT)
+    index = WordIndex(dictionary)
+    assert "hiq" not in index.words
+
+    paths = find_shortest_paths("hiq", "cog", index)
+    assert paths == _brute_force("hiq", "cog", set(dictionary))
+    assert all(path[0] == "hiq" and path[1] in index.words for path in paths)
+    assert len(paths) > 0
+
+    # the end word has to be in the dictionary
+    assert find_shortest_paths("hit", "hiq", index) == []
+    assert find_shortest_paths("hit", "cogs", index) == []
+
+def test_multi_path_dag():
+    # every path flips the three letters in some order
+    dictionary = ["".join(letters) for letters in product("ab", repeat=3)]
+    index = WordIndex(dictionary)
+
+    paths = find_shortest_paths("aaa", "bbb", index)
+    assert len(paths) == 6
+    assert paths == _brute_force("aaa", "bbb", set(dictionary))
+    assert find_shortest_paths("aaa", "aaa", index) == [["aaa"]]
+
+def test_dense_dictionary():
+    # dead ends on the forward side are everywhere, the walk must not wander into them
+    dictionary = ["".join(letters) for letters in product("abcdefgh", repeat=4)]
+    index = WordIndex(dictionary)
+
+    paths = find_shortest_paths("aaaa", "hhhh", index)
+    assert len(paths) == 24
+    assert len(set(map(tuple, paths))) == 24
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(seed: int):
+    dictionary = generate_dictionary(400, lengths=(3,), seed=seed)
+    index = WordIndex(dictionary)
+
+    for start_word, end_word in zip(dictionary[::37], dictionary[::-41]):
+        assert find_shortest_paths(start_word, end_word, index) == _brute_force(start_word, end_word, set(dictionary))
@@ -50,3 +50,342 @@ GET key1(#4) = 7
 GET key2(#1) = <NULL>
 """
 
+
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+import mmap
+import os
+import struct
+import sys
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+# every key keeps its history as two parallel arrays, versions ascending
+# versions only ever grow, so a PUT is an append, and a GET at a version is a bisect
+# array('q') stores 8 bytes per entry instead of a pointer to a boxed int plus the int itself
+
+NULL = "<NULL>"
+
+PUT = "PUT"
+GET = "GET"
+
+
+@dataclass
+class KeyHistory:
+    versions: array
+    values: array
+
+    def __init__(self):
+        self.versions = array('q')
+        self.values = array('q')
+
+
+class VersionedKVStore:
+    def __init__(self):
+        self.histories: Dict[str, KeyHistory] = dict()
+        self.version = 0
+        # versions below this were compacted away and can no longer be looked up
+        self.watermark = 0
+
+    def put(self, key: str, value: int) -> int:
+        history = self.histories.get(key)
+        if history is None:
+            history = KeyHistory()
+
+        # the value goes in first, so one that does not fit in 64 bits raises before anything changes
+        history.values.append(value)
+        self.version += 1
+        history.versions.append(self.version)
+        self.histories[key] = history
+        return self.version
+
+    def get(self, key: str, version: Optional[int] = None) -> Optional[int]:
+        """
+        the value of key at version, or its latest value without one
+        None if the key was not set at that version
+        """
+        history = self.histories.get(key)
+        if history is None:
+            return None
+        if version is None:
+            return history.values[-1]
+        if version < self.watermark:
+            raise ValueError(f"version {version} is below the compaction watermark {self.watermark}")
+
+        # the last write at or before version
+        index = bisect_right(history.versions, version) - 1
+        return history.values[index] if index >= 0 else None
+
+    def compact(self, watermark: int) -> int:
+        """
+        drop the versions no GET at or above watermark can see:
+        per key, everything before its last write at or before the watermark
+        returns the number of versions dropped
+        """
+        dropped = 0
+        for history in self.histories.values():
+            index = bisect_right(history.versions, watermark) - 1
+            if index > 0:
+                del history.versions[:index]
+                del history.values[:index]
+                dropped += index
+
+        self.watermark = max(self.watermark, watermark)
+        return dropped
+
+    def version_count(self) -> int:
+        return sum(len(history.versions) for history in self.histories.values())
+
+
+# persistence
+# - every PUT is appended to a write-ahead log as (version, value, key length) + key bytes,
+#   before the in-memory store changes
+# - the record is handed to the OS before put returns, so a PUT that returned survives the process crashing,
+#   and the log is fsynced every sync_every PUTs, so at most sync_every - 1 returned PUTs can be lost
+#   if the machine goes down; the default of 1 makes every returned PUT durable
+# - every so many PUTs the whole store is written to a snapshot, and the log starts over
+# - startup maps the snapshot, copies each key's arrays out of it in one go, then replays the log
+# log records carry their version, so records already in the snapshot are skipped,
+# which keeps a crash between writing the snapshot and truncating the log harmless
+
+SNAPSHOT_FILE = "snapshot.bin"
+LOG_FILE = "wal.log"
+
+_SNAPSHOT_MAGIC = b"VKVS0001"
+# version, watermark, key count
+_SNAPSHOT_HEADER = struct.Struct("<8sqqq")
+# key length, history length
+_SNAPSHOT_KEY_HEADER = struct.Struct("<Hq")
+# version, value, key length
+_LOG_RECORD = struct.Struct("<qqH")
+
+_ITEM_SIZE = array('q').itemsize
+# the snapshot stores the arrays' raw bytes, little endian like the headers
+_NEEDS_BYTESWAP = sys.byteorder != "little"
+
+
+class PersistentVersionedKVStore(VersionedKVStore):
+    def __init__(self, directory: str, snapshot_every: int = 100_000, sync_every: int = 1):
+        if sync_every < 1:
+            raise ValueError(f"sync_every must be at least 1, got {sync_every}")
+        super().__init__()
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.puts_since_snapshot = 0
+        self.sync_every = sync_every
+        self.puts_since_sync = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.load_snapshot()
+        self.replay_log()
+        self.log: BinaryIO = open(self.log_path(), 'ab')
+
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def log_path(self) -> str:
+        return os.path.join(self.directory, LOG_FILE)
+
+    def put(self, key: str, value: int) -> int:
+        # build the record before touching memory, so a PUT the log cannot hold changes nothing
+        key_bytes = key.encode()
+        try:
+            record = _LOG_RECORD.pack(self.version + 1, value, len(key_bytes)) + key_bytes
+        except struct.error as e:
+            raise ValueError(f"cannot log PUT of key of {len(key_bytes)} bytes with value {value}: {e}") from e
+
+        self.log.write(record)
+        self.log.flush()
+        self.puts_since_sync += 1
+        if self.puts_since_sync >= self.sync_every:
+            os.fsync(self.log.fileno())
+            self.puts_since_sync = 0
+
+        version = super().put(key, value)
+
+        self.puts_since_snapshot += 1
+        if self.puts_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return version
+
+    def compact(self, watermark: int) -> int:
+        # the log alone would bring the dropped versions back on restart
+        dropped = super().compact(watermark)
+        self.snapshot()
+        return dropped
+
+    def flush(self) -> None:
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.puts_since_sync = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.log.close()
+
+    def snapshot(self) -> None:
+        temp_path = self.snapshot_path() + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, self.version, self.watermark, len(self.histories)))
+            for key, history in self.histories.items():
+                key_bytes = key.encode()
+                f.write(_SNAPSHOT_KEY_HEADER.pack(len(key_bytes), len(history.versions)))
+                f.write(key_bytes)
+                for values in (history.versions, history.values):
+                    if _NEEDS_BYTESWAP:
+                        values = array('q', values)
+                        values.byteswap()
+                    f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        # the new snapshot only replaces the old one once it is complete
+        os.replace(temp_path, self.snapshot_path())
+
+        # everything logged so far is in the snapshot
+        if hasattr(self, "log"):
+            self.log.truncate(0)
+            self.flush()
+        self.puts_since_snapshot = 0
+
+    def load_snapshot(self) -> None:
+        if not os.path.exists(self.snapshot_path()) or os.path.getsize(self.snapshot_path()) == 0:
+            return
+
+        with open(self.snapshot_path(), 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+            magic, self.version, self.watermark, key_count = _SNAPSHOT_HEADER.unpack_from(snapshot, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.snapshot_path()} is not a versioned KV store snapshot")
+
+            offset = _SNAPSHOT_HEADER.size
+            for _ in range(key_count):
+                key_length, history_length = _SNAPSHOT_KEY_HEADER.unpack_from(snapshot, offset)
+                offset += _SNAPSHOT_KEY_HEADER.size
+                key = snapshot[offset:offset + key_length].decode()
+                offset += key_length
+
+                history = KeyHistory()
+                array_bytes = history_length * _ITEM_SIZE
+                for values in (history.versions, history.values):
+                    values.frombytes(snapshot[offset:offset + array_bytes])
+                    if _NEEDS_BYTESWAP:
+                        values.byteswap()
+                    offset += array_bytes
+                self.histories[key] = history
+
+    def replay_log(self) -> int:
+        """
+        apply the log records newer than the snapshot
+        a record cut off by a crash is dropped from the log
+        returns the number of records replayed
+        """
+        if not os.path.exists(self.log_path()):
+            return 0
+
+        replayed = 0
+        with open(self.log_path(), 'rb') as f:
+            log_bytes = f.read()
+
+        offset = 0
+        while offset + _LOG_RECORD.size <= len(log_bytes):
+            version, value, key_length = _LOG_RECORD.unpack_from(log_bytes, offset)
+            record_end = offset + _LOG_RECORD.size + key_length
+            if record_end > len(log_bytes):
+                break
+
+            if version > self.version:
+                key = log_bytes[offset + _LOG_RECORD.size:record_end].decode()
+                # replaying through the base put keeps versions in step with the log
+                super().put(key, value)
+                replayed += 1
+            offset = record_end
+
+        if offset < len(log_bytes):
+            with open(self.log_path(), 'r+b') as f:
+                f.truncate(offset)
+
+        self.puts_since_snapshot = replayed
+        return replayed
+
+
+def format_get(key: str, version: Optional[int], value: Optional[int]) -> str:
+    value_str = str(value) if value is not None else NULL
+    if version is None:
+        return f"GET {key} = {value_str}"
+    return f"GET {key}(#{version}) = {value_str}"
+
+
+def process_command(store: VersionedKVStore, cmd_inputs: List[str]) -> str:
+    cmd = cmd_inputs[0]
+
+    if cmd == PUT:
+        key, value = cmd_inputs[1], int(cmd_inputs[2])
+        return f"PUT(#{store.put(key, value)}) {key} = {value}"
+    elif cmd == GET:
+        key = cmd_inputs[1]
+        version = int(cmd_inputs[2]) if len(cmd_inputs) > 2 else None
+        return format_get(key, version, store.get(key, version))
+    else:
+        raise ValueError(f"Unrecognized command: {cmd}")
+
+
+def read_commands(filename: str) -> Iterator[List[str]]:
+    with open(filename, 'r') as f:
+        for line in f:
+            cmd_inputs = line.split()
+            if cmd_inputs:
+                yield cmd_inputs
+
+
+def bulk_load(store: VersionedKVStore, filename: str) -> int:
+    """
+    apply only the PUTs of a command file, without formatting any output
+    returns the number of PUTs loaded
+    """
+    loaded = 0
+    if isinstance(store, PersistentVersionedKVStore):
+        # every PUT has to reach the log
+        for cmd_inputs in read_commands(filename):
+            if cmd_inputs[0] == PUT:
+                store.put(cmd_inputs[1], int(cmd_inputs[2]))
+                loaded += 1
+        return loaded
+
+    histories = store.histories
+
+    for cmd_inputs in read_commands(filename):
+        if cmd_inputs[0] != PUT:
+            continue
+
+        # same order as VersionedKVStore.put, so a bad line raises before anything changes
+        value = int(cmd_inputs[2])
+        key = cmd_inputs[1]
+        history = histories.get(key)
+        if history is None:
+            history = KeyHistory()
+        history.values.append(value)
+        store.version += 1
+        history.versions.append(store.version)
+        histories[key] = history
+        loaded += 1
+
+    return loaded
+
+
+def main(filename: str, data_directory: Optional[str] = None):
+    # with a data directory, the history survives restarts
+    store = VersionedKVStore() if data_directory is None else PersistentVersionedKVStore(data_directory)
+    try:
+        sys.stdout.writelines(process_command(store, cmd_inputs) + "\n" for cmd_inputs in read_commands(filename))
+    finally:
+        if isinstance(store, PersistentVersionedKVStore):
+            store.close()
+
+
+if __name__=="__main__":
+    # python versioned_kv_store.py [command file] [data directory]
+    filename = \
+        "lyft_laptop/versioned_kv_store_sample_input.txt" \
+        if len(sys.argv) < 2 \
+        else sys.argv[1]
+    main(filename, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+import random
 import sys
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
 
 """
 Word Jump
@@ -72,27 +74,207 @@ hit,hot,cot,cog
 # to see if there's a match, even if you don't need to
 
 
-def get_neighbors(word: str, dictionary: List[str]) -> List[str]:
-    for index, _ in enumerate(word):
-        sub_word = word[:index] + word[index + 1:]
+# with an index of wildcard patterns, the one letter changes of a word are
+# the words sharing one of its L patterns: "hot" -> "*ot", "h*t", "ho*"
+# so a BFS expansion costs L dict hits instead of a pass over the dictionary
+#
+# searching from both ends meets in the middle, which visits far fewer words
+# than one search fanning out all the way to the other word
+# each level only records the edges it used, and those edges form a DAG of every
+# shortest path, which is walked once the two searches meet
 
-        for dict_word in dictionary:
-            sub_dict_word = 
 
+def get_patterns(word: str) -> List[str]:
+    return [word[:index] + "*" + word[index + 1:] for index in range(len(word))]
+
+
+class WordIndex:
+    def __init__(self, dictionary: Iterable[str]):
+        self.words: Set[str] = set(dictionary)
+        # pattern -> words matching it, e.g. "h*t" -> [hat, hit, hot]
+        self.buckets: Dict[str, List[str]] = dict()
+
+        for word in self.words:
+            for pattern in get_patterns(word):
+                bucket = self.buckets.get(pattern)
+                if bucket is None:
+                    self.buckets[pattern] = [word]
+                else:
+                    bucket.append(word)
+
+    def get_neighbors(self, word: str) -> Iterator[str]:
+        # a neighbor differs in exactly one position, so it only shares one pattern with word
+        for pattern in get_patterns(word):
+            for neighbor in self.buckets.get(pattern, ()):
+                if neighbor != word:
+                    yield neighbor
+
+
+def find_shortest_paths(start_word: str, end_word: str, index: WordIndex) -> List[List[str]]:
+    """
+    every shortest transformation sequence from start_word to end_word, sorted
+    start_word does not have to be in the dictionary, end_word does
+    """
+    if len(start_word) != len(end_word) or end_word not in index.words:
+        return list()
+    if start_word == end_word:
+        return [[start_word]]
+
+    # parent DAG edges, always pointing from start_word towards end_word
+    next_words: Dict[str, List[str]] = dict()
+
+    def add_edge(from_word: str, to_word: str) -> None:
+        next_words.setdefault(from_word, []).append(to_word)
+
+    front: Set[str] = {start_word}
+    back: Set[str] = {end_word}
+    # words already on some level of either search
+    visited: Set[str] = {start_word, end_word}
+    forward = True
+    met = False
+
+    while len(front) > 0 and not met:
+        # grow the smaller side
+        if len(front) > len(back):
+            front, back = back, front
+            forward = not forward
+
+        next_level: Set[str] = set()
+        for word in front:
+            for neighbor in index.get_neighbors(word):
+                if neighbor in back:
+                    met = True
+                elif met or neighbor in visited:
+                    # once the searches meet, only edges into the other side are on a shortest path
+                    continue
+                else:
+                    next_level.add(neighbor)
+
+                if forward:
+                    add_edge(word, neighbor)
+                else:
+                    add_edge(neighbor, word)
+
+        visited |= next_level
+        front = next_level
+
+    if not met:
+        return list()
+
+    # the forward levels also hold edges into words that never reach end_word,
+    # so find the words that do by walking the edges backwards from end_word
+    previous_words: Dict[str, List[str]] = dict()
+    for from_word, to_words in next_words.items():
+        for to_word in to_words:
+            previous_words.setdefault(to_word, []).append(from_word)
+
+    reaches_end: Set[str] = {end_word}
+    stack: List[str] = [end_word]
+    while len(stack) > 0:
+        for previous_word in previous_words.get(stack.pop(), ()):
+            if previous_word not in reaches_end:
+                reaches_end.add(previous_word)
+                stack.append(previous_word)
+
+    # every step of the walk now ends up in a path, so it costs no more than writing the paths out
+    paths: List[List[str]] = list()
+    path: List[str] = [start_word]
+
+    def walk(word: str) -> None:
+        if word == end_word:
+            paths.append(list(path))
+            return
+        for next_word in next_words.get(word, ()):
+            if next_word in reaches_end:
+                path.append(next_word)
+                walk(next_word)
+                path.pop()
+
+    walk(start_word)
+    paths.sort()
+    return paths
+
+
+def find_shortest_paths_batch(word_pairs: Iterable[Tuple[str, str]], index: WordIndex) -> List[List[List[str]]]:
+    # the index is the expensive part, every pair shares it
+    return [find_shortest_paths(start_word, end_word, index) for start_word, end_word in word_pairs]
 
 
 # assume all words are of same length
-def ingest_file(filename: str) -> None:
-    pass
+def ingest_file(filename: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    with open(filename, 'r') as f:
+        num_pairs = int(f.readline())
+        word_pairs: List[Tuple[str, str]] = [
+            (f.readline().strip(), f.readline().strip())
+            for _ in range(num_pairs)
+        ]
+
+        num_words = int(f.readline())
+        dictionary: List[str] = [f.readline().strip() for _ in range(num_words)]
+
+    return word_pairs, dictionary
+
+
+def format_paths(paths: List[List[str]]) -> List[str]:
+    return [str(len(paths))] + [",".join(path) for path in paths]
+
+
+def generate_dictionary(word_count: int, lengths: Tuple[int, ...] = (4, 5), seed: int = 0) -> List[str]:
+    # common letters more often, so words cluster into ladders the way real ones do
+    rng = random.Random(seed)
+    letters = "eeeeaaaoooiiinnsssrrtttlllcudpmhgbfywkvxzjq"
+    words: Set[str] = set()
+    while len(words) < word_count:
+        words.add("".join(rng.choices(letters, k=rng.choice(lengths))))
+    return sorted(words)
+
+
+def benchmark(word_count: int = 100_000, pair_count: int = 1_000) -> None:
+    dictionary = generate_dictionary(word_count)
+
+    start = time.perf_counter()
+    index = WordIndex(dictionary)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    words_by_length: Dict[int, List[str]] = dict()
+    for word in dictionary:
+        words_by_length.setdefault(len(word), []).append(word)
+    lengths = sorted(words_by_length)
+    word_pairs = [
+        tuple(rng.sample(words_by_length[length], 2))
+        for length in (rng.choice(lengths) for _ in range(pair_count))
+    ]
+
+    start = time.perf_counter()
+    results = find_shortest_paths_batch(word_pairs, index)
+    query_seconds = time.perf_counter() - start
+
+    connected = [paths for paths in results if len(paths) > 0]
+    print(
+        f"{len(dictionary):,} words, {len(index.buckets):,} patterns: index {build_seconds:.2f} s, "
+        f"{pair_count:,} pairs in {query_seconds:.2f} s ({query_seconds / pair_count * 1e3:.2f} ms per pair), "
+        f"{len(connected):,} connected, "
+        f"avg {sum(len(paths) for paths in connected) / max(1, len(connected)):.1f} paths "
+        f"of avg length {sum(len(paths[0]) for paths in connected) / max(1, len(connected)):.1f}"
+    )
 
 
 def main(filename: str):
-    pass
+    word_pairs, dictionary = ingest_file(filename)
+    index = WordIndex(dictionary)
+
+    for paths in find_shortest_paths_batch(word_pairs, index):
+        print("\n".join(format_paths(paths)))
 
 
 if __name__=="__main__":
-    filename = \
-        "lyft_laptop/word_jump_sample_input.txt" \
-        if len(sys.argv) < 2 \
-        else sys.argv[1]
-    main(filename)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        filename = \
+            "lyft_laptop/word_jump_sample_input.txt" \
+            if len(args) < 1 \
+            else args[0]
+        main(filename)
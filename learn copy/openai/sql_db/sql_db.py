@@ -1,4 +1,17 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, BinaryIO, Iterable, Iterator, Sequence, Tuple, Union
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import chain, compress, islice, repeat
+import heapq
+import mmap
+import operator
+import os
+import pickle
+import re
+import struct
+import sys
+import time
 import pytest
 import enum
 from dataclasses import dataclass
@@ -55,61 +68,1184 @@ class OrderClause:
     field: str
 
 
-class SqlDb:
+class MixedOrderKey:
+    """
+    Sort key for ORDER BY lists mixing ascending and descending fields,
+    whose values cannot simply be negated when they are strings.
+    """
+
+    __slots__ = ("values", "descending")
+
+    def __init__(self, values: Tuple, descending: Tuple[bool, ...]):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other: "MixedOrderKey") -> bool:
+        for value, other_value, descending in zip(self.values, other.values, self.descending):
+            if value == other_value:
+                continue
+            return value > other_value if descending else value < other_value
+        return False
+
+    def __eq__(self, other: object) -> bool:
+        # heapq compares keys with == before falling back to input order
+        return isinstance(other, MixedOrderKey) and self.values == other.values
+
+
+def get_order_clauses(order: Optional[Union[List[OrderClause], OrderClause]]) -> List[OrderClause]:
+    order_clauses = list(order) if type(order) == list else [order] if order else list()
+    for order_clause in order_clauses:
+        if order_clause.order not in (OrderClauseEnum.ASCENDING, OrderClauseEnum.DESCENDING):
+            raise ValueError(f"unsupported order direction: {order_clause.order}")
+    return order_clauses
+
+
+def order_records(records: Iterable[Dict], order_clauses: List[OrderClause], limit: Optional[int] = None) -> List[Dict]:
+    """
+    sort records by the order clauses, the first clause first, ties keep their input order
+    with a limit, only the first limit records are kept, on a heap of that size
+    """
+    fields = [order_clause.field for order_clause in order_clauses]
+    descending = tuple(order_clause.order == OrderClauseEnum.DESCENDING for order_clause in order_clauses)
+    get_values = operator.itemgetter(*fields)
+
+    if all(descending) or not any(descending):
+        # one direction, the values compare as they are, and reverse keeps ties in input order
+        key = get_values
+        reverse = descending[0]
+    elif limit is None:
+        # sorts are stable, so sorting by each field from the last to the first
+        # orders by all of them, while every comparison stays in C
+        results = list(records)
+        for order_clause in reversed(order_clauses):
+            results.sort(key=operator.itemgetter(order_clause.field), reverse=order_clause.order == OrderClauseEnum.DESCENDING)
+        return results
+    else:
+        key = lambda record: MixedOrderKey(get_values(record), descending)
+        reverse = False
+
+    if limit is None:
+        return sorted(records, key=key, reverse=reverse)
+    # both are documented to match sorted(...)[:limit], ties included
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return select(limit, records, key=key)
+
+
+# where comparator -> operator applied as operator(row value, clause value)
+WHERE_OPERATORS = {
+    WhereClauseEnum.GREATER_THAN: operator.gt,
+    WhereClauseEnum.LESSER_THAN: operator.lt,
+    WhereClauseEnum.EQUALS: operator.eq,
+}
+
+
+# stands in for a field a row does not have, where None is a valid value
+class _Missing:
+    pass
+
+_MISSING = _Missing()
+
+
+class Column:
+    """
+    One column of a ColumnarTable.
+    ints and floats are kept in a typed array, and the column falls back to a plain list
+    the first time a value does not fit, e.g. a string or a float in an int column.
+    Rows without the field are nulls: a 0 in the valid map and a placeholder value.
+    """
+
+    # typecode, placeholder for nulls
+    TYPED_KINDS = {int: ('q', 0), float: ('d', 0.0)}
+
+    def __init__(self, name: str, row_count: int):
+        self.name = name
+        # the type is decided by the first value
+        self.kind: Optional[type] = None
+        self.values: Any = [None] * row_count
+        # one byte per row, 1 where the row has the field
+        self.valid = bytearray(row_count)
+        self.null_count = row_count
+
+    def append(self, value: Any) -> None:
+        self._make_writable()
+        if self.kind is None:
+            self.kind = type(value) if type(value) in self.TYPED_KINDS else object
+            if self.kind is not object:
+                typecode, placeholder = self.TYPED_KINDS[self.kind]
+                self.values = array(typecode, repeat(placeholder, len(self.values)))
+
+        if self.kind is not object and type(value) is not self.kind:
+            self._to_list()
+        try:
+            self.values.append(value)
+        except OverflowError:
+            # an int beyond 64 bits
+            self._to_list()
+            self.values.append(value)
+        self.valid.append(1)
+
+    def append_null(self) -> None:
+        self._make_writable()
+        self.values.append(self.TYPED_KINDS[self.kind][1] if self.kind in self.TYPED_KINDS else None)
+        self.valid.append(0)
+        self.null_count += 1
+
+    def extend(self, values: Sequence[Any], null: Any = None) -> None:
+        """
+        append every value, values that are the null marker are appended as nulls
+        a batch of one type goes into a typed array in a single call
+        """
+        if len(values) == 0:
+            return
+        value_types = set(map(type, values))
+        if type(null) in value_types:
+            for value in values:
+                if value is null:
+                    self.append_null()
+                else:
+                    self.append(value)
+            return
+
+        self._make_writable()
+        if self.kind is None:
+            self.append(values[0])
+            values = values[1:]
+
+        # the same type check append does, once for the batch
+        if self.kind is not object and value_types != {self.kind}:
+            self._to_list()
+        start = len(self.values)
+        try:
+            self.values.extend(values)
+        except OverflowError:
+            del self.values[start:]
+            self._to_list()
+            self.values.extend(values)
+        self.valid.extend(b"\x01" * len(values))
+
+    def extend_nulls(self, count: int) -> None:
+        self._make_writable()
+        self.values.extend(repeat(self.TYPED_KINDS[self.kind][1] if self.kind in self.TYPED_KINDS else None, count))
+        self.valid.extend(bytes(count))
+        self.null_count += count
+
+    def _make_writable(self) -> None:
+        # a column loaded from a memory-mapped snapshot is copied out of the file on its first write
+        if isinstance(self.values, memoryview):
+            values = array(self.values.format)
+            values.frombytes(self.values.cast('B'))
+            self.values = values
+        if isinstance(self.valid, memoryview):
+            self.valid = bytearray(self.valid)
+
+    def _to_list(self) -> None:
+        self.kind = object
+        self.values = list(self.values)
+
+    def filter_row_ids(self, clause: WhereClause, row_ids: Iterable[int]) -> List[int]:
+        """
+        the row_ids that pass clause, in the order given
+        the comparisons run inside map and compress, without a python loop per row
+        """
+        row_ids = row_ids if isinstance(row_ids, (list, range)) else list(row_ids)
+        if self.null_count > 0 and not all(map(self.valid.__getitem__, row_ids)):
+            raise ValueError(f"Field in where clause missing from record: {self.name}")
+
+        comparison = WHERE_OPERATORS.get(clause.comparator)
+        if comparison is None:
+            raise ValueError(F"Unsupported where clause comparator: {clause.comparator}")
+
+        if isinstance(row_ids, range) and len(row_ids) == len(self.values):
+            row_values = iter(self.values)
+        else:
+            row_values = map(self.values.__getitem__, row_ids)
+        return list(compress(row_ids, map(comparison, row_values, repeat(clause.value))))
+
+    def nbytes(self) -> int:
+        # the buffers, plus the objects a list column points to
+        if isinstance(self.values, memoryview):
+            # memory-mapped, the pages are shared with the file cache
+            return self.values.nbytes + self.valid.nbytes
+        values_size = sys.getsizeof(self.values)
+        if self.kind is object:
+            values_size += sum(sys.getsizeof(value) for value in self.values if value is not None)
+        return values_size + sys.getsizeof(self.valid)
+
+
+class ColumnarTable:
+    """
+    A table stored as one Column per field instead of one dict per row.
+    It reads like the list of dicts it replaces: len, indexing and iteration
+    give dicts of the fields each row has, and append takes one.
+    """
+
+    BULK_BATCH_SIZE = 4096
 
     def __init__(self):
-        # table_name -> List[Dict]
-        self.db: Dict[str, List[Dict]] = dict()
+        self.columns: Dict[str, Column] = dict()
+        self.row_count = 0
+
+    def append(self, data: Dict) -> None:
+        for name in data.keys():
+            if name not in self.columns:
+                self.columns[name] = Column(name, self.row_count)
+
+        for name, column in self.columns.items():
+            if name in data:
+                column.append(data[name])
+            else:
+                column.append_null()
+        self.row_count += 1
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        """
+        append many rows, turned into column batches of BULK_BATCH_SIZE rows
+        """
+        rows_iterator = iter(rows)
+        while True:
+            batch = list(islice(rows_iterator, self.BULK_BATCH_SIZE))
+            if len(batch) == 0:
+                return
+            # every field of the batch, in the order append would have added them
+            names = dict.fromkeys(chain.from_iterable(batch))
+            self.extend_columns(
+                {name: [row.get(name, _MISSING) for row in batch] for name in names},
+                len(batch),
+                null=_MISSING
+            )
+
+    def extend_columns(self, columns: Dict[str, Sequence[Any]], count: int, null: Any = None) -> int:
+        """
+        append a batch of count rows given as field -> values, every list count long
+        a value that is the null marker leaves the field out of that row, as do fields not in the batch
+        so a batch with no columns appends count empty rows
+        """
+        lengths = {len(values) for values in columns.values()}
+        if lengths - {count}:
+            raise ValueError(f"columns in a batch of {count} rows must all have {count} values: {sorted(lengths)}")
+
+        for name in columns.keys():
+            if name not in self.columns:
+                self.columns[name] = Column(name, self.row_count)
+
+        for name, column in self.columns.items():
+            if name in columns:
+                column.extend(columns[name], null)
+            else:
+                column.extend_nulls(count)
+        self.row_count += count
+        return count
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __getitem__(self, row_id: int) -> Dict:
+        if row_id < 0:
+            row_id += self.row_count
+        if not 0 <= row_id < self.row_count:
+            raise IndexError(f"row {row_id} out of range")
+
+        return {
+            name: column.values[row_id]
+            for name, column in self.columns.items()
+            if column.valid[row_id]
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row_id in range(self.row_count):
+            yield self[row_id]
+
+    def filter_row_ids(self, where: List[WhereClause], row_ids: Optional[Iterable[int]] = None) -> Sequence[int]:
+        """
+        the rows passing every clause, in the order of row_ids, all rows by default
+        each clause only looks at the rows the clauses before it kept,
+        so a missing field raises for the same rows as checking a dict per row would
+        """
+        selected: Iterable[int] = range(self.row_count) if row_ids is None else row_ids
+        for clause in where:
+            column = self.columns.get(clause.field)
+            if column is None:
+                selected = selected if isinstance(selected, (list, range)) else list(selected)
+                if len(selected) > 0:
+                    raise ValueError(f"Field in where clause missing from record: {clause.field}")
+                continue
+            selected = column.filter_row_ids(clause, selected)
+        return selected if isinstance(selected, (list, range)) else list(selected)
+
+    def project(self, row_ids: Sequence[int], fields: List[str]) -> List[Dict]:
+        """
+        dicts of the requested fields each row has, rows with none of them are left out
+        only the requested columns are read
+        """
+        columns = [column for name, column in self.columns.items() if name in fields]
+        if len(columns) == 0:
+            return list()
+
+        names = [column.name for column in columns]
+        column_values = [list(map(column.values.__getitem__, row_ids)) for column in columns]
+
+        if all(column.null_count == 0 for column in columns):
+            return [dict(zip(names, row_values)) for row_values in zip(*column_values)]
+
+        column_valid = [bytes(map(column.valid.__getitem__, row_ids)) for column in columns]
+        results: List[Dict] = list()
+        for row_values, row_valid in zip(zip(*column_values), zip(*column_valid)):
+            record = {name: value for name, value, valid in zip(names, row_values, row_valid) if valid}
+            if len(record) > 0:
+                results.append(record)
+        return results
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns.values())
+
+
+class FieldIndex:
+    """
+    Index over one field of a table, rows are identified by their position in the table list.
+    A hash map serves EQUALS, and a list of values sorted together with their row ids
+    serves GREATER_THAN, LESSER_THAN and ordering.
+    Ties in the sorted part are kept in row order, so reading it matches a stable sort.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.rows_by_value: Dict[Any, List[int]] = dict()
+        self.sorted_values: List[Any] = list()
+        self.sorted_row_ids = array('q')
+        # inserted since the sorted part was last read, merged in all at once on the next read
+        self.pending_values: List[Any] = list()
+        self.pending_row_ids: List[int] = list()
+        # rows without the field, the where and order checks raise on those, so the planner scans instead
+        self.missing_rows = 0
+        # rows of the table covered so far
+        self.indexed_rows = 0
+
+    def add(self, row_id: int, entry: Dict) -> None:
+        if self.field not in entry:
+            self.indexed_rows = row_id + 1
+            self.missing_rows += 1
+            return
+        self.add_value(row_id, entry[self.field])
+
+    def add_value(self, row_id: int, value: Any) -> None:
+        self.indexed_rows = row_id + 1
+        rows = self.rows_by_value.get(value)
+        if rows is None:
+            self.rows_by_value[value] = [row_id]
+        else:
+            rows.append(row_id)
+        self.pending_values.append(value)
+        self.pending_row_ids.append(row_id)
+
+    def sync(self, table: Union[List[Dict], ColumnarTable]) -> None:
+        # rows can be appended to the table list directly, and insert_many leaves indexes behind, so catch up with them
+        if len(table) < self.indexed_rows:
+            self.__init__(self.field)
+
+        if isinstance(table, ColumnarTable):
+            # read the one column instead of building a dict per row
+            column = table.columns.get(self.field)
+            if column is None:
+                self.missing_rows += len(table) - self.indexed_rows
+                self.indexed_rows = len(table)
+                return
+            for row_id in range(self.indexed_rows, len(table)):
+                if column.valid[row_id]:
+                    self.add_value(row_id, column.values[row_id])
+                else:
+                    self.indexed_rows = row_id + 1
+                    self.missing_rows += 1
+            return
+
+        for row_id in range(self.indexed_rows, len(table)):
+            self.add(row_id, table[row_id])
+
+    def _merge_pending(self) -> None:
+        if len(self.pending_values) == 0:
+            return
+
+        # a stable sort keeps equal values in row order
+        order = sorted(range(len(self.pending_values)), key=self.pending_values.__getitem__)
+        values = [self.pending_values[i] for i in order]
+        row_ids = [self.pending_row_ids[i] for i in order]
+        self.pending_values = list()
+        self.pending_row_ids = list()
+
+        if len(self.sorted_values) == 0:
+            self.sorted_values = values
+            self.sorted_row_ids = array('q', row_ids)
+            return
+
+        # copy the sorted part across in slices between the new values,
+        # which only loops in python once per new value
+        merged_values: List[Any] = list()
+        merged_row_ids = array('q')
+        previous = 0
+        for value, row_id in zip(values, row_ids):
+            # new rows have the highest ids, so they go after equal values
+            position = bisect_right(self.sorted_values, value, previous)
+            merged_values.extend(self.sorted_values[previous:position])
+            merged_row_ids.extend(self.sorted_row_ids[previous:position])
+            merged_values.append(value)
+            merged_row_ids.append(row_id)
+            previous = position
+        merged_values.extend(self.sorted_values[previous:])
+        merged_row_ids.extend(self.sorted_row_ids[previous:])
+
+        self.sorted_values = merged_values
+        self.sorted_row_ids = merged_row_ids
+
+    def _sorted_range(self, clause: Optional[WhereClause]) -> Tuple[int, int]:
+        self._merge_pending()
+        if clause is None:
+            return 0, len(self.sorted_values)
+        elif clause.comparator == WhereClauseEnum.GREATER_THAN:
+            return bisect_right(self.sorted_values, clause.value), len(self.sorted_values)
+        elif clause.comparator == WhereClauseEnum.LESSER_THAN:
+            return 0, bisect_left(self.sorted_values, clause.value)
+        elif clause.comparator == WhereClauseEnum.EQUALS:
+            return bisect_left(self.sorted_values, clause.value), bisect_right(self.sorted_values, clause.value)
+        else:
+            raise ValueError(F"Unsupported where clause comparator: {clause.comparator}")
+
+    def count(self, clause: WhereClause) -> int:
+        if clause.comparator == WhereClauseEnum.EQUALS:
+            return len(self.rows_by_value.get(clause.value, ()))
+        lo, hi = self._sorted_range(clause)
+        return hi - lo
+
+    def row_ids(self, clause: WhereClause) -> List[int]:
+        """
+        rows matching clause, in table order
+        """
+        if clause.comparator == WhereClauseEnum.EQUALS:
+            return list(self.rows_by_value.get(clause.value, ()))
+        lo, hi = self._sorted_range(clause)
+        return sorted(self.sorted_row_ids[lo:hi])
+
+    def ordered_row_ids(self, order: OrderClauseEnum, clause: Optional[WhereClause] = None) -> Iterator[int]:
+        """
+        rows matching clause, or all rows, in the order sorted() would put them
+        """
+        lo, hi = self._sorted_range(clause)
+        if order == OrderClauseEnum.ASCENDING:
+            yield from self.sorted_row_ids[lo:hi]
+        elif order == OrderClauseEnum.DESCENDING:
+            # sorted(reverse=True) keeps equal values in row order, so walk back one run of equal values at a time
+            run_end = hi
+            while run_end > lo:
+                run_start = max(lo, bisect_left(self.sorted_values, self.sorted_values[run_end - 1], lo, run_end))
+                yield from self.sorted_row_ids[run_start:run_end]
+                run_end = run_start
+        else:
+            raise ValueError(f"unsupported order direction: {order}")
+
+
+@dataclass
+class QueryPlan:
+    # the indexed clause that picks the candidate rows, None to scan the table
+    driver: Optional[WhereClause]
+    # clauses checked on each candidate row
+    residual: List[WhereClause]
+    # rows come out of the order field's index already sorted
+    index_ordered: bool
+    # rows the plan reads
+    estimated_rows: int
+
+
+# SQL text front end
+#
+#   select name, age FROM employee where age > 10 && (name = blah || name = 'b c') order by name, age desc limit 10 offset 20
+#
+# every literal value, and every ? placeholder, becomes a numbered slot in the normalized text,
+# so queries that only differ in their values share one compiled plan
+# a compiled plan is a closure that turns slot values into where clauses and runs them through query_iter,
+# so the planner still picks indexes for the actual values
+
+class SqlSyntaxError(ValueError):
+    pass
+
+
+_SQL_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<symbol>&&|\|\||==|=|>|<|,|\(|\)|\?)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )""", re.VERBOSE)
+
+SQL_KEYWORDS = {"select", "from", "where", "order", "by", "asc", "desc", "limit", "offset"}
+
+SQL_COMPARATORS = {
+    "=": WhereClauseEnum.EQUALS,
+    "==": WhereClauseEnum.EQUALS,
+    ">": WhereClauseEnum.GREATER_THAN,
+    "<": WhereClauseEnum.LESSER_THAN,
+}
+
+# marks a slot filled from the params of the call
+PARAM = object()
+
+
+def normalize_sql(sql: str) -> Tuple[str, List[Any]]:
+    """
+    the query text with single spaces, lowercase keywords and every value replaced by ?,
+    plus the value of every slot, PARAM where the text had a ? placeholder
+    """
+    tokens: List[str] = list()
+    slot_values: List[Any] = list()
+
+    position = 0
+    sql = sql.strip().rstrip(";")
+    while position < len(sql):
+        match = _SQL_TOKEN_PATTERN.match(sql, position)
+        if match is None or match.end() == position:
+            raise SqlSyntaxError(f"unexpected character at {position}: {sql[position:position + 10]!r}")
+        position = match.end()
+
+        kind = match.lastgroup
+        text = match.group(kind)
+        # a word right after a comparator is a bare string value, as in name = blah
+        is_value = kind in ("number", "string") or (kind == "word" and len(tokens) > 0 and tokens[-1] in SQL_COMPARATORS)
+
+        if is_value:
+            if kind == "number":
+                slot_values.append(float(text) if "." in text else int(text))
+            elif kind == "string":
+                slot_values.append(re.sub(r"\\(.)", r"\1", text[1:-1]))
+            else:
+                slot_values.append(text)
+            tokens.append("?")
+        elif text == "?":
+            slot_values.append(PARAM)
+            tokens.append("?")
+        elif kind == "word" and text.lower() in SQL_KEYWORDS:
+            tokens.append(text.lower())
+        else:
+            tokens.append(text)
+
+    return " ".join(tokens), slot_values
+
+
+def bind_params(slot_values: List[Any], params: Sequence[Any]) -> List[Any]:
+    param_count = sum(1 for value in slot_values if value is PARAM)
+    if param_count != len(params):
+        raise ValueError(f"query has {param_count} placeholders but {len(params)} params were given")
+
+    remaining_params = iter(params)
+    return [next(remaining_params) if value is PARAM else value for value in slot_values]
+
+
+# comparator, field, slot
+WhereTemplate = Tuple[WhereClauseEnum, str, int]
+
+
+@dataclass
+class CompiledQuery:
+    table_name: str
+    fields: List[str]
+    # OR of ANDs
+    where_any: List[List[WhereTemplate]]
+    order: List[OrderClause]
+    limit_slot: Optional[int]
+    offset_slot: Optional[int]
+
+    def run(self, db: Any, slot_values: List[Any]) -> Iterator[Dict]: # db is SqlDb
+        where_any = [
+            [WhereClause(comparator=comparator, field=field, value=slot_values[slot]) for comparator, field, slot in conjunction]
+            for conjunction in self.where_any
+        ]
+        limit = slot_values[self.limit_slot] if self.limit_slot is not None else None
+        offset = slot_values[self.offset_slot] if self.offset_slot is not None else 0
+        # every literal is a slot, so the parser lets limit 'x' through
+        for name, value in (("limit", limit), ("offset", offset)):
+            if value is not None and (type(value) is not int or value < 0):
+                raise ValueError(f"{name} must be a non-negative integer, got {value!r}")
+        return db.query_iter_any(self.table_name, self.fields, where_any, self.order, limit, offset)
+
+
+class _SqlParser:
+    """
+    recursive descent over the normalized tokens
+    && binds tighter than ||, and the where expression is flattened to an OR of ANDs
+    """
+
+    def __init__(self, normalized_sql: str):
+        self.tokens = normalized_sql.split(" ") if normalized_sql else list()
+        self.position = 0
+        self.slot_count = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise SqlSyntaxError("unexpected end of query")
+        self.position += 1
+        return token
+
+    def expect(self, expected: str) -> None:
+        token = self.take()
+        if token != expected:
+            raise SqlSyntaxError(f"expected {expected} but found {token}")
+
+    def take_identifier(self) -> str:
+        token = self.take()
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", token) or token in SQL_KEYWORDS:
+            raise SqlSyntaxError(f"expected a name but found {token}")
+        return token
+
+    def take_slot(self) -> int:
+        self.expect("?")
+        self.slot_count += 1
+        return self.slot_count - 1
+
+    def parse(self) -> CompiledQuery:
+        self.expect("select")
+        fields = [self.take_identifier()]
+        while self.peek() == ",":
+            self.take()
+            fields.append(self.take_identifier())
+
+        self.expect("from")
+        table_name = self.take_identifier()
+
+        where_any: List[List[WhereTemplate]] = [[]]
+        if self.peek() == "where":
+            self.take()
+            where_any = self.parse_or()
+
+        order: List[OrderClause] = list()
+        if self.peek() == "order":
+            self.take()
+            self.expect("by")
+            order.append(self.parse_order_item())
+            while self.peek() == ",":
+                self.take()
+                order.append(self.parse_order_item())
+
+        limit_slot = offset_slot = None
+        if self.peek() == "limit":
+            self.take()
+            limit_slot = self.take_slot()
+            if self.peek() == "offset":
+                self.take()
+                offset_slot = self.take_slot()
+
+        if self.peek() is not None:
+            raise SqlSyntaxError(f"unexpected {self.peek()} after the end of the query")
+
+        return CompiledQuery(table_name, fields, where_any, order, limit_slot, offset_slot)
+
+    def parse_order_item(self) -> OrderClause:
+        field = self.take_identifier()
+        direction = OrderClauseEnum.ASCENDING
+        if self.peek() in ("asc", "desc"):
+            direction = OrderClauseEnum.DESCENDING if self.take() == "desc" else OrderClauseEnum.ASCENDING
+        return OrderClause(order=direction, field=field)
+
+    def parse_or(self) -> List[List[WhereTemplate]]:
+        where_any = self.parse_and()
+        while self.peek() == "||":
+            self.take()
+            where_any = where_any + self.parse_and()
+        return where_any
+
+    def parse_and(self) -> List[List[WhereTemplate]]:
+        where_any = self.parse_term()
+        while self.peek() == "&&":
+            self.take()
+            right = self.parse_term()
+            # (a || b) && c is a && c || b && c
+            where_any = [left_and + right_and for left_and in where_any for right_and in right]
+        return where_any
+
+    def parse_term(self) -> List[List[WhereTemplate]]:
+        if self.peek() == "(":
+            self.take()
+            where_any = self.parse_or()
+            self.expect(")")
+            return where_any
+
+        field = self.take_identifier()
+        comparator = self.take()
+        if comparator not in SQL_COMPARATORS:
+            raise SqlSyntaxError(f"expected a comparator after {field} but found {comparator}")
+        return [[(SQL_COMPARATORS[comparator], field, self.take_slot())]]
+
+
+def compile_sql(normalized_sql: str) -> CompiledQuery:
+    return _SqlParser(normalized_sql).parse()
+
+
+class PlanCache:
+    """
+    bounded LRU of compiled queries by normalized text
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: OrderedDict[str, CompiledQuery] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CompiledQuery]:
+        compiled = self.entries.get(key)
+        if compiled is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return compiled
+
+    def put(self, key: str, compiled: CompiledQuery) -> None:
+        self.entries[key] = compiled
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+# Snapshot file, every section starts on an 8 byte boundary so typed arrays can be used in place
+#
+#   header: magic, table count
+#   per table: name, header, index fields, columns
+#   per column: name, kind and null count, valid map, then
+#     int / float: the array of values
+#     string: an int32 code per row, the length of each dictionary string (-1 for None) and the utf-8 of all of them
+#     object: a pickled list of values
+#     empty: nothing, every row is null
+#   names, strings and arrays are blobs: an int64 length then the bytes
+# numbers are little endian
+
+SNAPSHOT_MAGIC = b"SQLDB001"
+# magic, table count
+_SNAPSHOT_HEADER = struct.Struct("<8sI")
+# columnar, row count, column count, index count
+_TABLE_HEADER = struct.Struct("<?qII")
+# kind, null count
+_COLUMN_HEADER = struct.Struct("<cq")
+_BLOB_LENGTH = struct.Struct("<q")
+
+SNAPSHOT_INT = b"q"
+SNAPSHOT_FLOAT = b"d"
+SNAPSHOT_STRING = b"s"
+SNAPSHOT_OBJECT = b"o"
+SNAPSHOT_EMPTY = b"n"
+
+_SNAPSHOT_TYPECODES = {SNAPSHOT_INT: 'q', SNAPSHOT_FLOAT: 'd'}
+_SNAPSHOT_CODE_TYPECODE = 'i'
+
+
+def _aligned(offset: int) -> int:
+    return offset + (-offset % 8)
+
+def _pad(snapshot_file: BinaryIO) -> None:
+    snapshot_file.write(bytes(-snapshot_file.tell() % 8))
+
+def _write_blob(snapshot_file: BinaryIO, data: Any) -> None:
+    data = memoryview(data).cast('B')
+    snapshot_file.write(_BLOB_LENGTH.pack(len(data)))
+    snapshot_file.write(data)
+    _pad(snapshot_file)
+
+def _read_blob(buffer: memoryview, offset: int) -> Tuple[memoryview, int]:
+    length, = _BLOB_LENGTH.unpack_from(buffer, offset)
+    start = offset + _BLOB_LENGTH.size
+    return buffer[start:start + length], _aligned(start + length)
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "little":
+        return values
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped
+
+def _read_array(blob: memoryview, typecode: str, use_mmap: bool) -> Union[array, memoryview]:
+    if use_mmap and sys.byteorder == "little":
+        return blob.cast(typecode)
+    values = array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def _write_column(snapshot_file: BinaryIO, column: Column) -> None:
+    if column.kind in Column.TYPED_KINDS:
+        kind = SNAPSHOT_INT if column.kind is int else SNAPSHOT_FLOAT
+    elif column.kind is None:
+        kind = SNAPSHOT_EMPTY
+    elif set(map(type, column.values)) <= {str, type(None)}:
+        kind = SNAPSHOT_STRING
+    else:
+        kind = SNAPSHOT_OBJECT
+
+    _write_blob(snapshot_file, column.name.encode("utf-8"))
+    snapshot_file.write(_COLUMN_HEADER.pack(kind, column.null_count))
+    _pad(snapshot_file)
+    _write_blob(snapshot_file, column.valid)
+
+    if kind in _SNAPSHOT_TYPECODES:
+        # a memory-mapped column is already little endian
+        values = column.values if isinstance(column.values, (array, memoryview)) else array(_SNAPSHOT_TYPECODES[kind], column.values)
+        _write_blob(snapshot_file, _little_endian(values))
+    elif kind == SNAPSHOT_STRING:
+        code_by_string: Dict[Optional[str], int] = dict()
+        codes = array(_SNAPSHOT_CODE_TYPECODE, [code_by_string.setdefault(value, len(code_by_string)) for value in column.values])
+        encoded = [value.encode("utf-8") if value is not None else b"" for value in code_by_string.keys()]
+        lengths = array(_SNAPSHOT_CODE_TYPECODE, [len(data) if value is not None else -1 for value, data in zip(code_by_string.keys(), encoded)])
+        _write_blob(snapshot_file, _little_endian(codes))
+        _write_blob(snapshot_file, _little_endian(lengths))
+        _write_blob(snapshot_file, b"".join(encoded))
+    elif kind == SNAPSHOT_OBJECT:
+        _write_blob(snapshot_file, pickle.dumps(list(column.values), protocol=pickle.HIGHEST_PROTOCOL))
+
+def _read_column(buffer: memoryview, offset: int, row_count: int, use_mmap: bool) -> Tuple[Column, int]:
+    name_bytes, offset = _read_blob(buffer, offset)
+    column = Column(str(name_bytes, "utf-8"), 0)
+    kind, column.null_count = _COLUMN_HEADER.unpack_from(buffer, offset)
+    offset = _aligned(offset + _COLUMN_HEADER.size)
+
+    valid, offset = _read_blob(buffer, offset)
+    column.valid = valid if use_mmap else bytearray(valid)
+
+    if kind in _SNAPSHOT_TYPECODES:
+        values, offset = _read_blob(buffer, offset)
+        column.kind = int if kind == SNAPSHOT_INT else float
+        column.values = _read_array(values, _SNAPSHOT_TYPECODES[kind], use_mmap)
+    elif kind == SNAPSHOT_STRING:
+        codes, offset = _read_blob(buffer, offset)
+        lengths, offset = _read_blob(buffer, offset)
+        data, offset = _read_blob(buffer, offset)
+        dictionary: List[Optional[str]] = list()
+        position = 0
+        for length in _read_array(lengths, _SNAPSHOT_CODE_TYPECODE, use_mmap=False):
+            if length < 0:
+                dictionary.append(None)
+            else:
+                dictionary.append(str(data[position:position + length], "utf-8"))
+                position += length
+        column.kind = object
+        column.values = list(map(dictionary.__getitem__, _read_array(codes, _SNAPSHOT_CODE_TYPECODE, use_mmap)))
+    elif kind == SNAPSHOT_OBJECT:
+        data, offset = _read_blob(buffer, offset)
+        column.kind = object
+        column.values = pickle.loads(data)
+    elif kind == SNAPSHOT_EMPTY:
+        column.values = [None] * row_count
+    else:
+        raise ValueError(f"unknown column kind in snapshot: {kind}")
+
+    return column, offset
+
+
+class SqlDb:
+
+    def __init__(self, columnar: bool = False, plan_cache_size: int = 256):
+        # table_name -> List[Dict], or a ColumnarTable that reads like one
+        self.db: Dict[str, Union[List[Dict], ColumnarTable]] = dict()
+        # table_name -> field -> index
+        self.indexes: Dict[str, Dict[str, FieldIndex]] = dict()
+        # the storage for tables created by insert
+        self.columnar = columnar
+        # normalized SQL text -> CompiledQuery
+        self.plan_cache: Optional[PlanCache] = PlanCache(plan_cache_size) if plan_cache_size > 0 else None
+
+    def create_table(self, table_name: str, columnar: Optional[bool] = None) -> None:
+        if table_name in self.db.keys():
+            raise ValueError(f"table already exists: {table_name}")
+        use_columnar = self.columnar if columnar is None else columnar
+        self.db[table_name] = ColumnarTable() if use_columnar else list()
 
     def insert(self, table_name: str, data: Dict):
         if table_name not in self.db.keys():
-            self.db[table_name] = list()
+            self.create_table(table_name)
         
         self.db[table_name].append(data)
 
-    def query(self, table_name : str, fields: List[str], 
-              where: Optional[List[WhereClause]] = None, 
-              order: Optional[OrderClause] = None):
-        results: List[Dict] = list()
+        for index in self.indexes.get(table_name, dict()).values():
+            index.sync(self.db[table_name])
 
-        for entry in self.db.get(table_name, list()):
-            return_record = dict()
-
-            if type(where) == list:
-                if not all(w.record_is_included(entry) for w in where):
-                    continue
-                # handle all the wheres
-            elif type(where) == WhereClause:
-                if not where.record_is_included(entry):
-                    continue
-            # else it's None
-
-            for key, value in entry.items():
-                if key in fields:
-                    return_record[key] = value
-            
-            if len(return_record.keys()) > 0:
-                results.append(return_record)
-
-        if order:
-            if not all(order.field in entry.keys() for entry in results):
-                raise ValueError(f"order by field must be present in all filtered results")
-            
-            if order.order == OrderClauseEnum.ASCENDING:
-                return sorted(
-                    (result for result in results), 
-                    key=lambda x: x[order.field]
-                    )
-            elif order.order == OrderClauseEnum.DESCENDING:
-                return sorted(
-                    (result for result in results), 
-                    key=lambda x: x[order.field], 
-                    reverse=True
-                    )
+    def insert_many(self, table_name: str, rows: Union[Iterable[Dict], Dict[str, Sequence[Any]]]) -> int:
+        """
+        insert an iterable of row dicts, or a column batch of field -> values with a None where a row has no value
+        indexes are not updated here, they catch up the next time a query uses them
+        returns the number of rows inserted
+        """
+        if table_name not in self.db.keys():
+            self.create_table(table_name)
+        table = self.db[table_name]
+        row_count = len(table)
+
+        if isinstance(rows, dict):
+            lengths = {len(values) for values in rows.values()}
+            if len(lengths) > 1:
+                raise ValueError(f"columns in a batch must have the same length: {sorted(lengths)}")
+            if isinstance(table, ColumnarTable):
+                return table.extend_columns(rows, lengths.pop() if lengths else 0)
+            names = list(rows.keys())
+            rows = (
+                {name: value for name, value in zip(names, row_values) if value is not None}
+                for row_values in zip(*rows.values())
+            )
+
+        table.extend(rows)
+        return len(table) - row_count
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        write every table to one binary file, see SNAPSHOT_MAGIC for the layout
+        the file is written next to path and moved over it, so a reader never sees half a snapshot
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(self.db)))
+            _pad(snapshot_file)
+
+            for table_name, table in self.db.items():
+                columnar = isinstance(table, ColumnarTable)
+                if not columnar:
+                    rows = table
+                    table = ColumnarTable()
+                    table.extend(rows)
+                index_fields = list(self.indexes.get(table_name, dict()).keys())
+
+                _write_blob(snapshot_file, table_name.encode("utf-8"))
+                snapshot_file.write(_TABLE_HEADER.pack(columnar, table.row_count, len(table.columns), len(index_fields)))
+                _pad(snapshot_file)
+                for field in index_fields:
+                    _write_blob(snapshot_file, field.encode("utf-8"))
+                for column in table.columns.values():
+                    _write_column(snapshot_file, column)
+
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+
+    def load_snapshot(self, path: str, use_mmap: bool = True) -> None:
+        """
+        add the tables of a snapshot written by save_snapshot
+        with use_mmap, int and float columns are read straight from the mapped file until they are written to
+        indexes come back empty and are rebuilt the first time a query uses them
+        object columns are pickled, so only load snapshots this process could have written
+        """
+        with open(path, "rb") as snapshot_file:
+            if use_mmap:
+                buffer = memoryview(mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ))
             else:
-                raise ValueError(f"unsupported order direction: {order.order}")
+                buffer = memoryview(snapshot_file.read())
+
+        magic, table_count = _SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"not a SqlDb snapshot: {path}")
+        offset = _aligned(_SNAPSHOT_HEADER.size)
+
+        for _ in range(table_count):
+            name_bytes, offset = _read_blob(buffer, offset)
+            table_name = str(name_bytes, "utf-8")
+            if table_name in self.db.keys():
+                raise ValueError(f"table already exists: {table_name}")
+
+            columnar, row_count, column_count, index_count = _TABLE_HEADER.unpack_from(buffer, offset)
+            offset = _aligned(offset + _TABLE_HEADER.size)
+            index_fields: List[str] = list()
+            for _ in range(index_count):
+                field_bytes, offset = _read_blob(buffer, offset)
+                index_fields.append(str(field_bytes, "utf-8"))
+
+            table = ColumnarTable()
+            table.row_count = row_count
+            for _ in range(column_count):
+                column, offset = _read_column(buffer, offset, row_count, use_mmap)
+                table.columns[column.name] = column
+
+            self.db[table_name] = table if columnar else list(table)
+            self.indexes[table_name] = {field: FieldIndex(field) for field in index_fields}
+
+    def create_index(self, table_name: str, field: str) -> FieldIndex:
+        table_indexes = self.indexes.setdefault(table_name, dict())
+        if field not in table_indexes:
+            table_indexes[field] = FieldIndex(field)
+        table_indexes[field].sync(self.db.get(table_name, list()))
+        return table_indexes[field]
+
+    def _get_usable_index(self, table_name: str, field: str) -> Optional[FieldIndex]:
+        index = self.indexes.get(table_name, dict()).get(field)
+        if index is None:
+            return None
+
+        index.sync(self.db.get(table_name, list()))
+        # a scan raises on rows missing the field, which an index would silently skip
+        return index if index.missing_rows == 0 else None
+
+    def plan_query(self, table_name: str, fields: List[str],
+                   where: Optional[Union[List[WhereClause], WhereClause]] = None,
+                   order: Optional[Union[List[OrderClause], OrderClause]] = None) -> QueryPlan:
+        """
+        drive the query from the indexed where clause matching the fewest rows,
+        and when no clause narrows the scan, read the rows through the order field's index to skip the sort,
+        which needs a single order clause
+        like the scan, a row missing a where field only raises when a clause is checked on it,
+        so rows the driving index rules out never raise
+        """
+        if type(where) == list:
+            where_clauses = list(where)
+        elif type(where) == WhereClause:
+            where_clauses = [where]
         else:
-            return results
+            where_clauses = list()
+
+        table_size = len(self.db.get(table_name, list()))
+        plan = QueryPlan(driver=None, residual=where_clauses, index_ordered=False, estimated_rows=table_size)
+
+        for clause in where_clauses:
+            index = self._get_usable_index(table_name, clause.field)
+            if index is None:
+                continue
+            count = index.count(clause)
+            if count < plan.estimated_rows:
+                plan = QueryPlan(
+                    driver=clause,
+                    residual=[other for other in where_clauses if other is not clause],
+                    index_ordered=False,
+                    estimated_rows=count
+                )
+
+        order_clauses = get_order_clauses(order)
+        order = order_clauses[0] if len(order_clauses) == 1 else None
+
+        # the order check runs on the returned fields, so only an order field that is returned can be trusted
+        if order and order.field in fields and self._get_usable_index(table_name, order.field) is not None:
+            if plan.driver is not None and plan.driver.field == order.field:
+                plan.index_ordered = True
+            elif plan.driver is None:
+                plan = QueryPlan(driver=None, residual=where_clauses, index_ordered=True, estimated_rows=table_size)
+
+        return plan
+
+    def _plan_row_ids(self, table_name: str, plan: QueryPlan, order: Optional[OrderClause]) -> Iterable[int]:
+        if plan.index_ordered:
+            index = self.indexes[table_name][order.field]
+            driver = plan.driver if plan.driver is not None and plan.driver.field == order.field else None
+            return index.ordered_row_ids(order.order, driver)
+        elif plan.driver is not None:
+            return self.indexes[table_name][plan.driver.field].row_ids(plan.driver)
+        else:
+            return range(len(self.db.get(table_name, list())))
+
+    # columnar rows are turned into dicts this many at a time while streaming
+    STREAM_BATCH_SIZE = 1024
+
+    def _matching_row_ids(self, table_name: str, plan: QueryPlan, index_order: Optional[OrderClause]) -> Iterable[int]:
+        table = self.db.get(table_name, list())
+
+        if isinstance(table, ColumnarTable):
+            plan_row_ids = None if plan.driver is None and not plan.index_ordered \
+                else self._plan_row_ids(table_name, plan, index_order)
+            return table.filter_row_ids(plan.residual, plan_row_ids)
+
+        return (
+            row_id
+            for row_id in self._plan_row_ids(table_name, plan, index_order)
+            if all(w.record_is_included(table[row_id]) for w in plan.residual)
+        )
+
+    def _project_rows(self, table_name: str, row_ids: Iterable[int], fields: List[str]) -> Iterator[Dict]:
+        table = self.db.get(table_name, list())
+
+        if isinstance(table, ColumnarTable):
+            row_ids = row_ids if isinstance(row_ids, (list, range)) else list(row_ids)
+            for start in range(0, len(row_ids), self.STREAM_BATCH_SIZE):
+                yield from table.project(row_ids[start:start + self.STREAM_BATCH_SIZE], fields)
+        else:
+            for row_id in row_ids:
+                entry = table[row_id]
+                return_record = dict()
+
+                for key, value in entry.items():
+                    if key in fields:
+                        return_record[key] = value
+
+                if len(return_record.keys()) > 0:
+                    yield return_record
+
+    def _page(self, records: Iterable[Dict], order_clauses: List[OrderClause],
+              limit: Optional[int], offset: int) -> Iterator[Dict]:
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit cannot be negative: {limit}")
+        if offset < 0:
+            raise ValueError(f"offset cannot be negative: {offset}")
+        end = None if limit is None else offset + limit
+
+        if order_clauses:
+            def check_order_fields(records: Iterable[Dict]) -> Iterator[Dict]:
+                for record in records:
+                    if not all(order_clause.field in record.keys() for order_clause in order_clauses):
+                        raise ValueError(f"order by field must be present in all filtered results")
+                    yield record
+
+            records = order_records(check_order_fields(records), order_clauses, end)
+
+        yield from islice(records, offset, end)
+
+    def query_iter(self, table_name: str, fields: List[str],
+                   where: Optional[Union[List[WhereClause], WhereClause]] = None,
+                   order: Optional[Union[List[OrderClause], OrderClause]] = None,
+                   limit: Optional[int] = None,
+                   offset: int = 0) -> Iterator[Dict]:
+        """
+        results one at a time, rows are read as the results are consumed
+        ordering has to see every matching row first, but with a limit it only keeps offset + limit of them
+        """
+        order_clauses = get_order_clauses(order)
+        plan = self.plan_query(table_name, fields, where, order_clauses)
+        index_order = order_clauses[0] if plan.index_ordered else None
+
+        records = self._project_rows(table_name, self._matching_row_ids(table_name, plan, index_order), fields)
+        yield from self._page(records, order_clauses if not plan.index_ordered else list(), limit, offset)
+
+    def query_iter_any(self, table_name: str, fields: List[str],
+                       where_any: List[List[WhereClause]],
+                       order: Optional[Union[List[OrderClause], OrderClause]] = None,
+                       limit: Optional[int] = None,
+                       offset: int = 0) -> Iterator[Dict]:
+        """
+        like query_iter, for rows matching any of the where lists, i.e. an OR of ANDs
+        every where list is planned on its own, so each can use its own index
+        """
+        if len(where_any) <= 1:
+            yield from self.query_iter(table_name, fields, where_any[0] if where_any else None, order, limit, offset)
+            return
+
+        matching_row_ids = set()
+        for where in where_any:
+            plan = self.plan_query(table_name, fields, where)
+            matching_row_ids.update(self._matching_row_ids(table_name, plan, None))
+
+        records = self._project_rows(table_name, sorted(matching_row_ids), fields)
+        yield from self._page(records, get_order_clauses(order), limit, offset)
+
+    def query(self, table_name : str, fields: List[str], 
+              where: Optional[List[WhereClause]] = None, 
+              order: Optional[OrderClause] = None,
+              limit: Optional[int] = None,
+              offset: int = 0):
+        return list(self.query_iter(table_name, fields, where, order, limit, offset))
+
+    def execute_iter(self, sql: str, params: Sequence[Any] = ()) -> Iterator[Dict]:
+        """
+        run a SQL text query, ? placeholders are filled from params in order
+        """
+        key, slot_values = normalize_sql(sql)
+        compiled = self.plan_cache.get(key) if self.plan_cache is not None else None
+        if compiled is None:
+            compiled = compile_sql(key)
+            if self.plan_cache is not None:
+                self.plan_cache.put(key, compiled)
+        return compiled.run(self, bind_params(slot_values, params))
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[Dict]:
+        return list(self.execute_iter(sql, params))
     
 
 @pytest.fixture
@@ -330,5 +1466,484 @@ def test_query_where_multi(sample_db: SqlDb):
     ]    
 
 
+def _indexed_people_db() -> SqlDb:
+    db = SqlDb()
+    for i in range(200):
+        db.insert("people", {"name": f"person{i}", "age": i % 50, "city": "Toronto" if i % 4 == 0 else "Vancouver"})
+    return db
+
+def test_index_matches_scan():
+    indexed_db = _indexed_people_db()
+    scan_db = _indexed_people_db()
+    indexed_db.create_index("people", "age")
+    indexed_db.create_index("people", "city")
+
+    wheres = [
+        WhereClause(comparator=WhereClauseEnum.EQUALS, field="age", value=7),
+        WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=44),
+        [
+            WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="age", value=10),
+            WhereClause(comparator=WhereClauseEnum.EQUALS, field="city", value="Toronto")
+        ],
+        None
+    ]
+    orders = [
+        None,
+        OrderClause(order=OrderClauseEnum.ASCENDING, field="age"),
+        OrderClause(order=OrderClauseEnum.DESCENDING, field="age"),
+        OrderClause(order=OrderClauseEnum.DESCENDING, field="name")
+    ]
+
+    for where in wheres:
+        for order in orders:
+            assert indexed_db.query("people", ["name", "age"], where, order) == \
+                scan_db.query("people", ["name", "age"], where, order)
+
+def test_planner_picks_most_selective_index():
+    db = _indexed_people_db()
+    db.create_index("people", "age")
+    db.create_index("people", "city")
+
+    city = WhereClause(comparator=WhereClauseEnum.EQUALS, field="city", value="Toronto")
+    age = WhereClause(comparator=WhereClauseEnum.EQUALS, field="age", value=7)
+    name = WhereClause(comparator=WhereClauseEnum.EQUALS, field="name", value="person7")
+
+    plan = db.plan_query("people", ["name"], [city, age, name])
+    assert plan.driver is age
+    assert plan.residual == [city, name]
+    assert plan.estimated_rows == 4
+
+    # no usable index, full scan
+    assert db.plan_query("people", ["name"], name).driver is None
+
+def test_planner_orders_from_index():
+    db = _indexed_people_db()
+    db.create_index("people", "age")
+
+    order = OrderClause(order=OrderClauseEnum.DESCENDING, field="age")
+    where = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=47)
+    assert db.plan_query("people", ["name", "age"], where, order).index_ordered
+    # the order field is not returned, so the order check has to run
+    assert not db.plan_query("people", ["name"], where, order).index_ordered
+
+    results = db.query("people", ["name", "age"], where, order)
+    assert [result["age"] for result in results] == [49] * 4 + [48] * 4
+    assert [result["name"] for result in results[:4]] == ["person49", "person99", "person149", "person199"]
+
+def test_index_kept_in_sync():
+    db = _indexed_people_db()
+    db.create_index("people", "age")
+    where = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=48)
+
+    db.insert("people", {"name": "leif", "age": 60})
+    # appended without insert
+    db.db["people"].append({"name": "amy", "age": 70})
+    for i in range(20):
+        db.insert("people", {"name": f"late{i}", "age": 49})
+
+    assert db.plan_query("people", ["name"], where).driver is where
+    assert [result["name"] for result in db.query("people", ["name"], where)] == \
+        ["person49", "person99", "person149", "person199", "leif", "amy"] + \
+        [f"late{i}" for i in range(20)]
+
+def test_index_not_used_with_missing_field(sample_db: SqlDb):
+    sample_db.create_index("people", "country")
+    where = WhereClause(comparator=WhereClauseEnum.EQUALS, field="country", value="Canada")
+
+    assert sample_db.plan_query("people", ["name"], where).driver is None
+    with pytest.raises(ValueError):
+        sample_db.query("people", ["name"], where)
+
+
+def _columnar_and_row_dbs(rows: List[Dict]) -> Tuple[SqlDb, SqlDb]:
+    columnar_db = SqlDb(columnar=True)
+    row_db = SqlDb()
+    for row in rows:
+        columnar_db.insert("people", dict(row))
+        row_db.insert("people", dict(row))
+    return columnar_db, row_db
+
+def test_columnar_matches_rows():
+    rows = [
+        {"name": f"person{i}", "age": i % 50, "height": 150.0 + i % 40, "city": "Toronto" if i % 4 == 0 else "Vancouver"}
+        for i in range(200)
+    ]
+    columnar_db, row_db = _columnar_and_row_dbs(rows)
+    assert isinstance(columnar_db.db["people"], ColumnarTable)
+    assert list(columnar_db.db["people"]) == rows
+
+    wheres = [
+        None,
+        WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="height", value=185.5),
+        [
+            WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="age", value=10),
+            WhereClause(comparator=WhereClauseEnum.EQUALS, field="city", value="Toronto")
+        ],
+    ]
+    order = OrderClause(order=OrderClauseEnum.DESCENDING, field="age")
+
+    for where in wheres:
+        assert columnar_db.query("people", ["name", "age"], where, order) == row_db.query("people", ["name", "age"], where, order)
+        assert columnar_db.query("people", ["city", "zzz"], where) == row_db.query("people", ["city", "zzz"], where)
+
+    columnar_db.create_index("people", "age")
+    where = WhereClause(comparator=WhereClauseEnum.EQUALS, field="age", value=7)
+    assert columnar_db.plan_query("people", ["name"], where).driver is where
+    assert columnar_db.query("people", ["name", "height"], where) == row_db.query("people", ["name", "height"], where)
+
+def test_columnar_nulls_and_mixed_types():
+    rows = [
+        {"name": "frank", "age": 14},
+        {"name": "amy", "age": 30, "country": "Canada"},
+        {"name": "leif", "age": 33.5, "country": "Canada"},
+        {"name": "bo", "age": 2 ** 70},
+    ]
+    columnar_db, row_db = _columnar_and_row_dbs(rows)
+    assert list(columnar_db.db["people"]) == rows
+    assert columnar_db.db["people"].columns["age"].kind is object
+
+    assert columnar_db.query("people", ["country"]) == row_db.query("people", ["country"])
+
+    canada = WhereClause(comparator=WhereClauseEnum.EQUALS, field="country", value="Canada")
+    with pytest.raises(ValueError):
+        columnar_db.query("people", ["name"], canada)
+
+    # frank is ruled out before his missing country is looked at
+    old = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=20)
+    young = WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="age", value=100)
+    assert columnar_db.query("people", ["name"], [old, young, canada]) == \
+        row_db.query("people", ["name"], [old, young, canada]) == \
+        [{"name": "amy"}, {"name": "leif"}]
+
+def test_columnar_typed_columns():
+    columnar_db = SqlDb(columnar=True)
+    for i in range(10):
+        columnar_db.insert("readings", {"sensor": i, "value": i / 2})
+
+    table = columnar_db.db["readings"]
+    assert table.columns["sensor"].values.typecode == 'q'
+    assert table.columns["value"].values.typecode == 'd'
+
+    where = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="value", value=3)
+    assert columnar_db.query("readings", ["sensor"], where) == [{"sensor": 7}, {"sensor": 8}, {"sensor": 9}]
+
+    with pytest.raises(ValueError):
+        columnar_db.create_table("readings")
+
+
+def _paging_db(columnar: bool) -> SqlDb:
+    db = SqlDb(columnar=columnar)
+    for i in range(100):
+        db.insert("people", {"name": f"person{i:02}", "age": i % 10, "city": ["Toronto", "Vancouver", "Ottawa"][i % 3]})
+    return db
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_query_order_multi(columnar: bool):
+    db = _paging_db(columnar)
+    order = [
+        OrderClause(order=OrderClauseEnum.ASCENDING, field="city"),
+        OrderClause(order=OrderClauseEnum.DESCENDING, field="age"),
+        OrderClause(order=OrderClauseEnum.ASCENDING, field="name")
+    ]
+
+    results = db.query("people", ["name", "age", "city"], None, order)
+    assert results == sorted(
+        db.query("people", ["name", "age", "city"]),
+        key=lambda record: (record["city"], -record["age"], record["name"])
+    )
+    assert results[0] == {"name": "person29", "age": 9, "city": "Ottawa"}
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_query_limit_offset(columnar: bool):
+    db = _paging_db(columnar)
+    where = WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="age", value=5)
+    fields = ["name", "age", "city"]
+
+    for order in [
+        None,
+        OrderClause(order=OrderClauseEnum.DESCENDING, field="age"),
+        [OrderClause(order=OrderClauseEnum.DESCENDING, field="city"), OrderClause(order=OrderClauseEnum.ASCENDING, field="age")]
+    ]:
+        everything = db.query("people", fields, where, order)
+        assert db.query("people", fields, where, order, limit=7) == everything[:7]
+        assert db.query("people", fields, where, order, limit=7, offset=45) == everything[45:52]
+        assert db.query("people", fields, where, order, offset=3) == everything[3:]
+        assert db.query("people", fields, where, order, limit=0) == []
+
+    with pytest.raises(ValueError):
+        db.query("people", fields, where, None, limit=-1)
+
+def test_query_iter_streams():
+    db = _paging_db(columnar=False)
+    db.db["people"].append({"name": "broken"})
+    where = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=8)
+
+    # rows are only read as far as the results are consumed, so the broken row is never reached
+    results = db.query_iter("people", ["name"], where)
+    assert next(results) == {"name": "person09"}
+    assert list(islice(results, 2)) == [{"name": "person19"}, {"name": "person29"}]
+    assert len(db.query("people", ["name"], where, limit=10)) == 10
+
+    with pytest.raises(ValueError):
+        db.query("people", ["name"], where)
+
+
+def test_normalize_sql():
+    key, values = normalize_sql("SELECT name, age FROM employee where age > 10 && name = blah order by name DESC LIMIT 5;")
+    assert key == "select name , age from employee where age > ? && name = ? order by name desc limit ?"
+    assert values == [10, "blah", 5]
+
+    other_key, other_values = normalize_sql("select name,age from employee where age>2.5&&name='it\\'s' order by name desc limit ?")
+    assert other_key == key
+    assert other_values == [2.5, "it's", PARAM]
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_execute_matches_query(columnar: bool):
+    db = _paging_db(columnar)
+    fields = ["name", "age", "city"]
+    young = WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="age", value=3)
+    in_ottawa = WhereClause(comparator=WhereClauseEnum.EQUALS, field="city", value="Ottawa")
+    old = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="age", value=7)
+    order = [OrderClause(order=OrderClauseEnum.DESCENDING, field="age"), OrderClause(order=OrderClauseEnum.ASCENDING, field="name")]
+
+    assert db.execute("select name, age, city from people where age < 3 && city = Ottawa") == \
+        db.query("people", fields, [young, in_ottawa])
+
+    # && binds tighter than ||
+    results = db.execute("select name, age, city from people where age < 3 && city = Ottawa || age > 7 order by age desc, name")
+    expected = [record for record in db.query("people", fields) if record["age"] > 7 or (record["age"] < 3 and record["city"] == "Ottawa")]
+    assert results == sorted(expected, key=lambda record: (-record["age"], record["name"]))
+
+    results = db.execute("select name, age, city from people where (age < 3 || age > 7) && city = 'Ottawa' order by age desc, name limit 4 offset 2")
+    expected = [record for record in db.query("people", fields, in_ottawa, order) if record["age"] < 3 or record["age"] > 7]
+    assert results == expected[2:6]
+
+    db.create_index("people", "age")
+    assert db.execute("select name from people where age > ? || age < ? order by name limit 3", (7, 1)) == \
+        [{"name": "person00"}, {"name": "person08"}, {"name": "person09"}]
+    assert db.execute("select name from people where age > 7 order by name desc limit 2") == \
+        db.query("people", ["name"], old, OrderClause(order=OrderClauseEnum.DESCENDING, field="name"), limit=2)
+
+def test_plan_cache():
+    db = _paging_db(columnar=False)
+    sql = "select name from people where age = ? && city = ? order by name limit ?"
+
+    assert db.execute(sql, (1, "Vancouver", 2)) == [{"name": "person01"}, {"name": "person31"}]
+    # literals and placeholders share the compiled plan
+    assert db.execute("SELECT name FROM people WHERE age = 2 && city = Ottawa ORDER BY name LIMIT 1") == [{"name": "person02"}]
+    assert db.plan_cache.misses == 1
+    assert db.plan_cache.hits == 1
+
+    with pytest.raises(ValueError):
+        db.execute(sql, (1, "Vancouver"))
+
+    small_cache = PlanCache(2)
+    for key in ["a", "b", "a", "c"]:
+        if small_cache.get(key) is None:
+            small_cache.put(key, compile_sql("select name from " + key))
+    assert list(small_cache.entries.keys()) == ["a", "c"]
+
+    uncached_db = SqlDb(plan_cache_size=0)
+    uncached_db.insert("people", {"name": "a"})
+    assert uncached_db.execute("select name from people") == [{"name": "a"}]
+
+def test_execute_rejects_bad_limit_and_offset():
+    db = _paging_db(columnar=False)
+    for sql, params in [
+        ("select name from people limit 'x'", ()),
+        ("select name from people limit 1.5", ()),
+        ("select name from people limit -1", ()),
+        ("select name from people limit 2 offset 0.5", ()),
+        ("select name from people limit ? offset ?", (2, "1")),
+        ("select name from people limit ?", (True,)),
+    ]:
+        with pytest.raises(ValueError, match="must be a non-negative integer"):
+            db.execute_iter(sql, params)
+
+    assert db.execute("select name from people order by name limit ? offset ?", (1, 3)) == [{"name": "person03"}]
+
+def test_sql_syntax_errors():
+    db = _paging_db(columnar=False)
+    for sql in [
+        "",
+        "select from people",
+        "select name people",
+        "select name from people where",
+        "select name from people where age >",
+        "select name from people where age ! 3",
+        "select name from people where (age > 3",
+        "select name from people order name",
+        "select name from people limit",
+        "select name from people limit 3 extra",
+    ]:
+        with pytest.raises(SqlSyntaxError):
+            db.execute(sql)
+
+
+def _bulk_rows(count: int) -> List[Dict]:
+    rows = [{"id": i, "name": f"person{i % 7}", "score": i / 4} for i in range(count)]
+    rows[3] = {"id": 3, "nickname": None}
+    rows[5]["score"] = "n/a"
+    rows[8]["id"] = 2 ** 70
+    return rows
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_insert_many_matches_insert(columnar: bool):
+    rows = _bulk_rows(10_000)
+    one_at_a_time = SqlDb(columnar=columnar)
+    for row in rows:
+        one_at_a_time.insert("people", row)
+
+    from_rows = SqlDb(columnar=columnar)
+    from_rows.create_index("people", "id")
+    assert from_rows.insert_many("people", iter(rows)) == len(rows)
+    assert list(from_rows.db["people"]) == rows
+
+    # the index catches up with the bulk rows on first use
+    where = WhereClause(comparator=WhereClauseEnum.LESSER_THAN, field="id", value=20)
+    assert from_rows.plan_query("people", ["name"], [where]).driver == where
+    assert from_rows.query("people", ["name"], where) == one_at_a_time.query("people", ["name"], where)
+
+    from_columns = SqlDb(columnar=columnar)
+    assert from_columns.insert_many("people", {"id": [1, 2, 3], "name": ["a", None, "c"]}) == 3
+    assert from_columns.insert_many("people", {"score": [0.5]}) == 1
+    assert list(from_columns.db["people"]) == [{"id": 1, "name": "a"}, {"id": 2}, {"id": 3, "name": "c"}, {"score": 0.5}]
+    with pytest.raises(ValueError):
+        from_columns.insert_many("people", {"id": [1, 2], "name": ["a"]})
+
+    # rows with no fields are still rows, in a batch of their own or mixed with others
+    empty_rows = SqlDb(columnar=columnar)
+    assert empty_rows.insert_many("e", [{}, {}]) == 2
+    assert empty_rows.insert_many("e", [{"a": 1}, {}]) == 2
+    assert empty_rows.insert_many("e", {}) == 0
+    assert list(empty_rows.db["e"]) == [{}, {}, {"a": 1}, {}]
+    one_at_a_time = SqlDb(columnar=columnar)
+    for row in [{}, {}, {"a": 1}, {}]:
+        one_at_a_time.insert("e", row)
+    assert list(one_at_a_time.db["e"]) == list(empty_rows.db["e"])
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_snapshot_round_trip(tmp_path, columnar: bool, use_mmap: bool):
+    path = str(tmp_path / "db.snapshot")
+    rows = _bulk_rows(1_000)
+    db = SqlDb(columnar=columnar)
+    db.insert_many("people", rows)
+    db.insert_many("flags", [{"on": True}, {"on": False}, {"missing": None}])
+    db.insert_many("numbers", {"value": [3, 1, 2], "ratio": [0.5, 0.25, 1.0]})
+    db.create_index("numbers", "value")
+    db.save_snapshot(path)
+
+    loaded = SqlDb()
+    loaded.load_snapshot(path, use_mmap)
+    for table_name in db.db.keys():
+        assert type(loaded.db[table_name]) is type(db.db[table_name])
+        assert list(loaded.db[table_name]) == list(db.db[table_name])
+
+    # the index is rebuilt on first use
+    where = WhereClause(comparator=WhereClauseEnum.GREATER_THAN, field="value", value=1)
+    assert loaded.indexes["numbers"]["value"].indexed_rows == 0
+    assert loaded.plan_query("numbers", ["ratio"], [where]).driver == where
+    assert loaded.query("numbers", ["ratio"], where) == [{"ratio": 0.5}, {"ratio": 1.0}]
+
+    # mapped columns are copied on write, and a snapshot can be saved over the file it was loaded from
+    loaded.insert("numbers", {"value": 4, "ratio": 2.0})
+    loaded.save_snapshot(path)
+    reloaded = SqlDb()
+    reloaded.load_snapshot(path, use_mmap)
+    assert reloaded.query("numbers", ["value"], where) == [{"value": 3}, {"value": 2}, {"value": 4}]
+
+    with pytest.raises(ValueError):
+        reloaded.load_snapshot(path, use_mmap)
+
+
+def benchmark_load(rows: int = 1_000_000) -> None:
+    """
+    insert against insert_many, and a snapshot load against both
+    """
+    import tempfile
+
+    cities = ["Toronto", "Vancouver", "Ottawa", "Montreal"]
+    data = [{"id": i, "age": i % 90, "city": cities[i % len(cities)], "score": i / 3} for i in range(rows)]
+
+    start = time.perf_counter()
+    db = SqlDb(columnar=True)
+    for row in data:
+        db.insert("people", row)
+    print(f"insert: {time.perf_counter() - start:.2f} s for {rows} rows")
+
+    start = time.perf_counter()
+    db = SqlDb(columnar=True)
+    db.insert_many("people", data)
+    print(f"insert_many rows: {time.perf_counter() - start:.2f} s")
+
+    columns = {name: [row[name] for row in data] for name in data[0].keys()}
+    start = time.perf_counter()
+    db = SqlDb(columnar=True)
+    db.insert_many("people", columns)
+    print(f"insert_many columns: {time.perf_counter() - start:.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "people.snapshot")
+        start = time.perf_counter()
+        db.save_snapshot(path)
+        print(f"save_snapshot: {time.perf_counter() - start:.2f} s, {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        for use_mmap in [False, True]:
+            start = time.perf_counter()
+            loaded = SqlDb()
+            loaded.load_snapshot(path, use_mmap)
+            print(f"load_snapshot use_mmap={use_mmap}: {time.perf_counter() - start:.3f} s")
+        del loaded
+
+
+def benchmark(rows: int = 100_000, repeats: int = 1_000) -> None:
+    """
+    parse + compile cost of a query against running it, with and without the plan cache
+    """
+    db = SqlDb(columnar=True)
+    cities = ["Toronto", "Vancouver", "Ottawa", "Montreal"]
+    for i in range(rows):
+        db.insert("people", {"name": f"person{i}", "age": i % 90, "city": cities[i % len(cities)]})
+    db.create_index("people", "age")
+
+    sql = "select name, age from people where age = ? && city = ? || age > ? order by age desc, name limit 20"
+    params = (30, "Ottawa", 85)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        compile_sql(normalize_sql(sql)[0])
+    parse_seconds = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        normalize_sql(sql)
+    normalize_seconds = (time.perf_counter() - start) / repeats
+
+    execute_repeats = max(1, repeats // 100)
+    key, slot_values = normalize_sql(sql)
+    compiled = compile_sql(key)
+    bound_values = bind_params(slot_values, params)
+    start = time.perf_counter()
+    for _ in range(execute_repeats):
+        list(compiled.run(db, bound_values))
+    run_seconds = (time.perf_counter() - start) / execute_repeats
+
+    start = time.perf_counter()
+    for _ in range(execute_repeats):
+        db.execute(sql, params)
+    execute_seconds = (time.perf_counter() - start) / execute_repeats
+
+    print(f"rows: {rows}")
+    print(f"parse + compile: {parse_seconds * 1e6:.1f} us, of which normalizing (paid on every execute): {normalize_seconds * 1e6:.1f} us")
+    print(f"run compiled query: {run_seconds * 1e6:.1f} us")
+    print(f"execute with plan cache: {execute_seconds * 1e6:.1f} us, hits: {db.plan_cache.hits}, misses: {db.plan_cache.misses}")
+
+
 if __name__ == "__main__":
-    pytest.main(["openai/sql_db/sql_db.py"])
\ No newline at end of file
+    if "--benchmark" in sys.argv:
+        benchmark()
+    elif "--benchmark-load" in sys.argv:
+        benchmark_load()
+    else:
+        pytest.main(["openai/sql_db/sql_db.py"])
\ No newline at end of file